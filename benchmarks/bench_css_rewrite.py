@@ -0,0 +1,160 @@
+"""
+Benchmark for the CSS position rewrite engine.
+
+This module compares `convert_bottom_to_top` and `apply_offset` against the previous
+per-property regex implementation on the sample export scaled to 10k+ CSS rules and
+checks that both produce byte-identical output.
+
+Usage:
+    python benchmarks/bench_css_rewrite.py [--rules 12000] [--repeat 5]
+"""
+
+import argparse
+import os
+import re
+import sys
+import timeit
+
+# Add parent directory to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.html_utils import apply_offset, convert_bottom_to_top, load_html_from_file
+from shared.constants import HTML_HEIGHT
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'data', 'original', 'original_2025-07-16_104156.html')
+
+
+def legacy_convert_bottom_to_top(html_string, offset_x=0, offset_y=0):
+    """Previous implementation of convert_bottom_to_top, kept as the reference."""
+    pattern = r'([^{]+)\{([^}]+)\}'
+
+    def replace_css_rule(match):
+        selector = match.group(1)
+        properties = match.group(2)
+        bottom_match = re.search(r'bottom:(\d+\.?\d*)px', properties)
+        if bottom_match:
+            bottom_px = float(bottom_match.group(1))
+            top_px = HTML_HEIGHT - bottom_px
+            if offset_y != 0:
+                top_px += offset_y
+            properties = re.sub(r'bottom:(\d+\.?\d*)px', f'top:{top_px:.0f}px', properties)
+        if offset_x != 0:
+            left_match = re.search(r'left:(\d+\.?\d*)px', properties)
+            if left_match:
+                left_px = float(left_match.group(1))
+                new_left_px = left_px + offset_x
+                properties = re.sub(r'left:(\d+\.?\d*)px', f'left:{new_left_px:.0f}px', properties)
+        return f'{selector}{{{properties}}}'
+
+    def process_style(style_match):
+        style_tag_start = style_match.group(0).split('>')[0] + '>'
+        new_style_content = re.sub(pattern, replace_css_rule, style_match.group(1))
+        return f"{style_tag_start}{new_style_content}</style>"
+
+    return re.sub(r'<style[^>]*>(.*?)</style>', process_style, html_string, flags=re.DOTALL)
+
+
+def legacy_apply_offset(html_string, offset_x=0, offset_y=0):
+    """Previous implementation of apply_offset, kept as the reference."""
+    if offset_x == 0 and offset_y == 0:
+        return html_string
+    pattern = r'([^{]+)\{([^}]+)\}'
+
+    def apply_offset_to_rule(match):
+        selector = match.group(1)
+        properties = match.group(2)
+        if offset_x != 0:
+            left_match = re.search(r'left:(\d+\.?\d*)px', properties)
+            if left_match:
+                new_left_px = float(left_match.group(1)) + offset_x
+                properties = re.sub(r'left:(\d+\.?\d*)px', f'left:{new_left_px:.0f}px', properties)
+        if offset_y != 0:
+            top_match = re.search(r'top:(\d+\.?\d*)px', properties)
+            if top_match:
+                new_top_px = float(top_match.group(1)) + offset_y
+                properties = re.sub(r'top:(\d+\.?\d*)px', f'top:{new_top_px:.0f}px', properties)
+        return f'{selector}{{{properties}}}'
+
+    def process_style(style_match):
+        style_tag_start = style_match.group(0).split('>')[0] + '>'
+        new_style_content = re.sub(pattern, apply_offset_to_rule, style_match.group(1))
+        return f"{style_tag_start}{new_style_content}</style>"
+
+    return re.sub(r'<style[^>]*>(.*?)</style>', process_style, html_string, flags=re.DOTALL)
+
+
+def build_scaled_document(html_string, rule_count):
+    """
+    Scale the sample export to the given number of positioned CSS rules.
+
+    The inline `style` attributes of the sample's text spans are turned into `#id{...}`
+    rules and repeated until `rule_count` rules exist in an additional style block.
+
+    Args:
+        html_string (str): The sample HTML string
+        rule_count (int): The number of CSS rules to generate
+
+    Returns:
+        str: The scaled HTML string
+    """
+    inline_styles = re.findall(r'style="(left:[^"]*bottom:[^"]*)"', html_string)
+    if not inline_styles:
+        inline_styles = ['left:18px;bottom:804px;letter-spacing:0.14px;']
+
+    rules = []
+    for index in range(rule_count):
+        style = inline_styles[index % len(inline_styles)]
+        rules.append(f'        #t{index:x}_{index // len(inline_styles) + 1}{{{style}}}')
+
+    style_block = '    <style type="text/css">\n' + '\n'.join(rules) + '\n    </style>\n'
+    return html_string.replace('</head>', style_block + '</head>', 1)
+
+
+def run_benchmark(rule_count=12000, repeat=5):
+    """
+    Time the legacy and the current implementation on the scaled sample document.
+
+    Args:
+        rule_count (int, optional): The number of CSS rules in the scaled document. Defaults to 12000.
+        repeat (int, optional): The number of timed runs per case. Defaults to 5.
+
+    Returns:
+        list: A list of dictionaries with case name, timings and speedup
+    """
+    html_string = build_scaled_document(load_html_from_file(SAMPLE_FILE), rule_count)
+
+    cases = [
+        ('convert_bottom_to_top', legacy_convert_bottom_to_top, convert_bottom_to_top, {}),
+        ('convert_bottom_to_top offset', legacy_convert_bottom_to_top, convert_bottom_to_top,
+         {'offset_x': 3, 'offset_y': -5}),
+        ('apply_offset', legacy_apply_offset, apply_offset, {'offset_x': 3, 'offset_y': -5}),
+    ]
+
+    results = []
+    for name, legacy_function, function, kwargs in cases:
+        if legacy_function(html_string, **kwargs) != function(html_string, **kwargs):
+            raise AssertionError(f"{name}: output differs from the legacy implementation")
+
+        legacy_time = min(timeit.repeat(lambda: legacy_function(html_string, **kwargs), number=1, repeat=repeat))
+        current_time = min(timeit.repeat(lambda: function(html_string, **kwargs), number=1, repeat=repeat))
+        results.append({
+            'case': name,
+            'legacy_s': legacy_time,
+            'current_s': current_time,
+            'speedup': legacy_time / current_time if current_time else float('inf'),
+        })
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rules', type=int, default=12000, help='number of CSS rules in the scaled document')
+    parser.add_argument('--repeat', type=int, default=5, help='number of timed runs per case')
+    args = parser.parse_args()
+
+    print(f"Sample: {SAMPLE_FILE} scaled to {args.rules} rules (output is byte-identical)")
+    for result in run_benchmark(args.rules, args.repeat):
+        print(f"{result['case']:<32} legacy {result['legacy_s'] * 1000:8.2f} ms   "
+              f"current {result['current_s'] * 1000:8.2f} ms   speedup {result['speedup']:5.2f}x")
@@ -0,0 +1,72 @@
+"""
+Benchmark for extract_positions.
+
+This module compares the style-only fast path of `extract_positions` with the
+BeautifulSoup path on the sample export, plain and scaled to more CSS rules, and checks
+that both return the same positions.
+
+Usage:
+    python benchmarks/bench_extract_positions.py [--rules 12000] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+# Add parent directory to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_css_rewrite import SAMPLE_FILE, build_scaled_document
+from shared.html_utils import DOCUMENT_CACHE, extract_positions, load_html_from_file
+
+
+def run_benchmark(rule_count=12000, repeat=5):
+    """
+    Time both extract_positions paths on the sample document and its scaled version.
+
+    Args:
+        rule_count (int, optional): The number of CSS rules in the scaled document. Defaults to 12000.
+        repeat (int, optional): The number of timed runs per case. Defaults to 5.
+
+    Returns:
+        list: A list of dictionaries with case name, number of positions, timings and speedup
+    """
+    html_string = load_html_from_file(SAMPLE_FILE)
+    documents = [
+        ('sample', html_string),
+        (f'sample + {rule_count} rules', build_scaled_document(html_string, rule_count)),
+    ]
+
+    results = []
+    for name, document in documents:
+        positions = extract_positions(document)
+        if extract_positions(document, use_beautifulsoup=True) != positions:
+            raise AssertionError(f"{name}: positions differ from the BeautifulSoup path")
+
+        # Clear the document cache before every run, so the parsing is timed instead of cache hits
+        soup_time = min(timeit.repeat(lambda: extract_positions(document, use_beautifulsoup=True),
+                                      setup=DOCUMENT_CACHE.clear, number=1, repeat=repeat))
+        fast_time = min(timeit.repeat(lambda: extract_positions(document), setup=DOCUMENT_CACHE.clear,
+                                      number=1, repeat=repeat))
+        results.append({
+            'case': name,
+            'positions': len(positions),
+            'beautifulsoup_s': soup_time,
+            'style_only_s': fast_time,
+            'speedup': soup_time / fast_time if fast_time else float('inf'),
+        })
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rules', type=int, default=12000, help='number of CSS rules in the scaled document')
+    parser.add_argument('--repeat', type=int, default=5, help='number of timed runs per case')
+    args = parser.parse_args()
+
+    for result in run_benchmark(args.rules, args.repeat):
+        print(f"{result['case']:<24} {result['positions']:6d} positions   "
+              f"BeautifulSoup {result['beautifulsoup_s'] * 1000:8.2f} ms   "
+              f"style-only {result['style_only_s'] * 1000:8.2f} ms   speedup {result['speedup']:6.1f}x")
@@ -0,0 +1,194 @@
+"""
+Benchmark suite for the conversion pipeline on synthetic documents.
+
+This module times the conversion functions on generated PDF-export documents of growing
+size, writes the results as JSON and compares them against a stored baseline, so that
+regressions show up as a non-zero exit code.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--sizes small,medium] [--repeat 3] [--output results.json]
+                                        [--baseline benchmarks/baseline.json] [--update-baseline]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import timeit
+
+# Add parent directory to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_documents import generate_document, write_documents
+from shared.html_utils import (
+    DOCUMENT_CACHE, apply_offset, batch_convert_folder, convert_bottom_to_top, extract_css_styles,
+    extract_positions, parse_html
+)
+from shared.jasper_xml import convert_html_to_jasper
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Document sizes: pages, text boxes per page, font classes and background image bytes per page
+SIZES = {
+    'small': {'pages': 1, 'boxes_per_page': 200, 'style_classes': 8, 'image_bytes': 0},
+    'medium': {'pages': 5, 'boxes_per_page': 1000, 'style_classes': 16, 'image_bytes': 0},
+    'large': {'pages': 20, 'boxes_per_page': 2000, 'style_classes': 32, 'image_bytes': 0},
+    'images': {'pages': 5, 'boxes_per_page': 500, 'style_classes': 16, 'image_bytes': 2 * 1024 * 1024},
+}
+
+# Number of documents converted by the batch case
+BATCH_FILES = 4
+
+# A case is a regression if it is slower than the baseline by this factor and by MIN_REGRESSION_S
+DEFAULT_TOLERANCE = 0.25
+MIN_REGRESSION_S = 0.002
+
+
+def _cases(html_string, batch_folder):
+    """Return the (name, function) pairs timed for a document."""
+    soup = parse_html(html_string)
+
+    def batch():
+        with tempfile.TemporaryDirectory() as output_folder, contextlib.redirect_stdout(io.StringIO()):
+            batch_convert_folder(batch_folder, output_folder, convert_bottom_to_top)
+
+    return [
+        ('convert_bottom_to_top', lambda: convert_bottom_to_top(html_string)),
+        ('apply_offset', lambda: apply_offset(html_string, offset_x=3, offset_y=-5)),
+        ('extract_positions', lambda: extract_positions(html_string)),
+        ('extract_css_styles', lambda: extract_css_styles(soup)),
+        ('batch_convert_folder', batch),
+        ('jrxml', lambda: convert_html_to_jasper(html_string, io.StringIO())),
+    ]
+
+
+def run_suite(sizes=('small', 'medium'), repeat=3):
+    """
+    Time every case on the documents of the given sizes.
+
+    The document cache is cleared before every run, so every run parses the document again.
+
+    Args:
+        sizes (iterable, optional): The names of the SIZES to run. Defaults to small and medium.
+        repeat (int, optional): The number of timed runs per case, the fastest is reported. Defaults to 3.
+
+    Returns:
+        list: A dictionary per case and size with case, size, pages, boxes, characters and seconds
+    """
+    results = []
+    for size in sizes:
+        parameters = SIZES[size]
+        html_string = generate_document(**parameters)
+        with tempfile.TemporaryDirectory() as batch_folder:
+            write_documents(batch_folder, BATCH_FILES, **parameters)
+            for case, function in _cases(html_string, batch_folder):
+                seconds = min(timeit.repeat(function, setup=DOCUMENT_CACHE.clear, number=1, repeat=repeat))
+                results.append({
+                    'case': case,
+                    'size': size,
+                    'pages': parameters['pages'],
+                    'boxes': parameters['pages'] * parameters['boxes_per_page'],
+                    'characters': len(html_string),
+                    'seconds': seconds,
+                })
+    DOCUMENT_CACHE.clear()
+    return results
+
+
+def compare_results(results, baseline, tolerance=DEFAULT_TOLERANCE, min_difference=MIN_REGRESSION_S):
+    """
+    Compare results against baseline results.
+
+    Args:
+        results (list): The results of run_suite
+        baseline (list): The baseline results
+        tolerance (float, optional): The allowed slowdown relative to the baseline. Defaults to DEFAULT_TOLERANCE.
+        min_difference (float, optional): The smallest slowdown in seconds that counts. Defaults to MIN_REGRESSION_S.
+
+    Returns:
+        list: A dictionary per case and size present in both with case, size, baseline_s,
+              seconds, ratio and regression
+    """
+    baseline_seconds = {(result['case'], result['size']): result['seconds'] for result in baseline}
+    comparisons = []
+    for result in results:
+        key = (result['case'], result['size'])
+        if key not in baseline_seconds:
+            continue
+        reference = baseline_seconds[key]
+        seconds = result['seconds']
+        comparisons.append({
+            'case': result['case'],
+            'size': result['size'],
+            'baseline_s': reference,
+            'seconds': seconds,
+            'ratio': seconds / reference if reference else float('inf'),
+            'regression': seconds > reference * (1 + tolerance) and seconds - reference > min_difference,
+        })
+    return comparisons
+
+
+def build_report(results, repeat):
+    """
+    Build the JSON report of a run.
+
+    Args:
+        results (list): The results of run_suite
+        repeat (int): The number of timed runs per case
+
+    Returns:
+        dict: The report with the environment of the run and the results
+    """
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='small,medium', help=f'comma-separated sizes of {", ".join(SIZES)}')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed runs per case')
+    parser.add_argument('--output', help='write the JSON report to this file')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='JSON report to compare against')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='allowed slowdown relative to the baseline (default: 0.25)')
+    parser.add_argument('--update-baseline', action='store_true', help='store the results as the new baseline')
+    args = parser.parse_args()
+
+    suite_results = run_suite([size.strip() for size in args.sizes.split(',')], args.repeat)
+    report = build_report(suite_results, args.repeat)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+
+    comparisons = {}
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            for comparison in compare_results(suite_results, json.load(file)['results'], args.tolerance):
+                comparisons[(comparison['case'], comparison['size'])] = comparison
+
+    for result in suite_results:
+        line = (f"{result['case']:<22} {result['size']:<7} {result['boxes']:6d} boxes "
+                f"{result['seconds'] * 1000:10.2f} ms")
+        comparison = comparisons.get((result['case'], result['size']))
+        if comparison:
+            line += f"   baseline {comparison['baseline_s'] * 1000:10.2f} ms  {comparison['ratio']:5.2f}x"
+            if comparison['regression']:
+                line += '  REGRESSION'
+        print(line)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+        print(f"Baseline written to {args.baseline}")
+    elif any(comparison['regression'] for comparison in comparisons.values()):
+        sys.exit(1)
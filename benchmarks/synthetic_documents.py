@@ -0,0 +1,119 @@
+"""
+Generator for synthetic PDF-export documents.
+
+This module builds HTML documents shaped like the exports the converter is used on: page
+containers `#p1`, `#p2`, ... with their size in the style attribute, shared font classes
+`.s0` to `.sK`, one style block per page with the `#id{left;bottom}` rules of its text
+boxes, `div.t` text boxes and optionally a base64 page background image. The documents
+are deterministic for a seed, so benchmark runs compare the same input.
+
+Usage:
+    python benchmarks/synthetic_documents.py output.html [--pages 5] [--boxes 500] [--classes 8]
+"""
+
+import argparse
+import base64
+import os
+import random
+
+# Page size of the generated page containers in pixels, as in the sample export
+PAGE_WIDTH = 909
+PAGE_HEIGHT = 1286
+
+# Words the text boxes are filled with
+WORDS = ('Lieferschein', 'Artikel-Nr.', 'Menge', 'Farbe', 'Größe', 'Seite', 'Datum', 'Pos.', 'EAN',
+         'Himmel', 'Türkis', 'Pullover', 'Oostende', 'Saison', 'Auftrag', '227107409', '36', '4067264290086')
+
+FONT_FAMILIES = ('Calibri_1p', 'Calibri-Bold_1r', 'Arial', 'Helvetica')
+
+
+def generate_document(pages=1, boxes_per_page=200, style_classes=8, image_bytes=0,
+                      page_width=PAGE_WIDTH, page_height=PAGE_HEIGHT, seed=0):
+    """
+    Generate a synthetic PDF-export document.
+
+    Args:
+        pages (int, optional): The number of page containers. Defaults to 1.
+        boxes_per_page (int, optional): The number of text boxes per page. Defaults to 200.
+        style_classes (int, optional): The number of font classes. Defaults to 8.
+        image_bytes (int, optional): The size of the base64 background image of every page in
+                                     bytes before encoding, 0 for no image. Defaults to 0.
+        page_width (int, optional): The width of the pages in pixels. Defaults to PAGE_WIDTH.
+        page_height (int, optional): The height of the pages in pixels. Defaults to PAGE_HEIGHT.
+        seed (int, optional): The seed of the random positions and texts. Defaults to 0.
+
+    Returns:
+        str: The HTML document
+    """
+    generator = random.Random(seed)
+    parts = ['<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8" />\n'
+             '<style class="shared-css" type="text/css">\n'
+             '.t{transform-origin:bottom left;z-index:2;position:absolute;white-space:pre;overflow:visible;}\n']
+    for index in range(style_classes):
+        family = FONT_FAMILIES[index % len(FONT_FAMILIES)]
+        parts.append(f'.s{index}{{font-family:"{family}_{index}";font-size:{10 + index % 12}px;color:#000;}}\n')
+    parts.append('</style>\n</head>\n<body style="margin: 0;">\n')
+
+    for page in range(1, pages + 1):
+        parts.append(f'<div id="p{page}" style="overflow: hidden; position: relative; '
+                     f'background-color: white; width: {page_width}px; height: {page_height}px;">\n'
+                     '<style class="shared-css" type="text/css">\n')
+        for box in range(1, boxes_per_page + 1):
+            left = generator.randint(20, page_width - 120)
+            bottom = generator.randint(20, page_height - 40)
+            spacing = generator.choice(('0.1', '0.14', '-0.05'))
+            parts.append(f'#t{box:x}_{page}{{left:{left}px;bottom:{bottom}px;letter-spacing:{spacing}px;}}\n')
+        parts.append('</style>\n')
+
+        if image_bytes:
+            payload = base64.b64encode(generator.randbytes(image_bytes)).decode('ascii')
+            parts.append(f'<img id="pdf{page}" style="width:{page_width}px; height:{page_height}px;" '
+                         f'src="data:image/jpeg;base64,{payload}"/>\n')
+
+        for box in range(1, boxes_per_page + 1):
+            text = ' '.join(generator.choice(WORDS) for _ in range(generator.randint(1, 3)))
+            parts.append(f'<div id="t{box:x}_{page}" class="t s{generator.randrange(max(style_classes, 1))}">'
+                         f'{text}</div>\n')
+        parts.append('</div>\n')
+
+    parts.append('</body>\n</html>\n')
+    return ''.join(parts)
+
+
+def write_documents(folder, count, seed=0, **kwargs):
+    """
+    Write several synthetic documents to a folder.
+
+    Args:
+        folder (str): The folder to write the documents to
+        count (int): The number of documents
+        seed (int, optional): The seed of the first document, the others use the following seeds. Defaults to 0.
+        **kwargs: Arguments of generate_document
+
+    Returns:
+        list: The paths of the written documents
+    """
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    for index in range(count):
+        path = os.path.join(folder, f'synthetic_{index:04d}.html')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(generate_document(seed=seed + index, **kwargs))
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('output', help='path of the HTML file to write')
+    parser.add_argument('--pages', type=int, default=1, help='number of pages')
+    parser.add_argument('--boxes', type=int, default=200, help='number of text boxes per page')
+    parser.add_argument('--classes', type=int, default=8, help='number of font classes')
+    parser.add_argument('--image-bytes', type=int, default=0, help='size of the background image of every page')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the random positions and texts')
+    args = parser.parse_args()
+
+    document = generate_document(args.pages, args.boxes, args.classes, args.image_bytes, seed=args.seed)
+    with open(args.output, 'w', encoding='utf-8') as file:
+        file.write(document)
+    print(f"{args.output}: {args.pages} pages, {args.pages * args.boxes} text boxes, {len(document)} characters")
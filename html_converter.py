@@ -1,19 +1,25 @@
-import re
 import os
 import datetime
 
-# Constants for HTML page size
-HTML_WIDTH = 1210
-HTML_HEIGHT = 825
-HTML_MARGIN_TOP = 0
-HTML_MARGIN_RIGHT = 0
-HTML_MARGIN_BOTTOM = 0
-HTML_MARGIN_LEFT = 0
+# The HTML page size is defined once in shared/constants.py
+from shared.constants import (
+    HTML_HEIGHT,
+    HTML_MARGIN_BOTTOM,
+    HTML_MARGIN_LEFT,
+    HTML_MARGIN_RIGHT,
+    HTML_MARGIN_TOP,
+    HTML_WIDTH,
+)
+from shared.css_rewrite import rewrite_page_positions
+from shared.instrumentation import file_size, html_characters, stage
 
+@stage(characters=html_characters)
 def convert_bottom_to_top(html_string: str, offset_x: int = 0, offset_y: int = 0) -> str:
     """
     Converts bottom-positioned elements to top-positioned elements in HTML.
     
+    Every page container (e.g. `#p1` or `.page`) is flipped against its own height.
+    
     Args:
         html_string (str): The HTML string containing bottom-positioned elements
         offset_x (int, optional): Horizontal offset to apply to left values (positive = right, negative = left). Defaults to 0.
@@ -22,56 +28,10 @@ def convert_bottom_to_top(html_string: str, offset_x: int = 0, offset_y: int = 0
     Returns:
         str: The modified HTML string with bottom positions converted to top positions
     """
-    # Define a pattern to find CSS rules with bottom property
-    pattern = r'([^{]+)\{([^}]+)\}'
-    
-    # Define a function to replace bottom with top in CSS rules
-    def replace_css_rule(match):
-        selector = match.group(1)
-        properties = match.group(2)
-        
-        # Find bottom property
-        bottom_match = re.search(r'bottom:(\d+\.?\d*)px', properties)
-        if bottom_match:
-            bottom_px = float(bottom_match.group(1))
-            # Calculate top value: top = HTML_HEIGHT - bottom
-            top_px = HTML_HEIGHT - bottom_px
-            
-            # Apply vertical offset if provided
-            if offset_y != 0:
-                top_px += offset_y
-            
-            # Replace bottom with top
-            properties = re.sub(r'bottom:(\d+\.?\d*)px', f'top:{top_px:.0f}px', properties)
-        
-        # Apply horizontal offset to left property if provided
-        if offset_x != 0:
-            left_match = re.search(r'left:(\d+\.?\d*)px', properties)
-            if left_match:
-                left_px = float(left_match.group(1))
-                new_left_px = left_px + offset_x
-                properties = re.sub(r'left:(\d+\.?\d*)px', f'left:{new_left_px:.0f}px', properties)
-        
-        return f'{selector}{{{properties}}}'
-    
-    # Find all style tags in the HTML
-    style_pattern = r'<style[^>]*>(.*?)</style>'
-    
-    # Function to process style content
-    def process_style(style_match):
-        style_tag_start = style_match.group(0).split('>')[0] + '>'
-        style_content = style_match.group(1)
-        
-        # Apply the CSS rule replacement
-        new_style_content = re.sub(pattern, replace_css_rule, style_content)
-        
-        return f"{style_tag_start}{new_style_content}</style>"
-    
-    # Replace style tags with processed content
-    result_html = re.sub(style_pattern, process_style, html_string, flags=re.DOTALL)
-    
-    return result_html
+    return rewrite_page_positions(html_string, bottom_to_top=True, offset_x=offset_x, offset_y=offset_y,
+                                  html_height=HTML_HEIGHT)
 
+@stage(characters=html_characters)
 def save_html_with_timestamp(html_string: str, function_name: str = "convert_bottom_to_top") -> str:
     """
     Saves HTML string to a file with a timestamp in the filename.
@@ -102,6 +62,7 @@ def save_html_with_timestamp(html_string: str, function_name: str = "convert_bot
     print(f"HTML saved to: {file_path}")
     return file_path
 
+@stage(size=file_size)
 def load_html_from_file(file_path: str) -> str:
     """
     Loads HTML from a file.
@@ -119,6 +80,7 @@ def load_html_from_file(file_path: str) -> str:
         print(f"Error loading file: {e}")
         return ""
 
+@stage(characters=html_characters)
 def save_original_html(html_string: str) -> str:
     """
     Saves the original HTML string to a file in the original_files directory.
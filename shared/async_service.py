@@ -0,0 +1,293 @@
+"""
+Asyncio interface for HTML to JasperReport conversion.
+
+The conversion functions are synchronous and CPU-bound, and the file functions block on
+I/O. This module lets an asyncio application, e.g. a web service, await them without
+blocking its event loop: a ConversionService runs the conversions in a process pool with
+a limit on concurrent conversions and on the requests waiting for one, and reads and
+writes files in a thread pool.
+
+Usage:
+    async with ConversionService(max_concurrency=4) as service:
+        converted_html = await service.convert(html_string, offset_x=3)
+
+    converted_html = await convert_async(html_string)
+"""
+
+import asyncio
+import functools
+import os
+import weakref
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from shared.html_utils import (
+    convert_bottom_to_top, load_html_from_file, save_html_to_file, save_original_html
+)
+
+# Number of requests that may wait for a conversion per allowed concurrent conversion
+DEFAULT_QUEUE_FACTOR = 4
+
+# Number of threads for file reads and writes
+DEFAULT_IO_WORKERS = 4
+
+# Default service of every event loop, created by get_default_service
+_default_services = weakref.WeakKeyDictionary()
+
+
+def _read_text(path):
+    """Read a UTF-8 text file."""
+    with open(path, 'r', encoding='utf-8') as file:
+        return file.read()
+
+
+def _write_text(path, text):
+    """Write a UTF-8 text file, creating its folder."""
+    output_dir = os.path.dirname(path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(text)
+    return path
+
+
+class ConversionService:
+    """
+    Runs conversions for asyncio code with bounded concurrency.
+
+    At most max_concurrency conversions run at once; up to max_queue further requests wait
+    for a free slot, and requests beyond that are rejected with asyncio.QueueFull, so an
+    overloaded service answers at once instead of piling up work. File reads and writes run
+    in a separate thread pool and do not take conversion slots.
+
+    A conversion keeps its slot until it has finished in the pool, also when the awaiting
+    request is cancelled, e.g. by a client timeout, since submitted work cannot be stopped.
+
+    The service must be used from one event loop. Functions run in the process pool must be
+    defined at module level, as in run_file_tasks.
+    """
+
+    def __init__(self, max_concurrency=None, max_queue=None, use_processes=True, io_workers=DEFAULT_IO_WORKERS):
+        """
+        Create a service.
+
+        Args:
+            max_concurrency (int, optional): The number of conversions running at once and of
+                                             worker processes. Defaults to the number of CPUs.
+            max_queue (int, optional): The number of requests waiting for a conversion slot.
+                                       Defaults to DEFAULT_QUEUE_FACTOR * max_concurrency.
+            use_processes (bool, optional): Run conversions in worker processes; with False
+                                            they run in threads. Defaults to True.
+            io_workers (int, optional): The number of threads for file I/O. Defaults to DEFAULT_IO_WORKERS.
+        """
+        self.max_concurrency = max_concurrency or os.cpu_count() or 1
+        self.max_queue = DEFAULT_QUEUE_FACTOR * self.max_concurrency if max_queue is None else max_queue
+        executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        self._executor = executor_class(max_workers=self.max_concurrency)
+        self._io_executor = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix='conversion-io')
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._closed = False
+        self.stats = {'running': 0, 'waiting': 0, 'completed': 0, 'failed': 0, 'rejected': 0}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    async def run(self, function, *args, **kwargs):
+        """
+        Run a CPU-bound function in the pool once a conversion slot is free.
+
+        Args:
+            function (function): The function to run
+            *args: Positional arguments of the function
+            **kwargs: Keyword arguments of the function
+
+        Returns:
+            The return value of the function
+
+        Raises:
+            asyncio.QueueFull: If max_queue requests are waiting already
+            RuntimeError: If the service is closed
+        """
+        if self._closed:
+            raise RuntimeError("the conversion service is closed")
+        if self._semaphore.locked() and self.stats['waiting'] >= self.max_queue:
+            self.stats['rejected'] += 1
+            raise asyncio.QueueFull(f"{self.stats['waiting']} conversions are waiting already")
+
+        self.stats['waiting'] += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.stats['waiting'] -= 1
+
+        self.stats['running'] += 1
+        try:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._executor, functools.partial(function, *args, **kwargs))
+        except BaseException:
+            self._finish(None)
+            raise
+        future.add_done_callback(self._finish)
+        # Cancelling the request must not cancel the future, which would free the slot early
+        return await asyncio.shield(future)
+
+    def _finish(self, future):
+        """Count a finished conversion and free its slot."""
+        self.stats['running'] -= 1
+        self._semaphore.release()
+        if future is None or future.cancelled() or future.exception() is not None:
+            self.stats['failed'] += 1
+        else:
+            self.stats['completed'] += 1
+
+    async def run_io(self, function, *args):
+        """
+        Run a blocking I/O function in the I/O thread pool.
+
+        Args:
+            function (function): The function to run
+            *args: Arguments of the function
+
+        Returns:
+            The return value of the function
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._io_executor, function, *args)
+
+    async def convert(self, html_string, conversion_function=convert_bottom_to_top, **kwargs):
+        """
+        Convert an HTML string.
+
+        Args:
+            html_string (str): The HTML code to convert
+            conversion_function (function, optional): The conversion function. Defaults to convert_bottom_to_top.
+            **kwargs: Additional arguments to pass to the conversion function
+
+        Returns:
+            str: The converted HTML code
+        """
+        return await self.run(conversion_function, html_string, **kwargs)
+
+    async def read_text(self, path):
+        """Read a UTF-8 text file without blocking the event loop."""
+        return await self.run_io(_read_text, path)
+
+    async def write_text(self, path, text):
+        """Write a UTF-8 text file without blocking the event loop and return its path."""
+        return await self.run_io(_write_text, path, text)
+
+    async def convert_file(self, input_path, output_path, conversion_function=convert_bottom_to_top, **kwargs):
+        """
+        Read, convert and write an HTML file.
+
+        Args:
+            input_path (str): The path to the HTML file to convert
+            output_path (str): The path to save the converted HTML file to
+            conversion_function (function, optional): The conversion function. Defaults to convert_bottom_to_top.
+            **kwargs: Additional arguments to pass to the conversion function
+
+        Returns:
+            str: The path to the saved file
+        """
+        html_string = await self.read_text(input_path)
+        converted_html = await self.convert(html_string, conversion_function, **kwargs)
+        return await self.write_text(output_path, converted_html)
+
+    async def load_html_from_file(self, file_path):
+        """Run load_html_from_file without blocking the event loop."""
+        return await self.run_io(load_html_from_file, file_path)
+
+    async def save_html_to_file(self, html_string, function_name="converted", timestamp=None):
+        """Run save_html_to_file without blocking the event loop."""
+        return await self.run_io(save_html_to_file, html_string, function_name, timestamp)
+
+    async def save_original_html(self, html_string, timestamp=None):
+        """Run save_original_html without blocking the event loop."""
+        return await self.run_io(save_original_html, html_string, timestamp)
+
+    async def aclose(self):
+        """Wait for the running work and shut the pools down."""
+        self._closed = True
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._executor.shutdown)
+        await loop.run_in_executor(None, self._io_executor.shutdown)
+
+
+def _close_default_service_on_shutdown(loop):
+    """
+    Close the default service of a loop when the loop shuts down its default executor.
+
+    asyncio.run awaits loop.shutdown_default_executor before it closes the loop, so the pools
+    of the default service are shut down with it instead of being left behind by every run.
+    """
+    shutdown_default_executor = loop.shutdown_default_executor
+
+    async def shutdown_executors(*args, **kwargs):
+        service = _default_services.pop(loop, None)
+        if service is not None and not service._closed:
+            await service.aclose()
+        await shutdown_default_executor(*args, **kwargs)
+
+    loop.shutdown_default_executor = shutdown_executors
+
+
+def get_default_service():
+    """
+    Return the default service of the running event loop, creating it on first use.
+
+    The service is closed when the loop shuts down, e.g. at the end of asyncio.run.
+
+    Returns:
+        ConversionService: The service
+    """
+    loop = asyncio.get_running_loop()
+    service = _default_services.get(loop)
+    if service is None or service._closed:
+        if service is None:
+            _close_default_service_on_shutdown(loop)
+        service = ConversionService()
+        _default_services[loop] = service
+    return service
+
+
+async def convert_async(html_string, conversion_function=convert_bottom_to_top, service=None, **kwargs):
+    """
+    Convert an HTML string without blocking the event loop.
+
+    Args:
+        html_string (str): The HTML code to convert
+        conversion_function (function, optional): The conversion function. Defaults to convert_bottom_to_top.
+        service (ConversionService, optional): The service to run the conversion with. Defaults
+                                               to the default service of the event loop.
+        **kwargs: Additional arguments to pass to the conversion function
+
+    Returns:
+        str: The converted HTML code
+
+    Raises:
+        asyncio.QueueFull: If the service has too many waiting requests
+    """
+    service = service or get_default_service()
+    return await service.convert(html_string, conversion_function, **kwargs)
+
+
+async def convert_file_async(input_path, output_path, conversion_function=convert_bottom_to_top, service=None,
+                             **kwargs):
+    """
+    Read, convert and write an HTML file without blocking the event loop.
+
+    Args:
+        input_path (str): The path to the HTML file to convert
+        output_path (str): The path to save the converted HTML file to
+        conversion_function (function, optional): The conversion function. Defaults to convert_bottom_to_top.
+        service (ConversionService, optional): The service to run the conversion with. Defaults
+                                               to the default service of the event loop.
+        **kwargs: Additional arguments to pass to the conversion function
+
+    Returns:
+        str: The path to the saved file
+    """
+    service = service or get_default_service()
+    return await service.convert_file(input_path, output_path, conversion_function, **kwargs)
@@ -0,0 +1,356 @@
+"""
+Command-line interface for HTML to JasperReport conversion.
+
+This module runs the conversions of the notebooks without a Jupyter kernel and prints a
+JSON summary with one entry per file, so it can be used from schedulers and scripts.
+
+Usage:
+    python -m shared.cli convert "data/original/*.html" --offset-x 3 --jobs 4
+    python -m shared.cli offset page.html --offset-y -5 --output-dir out
+    python -m shared.cli convert "data/original/*.html" --mmap
+    python -m shared.cli extract-positions "data/original/*.html"
+    python -m shared.cli extract-images "data/original/*.html" --output-dir out
+    python -m shared.cli to-jrxml page.html --output-dir reports
+    python -m shared.cli to-jrxml "data/original/*.html" --page-profile auto --jobs 4
+    python -m shared.cli bind-fields "reports/*.jrxml" --rules rules.json --output-dir templates
+    python -m shared.cli batch data/original --function offset --incremental
+    python -m shared.cli fixtures --articles 1000000 --format sqlite --output-dir data/fixtures
+    python -m shared.cli convert "data/original/*.html" --stats --profile
+    find data -name "*.html" | python -m shared.cli convert -
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+from shared.html_utils import (
+    apply_offset, apply_offset_file, batch_convert_folder, convert_bottom_to_top, convert_bottom_to_top_file,
+    extract_positions, read_html_file, run_file_tasks
+)
+from shared.fixtures import DEFAULT_BATCH_SIZE, load_sqlite_fixtures, write_csv_fixtures, write_sql_fixtures
+from shared.images import extract_images_file
+from shared.instrumentation import record
+from shared.jasper_xml import convert_html_file_to_jasper
+from shared.jrxml_bindings import bind_jrxml_file
+from shared.mapped_html import apply_offset_mapped_file, convert_bottom_to_top_mapped_file
+from shared.page_profiles import AUTO_PAGE_PROFILE, PAGE_PROFILES
+
+# Conversion functions of the batch command by name
+BATCH_FUNCTIONS = {
+    'convert': convert_bottom_to_top,
+    'offset': apply_offset,
+}
+
+
+def _extract_positions_file(input_path, output_path):
+    """
+    Extract the positions of an HTML file and save them as JSON.
+
+    Args:
+        input_path (str): The path to the HTML file
+        output_path (str): The path to the JSON file to write
+
+    Returns:
+        dict: The number of positions
+    """
+    positions = extract_positions(read_html_file(input_path))
+    with open(output_path, 'w', encoding='utf-8') as file:
+        json.dump(positions, file, indent=2)
+    return {'positions': len(positions)}
+
+
+def _jrxml_file(input_path, output_path, **kwargs):
+    """
+    Convert an HTML file to a JRXML file.
+
+    Args:
+        input_path (str): The path to the HTML file
+        output_path (str): The path to the JRXML file to write
+        **kwargs: Arguments of convert_html_file_to_jasper
+
+    Returns:
+        dict: The number of elements written
+    """
+    element_count = convert_html_file_to_jasper(input_path, output_path, **kwargs)
+    if element_count < 0:
+        raise ValueError("the HTML could not be parsed")
+    return {'elements': element_count}
+
+
+# Fixture writer and output name of the fixtures command by format
+FIXTURE_FORMATS = {
+    'sql': (write_sql_fixtures, 'fixtures.sql'),
+    'csv': (write_csv_fixtures, ''),
+    'sqlite': (load_sqlite_fixtures, 'fixtures.sqlite'),
+}
+
+
+def _write_fixtures(args):
+    """
+    Write fixture data for the fixtures command.
+
+    Args:
+        args (argparse.Namespace): The parsed command-line arguments
+
+    Returns:
+        dict: The result with the output path and the row counts or statement count
+    """
+    write_function, output_name = FIXTURE_FORMATS[args.format]
+    output_path = os.path.join(args.output_dir, output_name) if output_name else args.output_dir
+    os.makedirs(args.output_dir, exist_ok=True)
+    start_time = time.perf_counter()
+    result = {'input': None, 'output': output_path, 'status': 'converted', 'error': None}
+    try:
+        value = write_function(output_path, args.articles, seed=args.seed, batch_size=args.batch_size)
+        result.update(value if isinstance(value, dict) else {'statements': value})
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = time.perf_counter() - start_time
+    return result
+
+
+# File function, output file suffix and argument names of the file commands
+FILE_COMMANDS = {
+    'convert': (convert_bottom_to_top_file, '.html', ('offset_x', 'offset_y')),
+    'offset': (apply_offset_file, '.html', ('offset_x', 'offset_y')),
+    'extract-positions': (_extract_positions_file, '.positions.json', ()),
+    'extract-images': (extract_images_file, '.html', ('image_dir',)),
+    'to-jrxml': (_jrxml_file, '.jrxml', ('scale_factor_x', 'scale_factor_y', 'convert_bottom', 'merge_lines',
+                                        'shared_styles', 'image_dir', 'page_profile')),
+    'bind-fields': (bind_jrxml_file, '.jrxml', ('rules',)),
+}
+
+# File functions of the commands that can read memory-mapped files with --mmap
+MAPPED_FILE_FUNCTIONS = {
+    'convert': convert_bottom_to_top_mapped_file,
+    'offset': apply_offset_mapped_file,
+}
+
+
+def expand_inputs(patterns, stdin=None):
+    """
+    Expand file arguments to a sorted list of unique paths.
+
+    Glob patterns are expanded, other arguments are kept as given so missing files are
+    reported. A single "-" or no arguments read one path or pattern per line from stdin.
+
+    Args:
+        patterns (list): The file arguments
+        stdin (file, optional): The stream to read paths from. Defaults to sys.stdin.
+
+    Returns:
+        list: The paths of the input files
+    """
+    if not patterns or patterns == ['-']:
+        stdin = sys.stdin if stdin is None else stdin
+        patterns = [line.strip() for line in stdin if line.strip()]
+
+    paths = set()
+    for pattern in patterns:
+        matches = glob.glob(pattern, recursive=True) if glob.has_magic(pattern) else [pattern]
+        paths.update(os.path.normpath(path) for path in matches)
+    return sorted(paths)
+
+
+def _output_tasks(input_paths, output_dir, suffix):
+    """
+    Create the (input, output) tasks of a file command.
+
+    Args:
+        input_paths (list): The paths of the input files
+        output_dir (str): The folder to write the outputs to
+        suffix (str): The suffix of the output files
+
+    Returns:
+        tuple: The tasks and the results of inputs that cannot be processed
+    """
+    tasks = []
+    failed = []
+    seen_outputs = set()
+    for input_path in input_paths:
+        output_path = os.path.join(output_dir, os.path.splitext(os.path.basename(input_path))[0] + suffix)
+        error = None
+        if not os.path.isfile(input_path):
+            error = "FileNotFoundError: no such file"
+        elif output_path in seen_outputs or os.path.abspath(output_path) == os.path.abspath(input_path):
+            error = f"ValueError: output {output_path} would overwrite another file"
+        if error:
+            failed.append({'input': input_path, 'output': None, 'status': 'error', 'error': error, 'seconds': 0.0})
+        else:
+            seen_outputs.add(output_path)
+            tasks.append((input_path, output_path))
+    return tasks, failed
+
+
+def build_summary(command, results, seconds):
+    """
+    Build the JSON summary of a command.
+
+    Args:
+        command (str): The name of the command
+        results (list): The per-file results
+        seconds (float): The wall time of the command
+
+    Returns:
+        dict: The summary with command, status counts, seconds and files
+    """
+    counts = {}
+    for result in results:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    return {'command': command, 'counts': counts, 'seconds': seconds, 'files': results}
+
+
+def run_command(args):
+    """
+    Run a parsed command.
+
+    Args:
+        args (argparse.Namespace): The parsed command-line arguments
+
+    Returns:
+        dict: The summary of the command, with the report of shared.instrumentation.record as
+              instrumentation if --stats or --profile is given
+    """
+    if args.stats or args.profile:
+        with record(profile=args.profile, trace_memory=args.profile) as recorder:
+            summary = _run_command(args)
+        summary['instrumentation'] = recorder.report()
+        return summary
+    return _run_command(args)
+
+
+def _run_command(args):
+    """Run a parsed command without instrumentation."""
+    start_time = time.perf_counter()
+
+    if args.command == 'fixtures':
+        results = [_write_fixtures(args)]
+    elif args.command == 'batch':
+        kwargs = {'offset_x': args.offset_x, 'offset_y': args.offset_y}
+        results = batch_convert_folder(args.input_folder, args.output_dir, BATCH_FUNCTIONS[args.function],
+                                       workers=args.jobs, timestamp=args.timestamp,
+                                       incremental=args.incremental, **kwargs)
+    else:
+        file_function, suffix, argument_names = FILE_COMMANDS[args.command]
+        if getattr(args, 'mmap', False):
+            file_function = MAPPED_FILE_FUNCTIONS[args.command]
+        os.makedirs(args.output_dir, exist_ok=True)
+        input_paths = expand_inputs(args.files)
+        tasks, failed = _output_tasks(input_paths, args.output_dir, suffix)
+        # Unset options keep the defaults of the file function
+        kwargs = {name: getattr(args, name) for name in argument_names if getattr(args, name) is not None}
+        results = run_file_tasks(tasks, file_function, workers=args.jobs, **kwargs) + failed
+        order = {input_path: index for index, input_path in enumerate(input_paths)}
+        results.sort(key=lambda result: order[result['input']])
+
+    return build_summary(args.command, results, time.perf_counter() - start_time)
+
+
+def build_parser():
+    """
+    Build the argument parser of the command-line interface.
+
+    Returns:
+        argparse.ArgumentParser: The parser
+    """
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--output-dir', default='data/output', help='folder for the output files (default: data/output)')
+    common.add_argument('--jobs', '-j', type=int, default=1, help='number of worker processes (default: 1)')
+    common.add_argument('--summary', metavar='FILE', help='write the JSON summary to FILE instead of stdout')
+    common.add_argument('--stats', action='store_true',
+                        help='add the time, sizes and elements of every conversion stage to the summary')
+    common.add_argument('--profile', action='store_true',
+                        help='like --stats, with a cProfile profile and the peak memory of every file')
+
+    files = argparse.ArgumentParser(add_help=False)
+    files.add_argument('files', nargs='*', metavar='FILE',
+                       help='HTML files or glob patterns; "-" or none reads paths from stdin')
+
+    offsets = argparse.ArgumentParser(add_help=False)
+    offsets.add_argument('--offset-x', type=int, default=0, help='horizontal offset in pixels (default: 0)')
+    offsets.add_argument('--offset-y', type=int, default=0, help='vertical offset in pixels (default: 0)')
+
+    mapped = argparse.ArgumentParser(add_help=False)
+    mapped.add_argument('--mmap', action='store_true',
+                        help='memory-map the input files instead of reading them in chunks')
+
+    parser = argparse.ArgumentParser(prog='python -m shared.cli', description=__doc__.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('convert', parents=[common, files, offsets, mapped],
+                          help='convert bottom positions to top positions')
+    subparsers.add_parser('offset', parents=[common, files, offsets, mapped],
+                          help='apply offsets to left and top positions')
+    subparsers.add_parser('extract-positions', parents=[common, files], help='extract positions as JSON files')
+
+    images = subparsers.add_parser('extract-images', parents=[common, files],
+                                   help='move embedded data URI images into shared image files')
+    images.add_argument('--image-dir', help='folder for the image files (default: images in the output folder)')
+
+    jrxml = subparsers.add_parser('to-jrxml', parents=[common, files], help='convert HTML files to JRXML reports')
+    jrxml.add_argument('--scale-factor-x', type=float, help='horizontal scale factor (default: fit every page)')
+    jrxml.add_argument('--scale-factor-y', type=float, help='vertical scale factor (default: fit every page)')
+    jrxml.add_argument('--keep-bottom', dest='convert_bottom', action='store_false',
+                       help='do not convert bottom positions in the HTML first')
+    jrxml.add_argument('--merge-lines', action='store_true',
+                       help='merge text fragments of the same line into one element')
+    jrxml.add_argument('--inline-fonts', dest='shared_styles', action='store_false',
+                       help='write the font on every element instead of shared report styles')
+    jrxml.add_argument('--image-dir', help='move embedded data URI images to files in this folder')
+    jrxml.add_argument('--page-profile', choices=[AUTO_PAGE_PROFILE] + list(PAGE_PROFILES),
+                       help='report page size, "auto" detects it per file from the first page container '
+                            '(default: default, A4)')
+
+    bind = subparsers.add_parser('bind-fields', parents=[common, files],
+                                 help='bind static texts of JRXML files to parameters and fields by rules')
+    bind.add_argument('--rules', required=True, metavar='FILE',
+                      help='JSON file with the binding rules, see shared/jrxml_bindings.py')
+
+    batch = subparsers.add_parser('batch', parents=[common, offsets], help='convert all HTML files of a folder')
+    batch.add_argument('input_folder', help='folder containing the HTML files')
+    batch.add_argument('--function', choices=sorted(BATCH_FUNCTIONS), default='convert',
+                       help='conversion function (default: convert)')
+    batch.add_argument('--incremental', action='store_true', help='skip unchanged files using the manifest')
+    batch.add_argument('--timestamp', help='timestamp for the output file names (default: start time)')
+
+    fixtures = subparsers.add_parser('fixtures', parents=[common],
+                                     help='generate Company, Articles and ArticleDataRows fixture data')
+    fixtures.add_argument('--articles', type=int, default=1000, help='number of articles (default: 1000)')
+    fixtures.add_argument('--format', choices=sorted(FIXTURE_FORMATS), default='sql',
+                          help='SQL script, one CSV file per table or SQLite database (default: sql)')
+    fixtures.add_argument('--seed', type=int, default=0, help='seed of the random values (default: 0)')
+    fixtures.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                          help=f'rows per INSERT or write (default: {DEFAULT_BATCH_SIZE})')
+
+    return parser
+
+
+def main(argv=None):
+    """
+    Run the command-line interface.
+
+    Args:
+        argv (list, optional): The command-line arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        int: The exit code, 1 if any file failed
+    """
+    args = build_parser().parse_args(argv)
+
+    summary = run_command(args)
+    summary_json = json.dumps(summary, indent=2)
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as file:
+            file.write(summary_json + '\n')
+    else:
+        print(summary_json)
+
+    return 1 if summary['counts'].get('error') else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
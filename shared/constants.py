@@ -20,6 +20,19 @@ JASPER_MARGIN_RIGHT = 20
 JASPER_MARGIN_BOTTOM = 20
 JASPER_MARGIN_LEFT = 20
 
+# Paper sizes in points (portrait) of the predefined page profiles, see shared/page_profiles.py
+JASPER_PAPER_SIZES = {
+    'a4': (595, 842),
+    'letter': (612, 792),
+    'legal': (612, 1008),
+    'a3': (842, 1191),
+    'a5': (420, 595),
+}
+
+# CSS pixels per point, used for the HTML size of the predefined page profiles
+HTML_PIXELS_PER_POINT = 96 / 72
+
 # Calculate scale factors for converting between HTML and JasperReport dimensions
+# (the factors of the default page profile)
 SCALE_FACTOR_X = (JASPER_PAGE_WIDTH - JASPER_MARGIN_LEFT - JASPER_MARGIN_RIGHT) / HTML_WIDTH
 SCALE_FACTOR_Y = (JASPER_PAGE_HEIGHT - JASPER_MARGIN_TOP - JASPER_MARGIN_BOTTOM) / HTML_HEIGHT
\ No newline at end of file
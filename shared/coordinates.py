@@ -0,0 +1,179 @@
+"""
+Coordinate transforms for HTML to JasperReport conversion.
+
+This module collects the boxes of all elements (left, top, bottom, width, height) into NumPy
+arrays and applies the bottom to top flip, the offsets and the HTML to JasperReport scaling
+as one batched operation. All position math of the conversion is defined here.
+"""
+
+from collections import namedtuple
+from shared.constants import HTML_HEIGHT, SCALE_FACTOR_X, SCALE_FACTOR_Y
+from shared.page_profiles import get_page_profile
+from shared.stylesheet import parse_px
+
+# Try to import NumPy, but don't fail if it's not installed
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Box properties in the order of the BoxArrays fields
+BOX_PROPERTIES = ('left', 'top', 'bottom', 'width', 'height')
+
+# Element IDs and one float array per box property; missing values are NaN
+BoxArrays = namedtuple('BoxArrays', ['ids'] + list(BOX_PROPERTIES))
+
+
+def _require_numpy():
+    """Raise an ImportError if NumPy is not installed."""
+    if np is None:
+        raise ImportError("NumPy is required for the coordinate transforms. Install it with 'pip install numpy'.")
+
+
+def boxes_from_positions(positions):
+    """
+    Collect position dictionaries into box arrays.
+
+    Args:
+        positions (list): Dictionaries with 'id' and pixel values as floats, as returned by
+                          extract_positions or Stylesheet.position
+
+    Returns:
+        BoxArrays: The boxes with NaN for missing values
+    """
+    _require_numpy()
+    nan = float('nan')
+    columns = [
+        np.array([position.get(prop, nan) for position in positions], dtype=np.float64)
+        for prop in BOX_PROPERTIES
+    ]
+    return BoxArrays([position.get('id') for position in positions], *columns)
+
+
+def boxes_from_styles(css_styles):
+    """
+    Collect CSS styles into box arrays.
+
+    Args:
+        css_styles (dict): A dictionary with element IDs as keys and style dictionaries as values,
+                           as returned by extract_css_styles or Stylesheet.id_styles
+
+    Returns:
+        BoxArrays: The boxes with NaN for missing values
+    """
+    _require_numpy()
+    nan = float('nan')
+    styles = list(css_styles.values())
+    columns = []
+    for prop in BOX_PROPERTIES:
+        values = [parse_px(style.get(prop)) for style in styles]
+        columns.append(np.array([nan if value is None else value for value in values], dtype=np.float64))
+    return BoxArrays(list(css_styles), *columns)
+
+
+def transform_boxes(boxes, bottom_to_top=False, offset_x=0, offset_y=0, scale_x=1.0, scale_y=1.0,
+                    html_height=HTML_HEIGHT):
+    """
+    Flip, offset and scale all boxes at once.
+
+    The top of a box without top value is computed from its bottom value if bottom_to_top is
+    set. Offsets are applied in HTML pixels before scaling. Bottom values of boxes that were
+    flipped are set to NaN, the others are only scaled. The scale factors and the page height
+    can be given per box, so boxes of pages with different sizes are transformed in one batch.
+
+    Args:
+        boxes (BoxArrays): The boxes to transform
+        bottom_to_top (bool, optional): Compute missing top values from bottom values. Defaults to False.
+        offset_x (float, optional): Horizontal offset (positive = right, negative = left). Defaults to 0.
+        offset_y (float, optional): Vertical offset (positive = down, negative = up). Defaults to 0.
+        scale_x (float or sequence, optional): Horizontal scale factor. Defaults to 1.0.
+        scale_y (float or sequence, optional): Vertical scale factor. Defaults to 1.0.
+        html_height (float or sequence, optional): The height of the HTML page the bottom values
+                                                   refer to. Defaults to HTML_HEIGHT.
+
+    Returns:
+        BoxArrays: The transformed boxes
+    """
+    _require_numpy()
+    scale_x, scale_y, html_height = (np.asarray(value, dtype=np.float64) for value in (scale_x, scale_y, html_height))
+    top = boxes.top
+    bottom = boxes.bottom * scale_y
+    if bottom_to_top:
+        flipped = np.isnan(top) & ~np.isnan(boxes.bottom)
+        top = np.where(flipped, html_height - boxes.bottom, top)
+        bottom[flipped] = np.nan
+
+    return BoxArrays(
+        boxes.ids,
+        (boxes.left + offset_x) * scale_x,
+        (top + offset_y) * scale_y,
+        bottom,
+        boxes.width * scale_x,
+        boxes.height * scale_y,
+    )
+
+
+def html_to_jasper_boxes(boxes, offset_x=0, offset_y=0, html_height=HTML_HEIGHT,
+                         scale_x=SCALE_FACTOR_X, scale_y=SCALE_FACTOR_Y, page_profile=None):
+    """
+    Transform HTML boxes to JasperReport coordinates.
+
+    With a page profile, its HTML height and precomputed scale factors are used instead of
+    html_height, scale_x and scale_y.
+
+    Args:
+        boxes (BoxArrays): The boxes in HTML pixels
+        offset_x (float, optional): Horizontal offset in HTML pixels. Defaults to 0.
+        offset_y (float, optional): Vertical offset in HTML pixels. Defaults to 0.
+        html_height (float, optional): The height of the HTML page. Defaults to HTML_HEIGHT.
+        scale_x (float, optional): Horizontal scale factor. Defaults to SCALE_FACTOR_X.
+        scale_y (float, optional): Vertical scale factor. Defaults to SCALE_FACTOR_Y.
+        page_profile (str or PageProfile, optional): The page profile or its name (see
+                                                     shared.page_profiles). Defaults to None.
+
+    Returns:
+        BoxArrays: The boxes in JasperReport units with top values for all positioned boxes
+    """
+    if page_profile is not None:
+        profile = get_page_profile(page_profile)
+        html_height, scale_x, scale_y = profile.html_height, profile.scale_x, profile.scale_y
+    return transform_boxes(boxes, bottom_to_top=True, offset_x=offset_x, offset_y=offset_y,
+                           scale_x=scale_x, scale_y=scale_y, html_height=html_height)
+
+
+def boxes_to_positions(boxes):
+    """
+    Write box arrays back to position dictionaries.
+
+    Args:
+        boxes (BoxArrays): The boxes
+
+    Returns:
+        list: A list of dictionaries with element IDs and their set (non-NaN) values as floats
+    """
+    _require_numpy()
+    columns = [getattr(boxes, prop).tolist() for prop in BOX_PROPERTIES]
+    positions = []
+    for index, element_id in enumerate(boxes.ids):
+        position = {'id': element_id}
+        for prop, column in zip(BOX_PROPERTIES, columns):
+            value = column[index]
+            # NaN is the only value not equal to itself
+            if value == value:
+                position[prop] = value
+        positions.append(position)
+    return positions
+
+
+def transform_positions(positions, **kwargs):
+    """
+    Flip, offset and scale a list of position dictionaries.
+
+    Args:
+        positions (list): Dictionaries with 'id' and pixel values as floats
+        **kwargs: Arguments of transform_boxes
+
+    Returns:
+        list: The transformed position dictionaries
+    """
+    return boxes_to_positions(transform_boxes(boxes_from_positions(positions), **kwargs))
@@ -0,0 +1,417 @@
+"""
+CSS position rewrite engine for HTML to JasperReport conversion.
+
+This module contains the single-pass engine that rewrites the `bottom`, `top` and `left`
+values inside the `<style>` blocks of an HTML document, for strings as well as for streams.
+Bottom values are flipped against the height of the page container the style block is in.
+`convert_bottom_to_top` and `apply_offset` in shared/html_utils.py as well as the entry
+point in html_converter.py are built on top of it.
+"""
+
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from shared.constants import HTML_HEIGHT
+from shared.instrumentation import html_characters, stage
+from shared.pages import iter_page_segments, iter_pages
+
+# Precompiled patterns for style blocks and the CSS rules inside them
+STYLE_OPEN_TAG_PATTERN = re.compile(r'<style[^>]*>')
+STYLE_CLOSE_TAG = '</style>'
+
+# Number of characters read at once by the streaming rewrite
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# Properties span returned once all rules of a style block are consumed
+_NO_MORE_RULES = (sys.maxsize, sys.maxsize)
+
+
+def iter_style_blocks(html_string):
+    """
+    Locate the content of all style blocks in an HTML string.
+
+    The blocks are found with plain string searches, so large payloads outside of
+    style blocks (e.g. base64 page images) are skipped at memchr speed. The result is the
+    same as matching `<style[^>]*>(.*?)</style>` with re.DOTALL.
+
+    Args:
+        html_string (str): The HTML string to search
+
+    Yields:
+        tuple: The start and end index of the content of each style block
+    """
+    position = html_string.find('<style')
+    while position != -1:
+        open_tag_match = STYLE_OPEN_TAG_PATTERN.match(html_string, position)
+        if not open_tag_match:
+            return
+        content_end = html_string.find(STYLE_CLOSE_TAG, open_tag_match.end())
+        if content_end == -1:
+            return
+        yield open_tag_match.end(), content_end
+        position = html_string.find('<style', content_end + len(STYLE_CLOSE_TAG))
+
+
+def iter_css_rules(css_string, start=0, end=None):
+    """
+    Tokenize the CSS rules between two indices of a string.
+
+    The rules are the same as the matches of `([^{]+)\\{([^}]+)\\}`: the properties of a rule
+    run from the first `{` after the selector to the next `}`.
+
+    Args:
+        css_string (str): The string containing the CSS
+        start (int, optional): The index to start tokenizing at. Defaults to 0.
+        end (int, optional): The index to stop tokenizing at. Defaults to the end of the string.
+
+    Yields:
+        tuple: The start and end index of the properties of each rule
+    """
+    if end is None:
+        end = len(css_string)
+
+    position = start
+    while position < end:
+        # A selector never starts with an opening brace
+        if css_string[position] == '{':
+            position += 1
+            continue
+        brace = css_string.find('{', position, end)
+        if brace == -1:
+            return
+        close = css_string.find('}', brace + 1, end)
+        if close == -1:
+            return
+        if close == brace + 1:
+            # Empty rules are not rewritten, the next rule starts at the closing brace
+            position = close
+            continue
+        yield brace + 1, close
+        position = close + 1
+
+
+@lru_cache(maxsize=None)
+def _position_pattern(property_names):
+    """
+    Compile the pattern matching the given position properties in one pass.
+
+    Args:
+        property_names (tuple): The CSS property names to match (e.g. ('bottom', 'left'))
+
+    Returns:
+        re.Pattern: A pattern with the property name in group 1 and the pixel value in group 2
+    """
+    return re.compile(r'(%s):(\d+\.?\d*)px' % '|'.join(property_names))
+
+
+def _position_transforms(bottom_to_top, offset_x, offset_y, html_height):
+    """
+    Build the replacement functions for the requested rewrite.
+
+    Args:
+        bottom_to_top (bool): Whether `bottom` values are converted to `top` values
+        offset_x (int): Horizontal offset to apply to left values
+        offset_y (int): Vertical offset to apply to converted or existing top values
+        html_height (int): The height of the HTML page used to flip bottom values
+
+    Returns:
+        dict: A dictionary with property names as keys and functions returning the
+              replacement declaration for a pixel value as values
+    """
+    transforms = {}
+
+    if bottom_to_top:
+        def flip_bottom(bottom_px):
+            # Calculate top value: top = html_height - bottom
+            top_px = html_height - bottom_px
+            if offset_y != 0:
+                top_px += offset_y
+            return f'top:{top_px:.0f}px'
+        transforms['bottom'] = flip_bottom
+
+    if offset_x != 0:
+        transforms['left'] = lambda left_px: f'left:{left_px + offset_x:.0f}px'
+
+    # Existing top values are only shifted when no bottom conversion takes place
+    if offset_y != 0 and not bottom_to_top:
+        transforms['top'] = lambda top_px: f'top:{top_px + offset_y:.0f}px'
+
+    return transforms
+
+
+@stage(characters=html_characters)
+def rewrite_style_positions(html_string, bottom_to_top=False, offset_x=0, offset_y=0,
+                            html_height=HTML_HEIGHT):
+    """
+    Rewrite position values in all style blocks of an HTML string in a single pass.
+
+    Every CSS rule is rewritten the same way the original per-property regex passes did:
+    the first occurrence of a property in a rule determines the new value, and every
+    occurrence of that property in the rule is replaced with it.
+
+    Args:
+        html_string (str): The HTML string to rewrite
+        bottom_to_top (bool, optional): Convert `bottom` values to `top` values. Defaults to False.
+        offset_x (int, optional): Horizontal offset to apply to left values (positive = right, negative = left). Defaults to 0.
+        offset_y (int, optional): Vertical offset to apply to top values (positive = down, negative = up). Defaults to 0.
+        html_height (int, optional): The height of the HTML page used to flip bottom values.
+                                     Defaults to HTML_HEIGHT.
+
+    Returns:
+        str: The rewritten HTML string
+    """
+    transforms = _position_transforms(bottom_to_top, offset_x, offset_y, html_height)
+    if not transforms:
+        return html_string
+    return _rewrite_blocks(html_string, iter_style_blocks(html_string), transforms)
+
+
+def rewrite_css_positions(css_string, bottom_to_top=False, offset_x=0, offset_y=0, html_height=HTML_HEIGHT):
+    """
+    Rewrite position values in a CSS string, e.g. the content of one style block.
+
+    Args:
+        css_string (str): The CSS string to rewrite
+        bottom_to_top (bool, optional): Convert `bottom` values to `top` values. Defaults to False.
+        offset_x (int, optional): Horizontal offset to apply to left values (positive = right, negative = left). Defaults to 0.
+        offset_y (int, optional): Vertical offset to apply to top values (positive = down, negative = up). Defaults to 0.
+        html_height (int, optional): The height of the HTML page used to flip bottom values.
+                                     Defaults to HTML_HEIGHT.
+
+    Returns:
+        str: The rewritten CSS string
+    """
+    transforms = _position_transforms(bottom_to_top, offset_x, offset_y, html_height)
+    if not transforms:
+        return css_string
+    return _rewrite_blocks(css_string, [(0, len(css_string))], transforms)
+
+
+def _rewrite_blocks(html_string, blocks, transforms):
+    """
+    Rewrite the position values of the given blocks of a string.
+
+    Args:
+        html_string (str): The string to rewrite
+        blocks (iterable): The start and end index of every block to rewrite, in order
+        transforms (dict): The replacement functions returned by _position_transforms
+
+    Returns:
+        str: The rewritten string
+    """
+    position_pattern = _position_pattern(tuple(transforms))
+    property_markers = [f'{property_name}:' for property_name in transforms]
+    replacement_cache = {}
+
+    parts = []
+    last_end = 0
+
+    for content_start, content_end in blocks:
+        # Skip style blocks without any position value (e.g. @font-face blocks) at string search speed
+        if all(html_string.find(marker, content_start, content_end) == -1 for marker in property_markers):
+            continue
+
+        rules = iter_css_rules(html_string, content_start, content_end)
+        properties_start = properties_end = -1
+        rule_replacements = {}
+
+        for property_match in position_pattern.finditer(html_string, content_start, content_end):
+            match_start, match_end = property_match.span()
+
+            # Advance to the rule that ends after this property
+            while properties_end < match_end:
+                properties_start, properties_end = next(rules, _NO_MORE_RULES)
+                rule_replacements.clear()
+
+            # Position values in selectors and after the last rule are left untouched
+            if match_start < properties_start:
+                continue
+
+            property_name = property_match.group(1)
+            replacement = rule_replacements.get(property_name)
+            if replacement is None:
+                # The first occurrence in a rule determines the value for the whole rule
+                declaration = property_match.group(0)
+                replacement = replacement_cache.get(declaration)
+                if replacement is None:
+                    replacement = transforms[property_name](float(property_match.group(2)))
+                    replacement_cache[declaration] = replacement
+                rule_replacements[property_name] = replacement
+
+            parts.append(html_string[last_end:match_start])
+            parts.append(replacement)
+            last_end = match_end
+
+    if not parts:
+        return html_string
+
+    parts.append(html_string[last_end:])
+    return ''.join(parts)
+
+
+def _rewrite_page_blocks(task):
+    """
+    Rewrite the style blocks of one page.
+
+    Args:
+        task (tuple): The style blocks, bottom_to_top, offset_x, offset_y and the page height
+
+    Returns:
+        list: The rewritten style blocks
+    """
+    blocks, bottom_to_top, offset_x, offset_y, html_height = task
+    return [rewrite_css_positions(block, bottom_to_top, offset_x, offset_y, html_height) for block in blocks]
+
+
+@stage(characters=html_characters)
+def rewrite_page_positions(html_string, bottom_to_top=False, offset_x=0, offset_y=0,
+                           html_height=HTML_HEIGHT, workers=None):
+    """
+    Rewrite position values with every style block in the frame of its own page.
+
+    Bottom values of a style block inside a page container (e.g. `#p2` or `.page`) are flipped
+    against the height of that page; style blocks before the first page container use
+    html_height. The pages are rewritten independently, so with workers > 1 they are
+    distributed over a process pool. Only the style blocks are sent to the workers.
+
+    Args:
+        html_string (str): The HTML string to rewrite
+        bottom_to_top (bool, optional): Convert `bottom` values to `top` values. Defaults to False.
+        offset_x (int, optional): Horizontal offset to apply to left values (positive = right, negative = left). Defaults to 0.
+        offset_y (int, optional): Vertical offset to apply to top values (positive = down, negative = up). Defaults to 0.
+        html_height (int, optional): The height used outside of page containers. Defaults to HTML_HEIGHT.
+        workers (int, optional): The number of worker processes. Defaults to None (no pool).
+
+    Returns:
+        str: The rewritten HTML string
+    """
+    if not bottom_to_top:
+        # Page heights only matter for the flip
+        return rewrite_style_positions(html_string, bottom_to_top, offset_x, offset_y, html_height)
+
+    segments = list(iter_page_segments(html_string, html_height=html_height))
+    if len({height for _, _, _, height in segments}) == 1:
+        return rewrite_style_positions(html_string, bottom_to_top, offset_x, offset_y, segments[0][3])
+
+    # Group the style blocks by the page segment they start in
+    spans = []
+    tasks = []
+    segment_index = -1
+    segment_end = 0
+    for content_start, content_end in iter_style_blocks(html_string):
+        while content_start >= segment_end:
+            segment_index += 1
+            segment_end = segments[segment_index][1]
+            tasks.append(([], bottom_to_top, offset_x, offset_y, segments[segment_index][3]))
+        spans.append((content_start, content_end))
+        tasks[-1][0].append(html_string[content_start:content_end])
+
+    if workers and workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            rewritten_pages = list(executor.map(_rewrite_page_blocks, tasks))
+    else:
+        rewritten_pages = [_rewrite_page_blocks(task) for task in tasks]
+
+    parts = []
+    last_end = 0
+    for (content_start, content_end), block in zip(spans, (block for page in rewritten_pages for block in page)):
+        parts.append(html_string[last_end:content_start])
+        parts.append(block)
+        last_end = content_end
+    parts.append(html_string[last_end:])
+    return ''.join(parts)
+
+
+@stage()
+def stream_rewrite_style_positions(reader, writer, bottom_to_top=False, offset_x=0, offset_y=0,
+                                   html_height=HTML_HEIGHT, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Rewrite position values while copying HTML from a reader to a writer in chunks.
+
+    Only the style blocks are collected and rewritten with rewrite_style_positions; all other
+    content (e.g. base64 page images) is written through as soon as it is read, and the page
+    containers in it set the height bottom values are flipped against. Peak memory is bounded
+    by the chunk size plus the size of the largest style block or div tag, independent of the
+    size of the document. The output is the same as rewriting the whole string with
+    rewrite_page_positions.
+
+    Args:
+        reader (io.TextIOBase): The text stream to read the HTML from
+        writer (io.TextIOBase): The text stream to write the rewritten HTML to
+        bottom_to_top (bool, optional): Convert `bottom` values to `top` values. Defaults to False.
+        offset_x (int, optional): Horizontal offset to apply to left values (positive = right, negative = left). Defaults to 0.
+        offset_y (int, optional): Vertical offset to apply to top values (positive = down, negative = up). Defaults to 0.
+        html_height (int, optional): The height used outside of page containers. Defaults to HTML_HEIGHT.
+        chunk_size (int, optional): The number of characters to read at once. Defaults to DEFAULT_CHUNK_SIZE.
+
+    Returns:
+        int: The number of characters read
+    """
+    characters_read = 0
+
+    # Without a transform the content is copied unchanged
+    if not _position_transforms(bottom_to_top, offset_x, offset_y, html_height):
+        for chunk in iter(lambda: reader.read(chunk_size), ''):
+            writer.write(chunk)
+            characters_read += len(chunk)
+        return characters_read
+
+    buffer = ''
+    eof = False
+    # Index in the buffer up to which no closing tag can start
+    close_tag_search_start = 0
+    page_height = html_height
+
+    def write_through(text):
+        """Write content outside of style blocks and take over the height of its last page."""
+        nonlocal page_height
+        if bottom_to_top:
+            for page in iter_pages(text):
+                page_height = page.height
+        writer.write(text)
+
+    while True:
+        block_start = buffer.find('<style')
+        if block_start != -1:
+            open_tag_match = STYLE_OPEN_TAG_PATTERN.match(buffer, block_start)
+            if open_tag_match:
+                content_end = buffer.find(STYLE_CLOSE_TAG, max(open_tag_match.end(), close_tag_search_start))
+                if content_end != -1:
+                    block_end = content_end + len(STYLE_CLOSE_TAG)
+                    write_through(buffer[:block_start])
+                    writer.write(rewrite_style_positions(buffer[block_start:block_end], bottom_to_top,
+                                                         offset_x, offset_y, page_height))
+                    buffer = buffer[block_end:]
+                    close_tag_search_start = 0
+                    continue
+                close_tag_search_start = max(len(buffer) - len(STYLE_CLOSE_TAG) + 1, 0)
+
+            # The style block is not complete yet, write everything before it
+            if eof:
+                # Unterminated style blocks are left unchanged
+                writer.write(buffer)
+                return characters_read
+            write_through(buffer[:block_start])
+            buffer = buffer[block_start:]
+            close_tag_search_start = max(close_tag_search_start - block_start, 0)
+        else:
+            if eof:
+                writer.write(buffer)
+                return characters_read
+            # Keep a partial '<style' or an unfinished div tag, which can be a page container
+            keep_start = buffer.rfind('<')
+            unfinished = keep_start != -1 and buffer.find('>', keep_start) == -1
+            if not unfinished or (len(buffer) - keep_start >= len('<style')
+                                  and not buffer.startswith('<div', keep_start)):
+                keep_start = len(buffer)
+            write_through(buffer[:keep_start])
+            buffer = buffer[keep_start:]
+
+        chunk = reader.read(chunk_size)
+        if chunk:
+            characters_read += len(chunk)
+            buffer += chunk
+        else:
+            eof = True
@@ -0,0 +1,272 @@
+"""
+Compact element model for HTML to JasperReport conversion.
+
+This module turns an HTML document once into a list of ElementBox objects: typed boxes with
+float positions, the element text, the class that sets its font, its font and a reference
+to its page. The position extraction, the coordinate transforms and the JRXML generation
+work on these boxes instead of BeautifulSoup tags and CSS strings, so every value is parsed
+only once and the parsed tree can be released after the boxes are built.
+"""
+
+from shared.constants import HTML_HEIGHT, HTML_WIDTH
+from shared.coordinates import BOX_PROPERTIES, BoxArrays, transform_boxes
+from shared.html_utils import collect_elements, get_stylesheet, parse_html_cached
+from shared.pages import Page, find_page_element
+from shared.stylesheet import parse_px
+
+# Try to import NumPy, but don't fail if it's not installed
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Tags converted to text boxes, in the order they are collected
+TEXT_ELEMENT_TAGS = ('div', 'p', 'span')
+
+# Page of the elements outside of page containers
+DEFAULT_PAGE = Page(0, None, HTML_WIDTH, HTML_HEIGHT, None)
+
+
+class ElementBox:
+    """
+    A converted element: its kind, id, box in pixels, text, font class, font and page.
+
+    Box values that are not set are None. Fonts and pages are shared between boxes and must
+    not be modified.
+    """
+
+    __slots__ = ('kind', 'element_id', 'left', 'top', 'bottom', 'width', 'height',
+                 'text', 'style_class', 'font', 'page')
+
+    def __init__(self, kind, element_id=None, left=None, top=None, bottom=None, width=None, height=None,
+                 text='', style_class='', font=None, page=DEFAULT_PAGE):
+        """
+        Create a box.
+
+        Args:
+            kind (str): "text" or "image"
+            element_id (str, optional): The id of the element. Defaults to None.
+            left (float, optional): The left position in pixels. Defaults to None.
+            top (float, optional): The top position in pixels. Defaults to None.
+            bottom (float, optional): The bottom position in pixels. Defaults to None.
+            width (float, optional): The width in pixels. Defaults to None.
+            height (float, optional): The height in pixels. Defaults to None.
+            text (str, optional): The text of a text box or the source of an image. Defaults to ''.
+            style_class (str, optional): The class setting the font of the element. Defaults to ''.
+            font (dict, optional): The font as returned by Stylesheet.font. Defaults to None.
+            page (Page, optional): The page of the element. Defaults to DEFAULT_PAGE.
+        """
+        self.kind = kind
+        self.element_id = element_id
+        self.left = left
+        self.top = top
+        self.bottom = bottom
+        self.width = width
+        self.height = height
+        self.text = text
+        self.style_class = style_class
+        self.font = font
+        self.page = page
+
+    def __repr__(self):
+        values = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+        return f'ElementBox({values})'
+
+    def __eq__(self, other):
+        if not isinstance(other, ElementBox):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def moved(self, left, top, bottom, width, height):
+        """
+        Return a copy of the box with other box values.
+
+        Args:
+            left (float): The new left value or None
+            top (float): The new top value or None
+            bottom (float): The new bottom value or None
+            width (float): The new width or None
+            height (float): The new height or None
+
+        Returns:
+            ElementBox: The new box sharing text, font and page with this box
+        """
+        return ElementBox(self.kind, self.element_id, left, top, bottom, width, height,
+                          self.text, self.style_class, self.font, self.page)
+
+    def position(self):
+        """
+        Return the box values that are set.
+
+        Returns:
+            dict: The set values of left, top, bottom, width and height
+        """
+        position = {}
+        for prop in BOX_PROPERTIES:
+            value = getattr(self, prop)
+            if value is not None:
+                position[prop] = value
+        return position
+
+
+def font_class(stylesheet, class_names):
+    """
+    Return the class that sets the font of an element.
+
+    Args:
+        stylesheet (Stylesheet): The stylesheet of the document
+        class_names (iterable): The classes of the element
+
+    Returns:
+        str: The last class with a font property, or an empty string
+    """
+    for class_name in reversed(list(class_names)):
+        if any(prop.startswith('font') for prop in stylesheet.class_style(class_name)):
+            return class_name
+    return ''
+
+
+def _is_positioned(style):
+    """Return whether a computed style places the element with left and top or bottom."""
+    return 'left' in style and ('top' in style or 'bottom' in style)
+
+
+def _image_size_attribute(element, name):
+    """Return the width or height attribute of an img element in pixels, or None."""
+    value = element.get(name)
+    if value is None:
+        return None
+    value = value.strip()
+    if value.endswith('px'):
+        value = value[:-2]
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def build_element_boxes(html_string, include_images=True, html_height=HTML_HEIGHT, html_width=HTML_WIDTH):
+    """
+    Build the boxes of all converted elements of an HTML document.
+
+    Text elements (div, p, span) with an `#id` rule or a left and top/bottom position in their
+    computed style become text boxes, img elements image boxes with their source as text. The
+    boxes are ordered by page, then by tag in the order of TEXT_ELEMENT_TAGS and images last,
+    then in document order. Equal fonts and pages are shared between the boxes.
+
+    Args:
+        html_string (str): The HTML code to convert
+        include_images (bool, optional): Build boxes for img elements. Defaults to True.
+        html_height (float, optional): The height of the page of elements outside of page
+                                       containers. Defaults to HTML_HEIGHT.
+        html_width (float, optional): The width of the page of elements outside of page
+                                      containers. Defaults to HTML_WIDTH.
+
+    Returns:
+        list: The ElementBox objects, or None if the HTML could not be parsed
+    """
+    soup = parse_html_cached(html_string)
+    if not soup:
+        return None
+
+    stylesheet = get_stylesheet(html_string)
+    tags = TEXT_ELEMENT_TAGS + ('img',) if include_images else TEXT_ELEMENT_TAGS
+    elements = collect_elements(soup, stylesheet, tags=tags)
+
+    items = []
+    for tag in TEXT_ELEMENT_TAGS:
+        for styled in elements[tag]:
+            element_id = styled.element.get('id', '')
+            # Text elements are converted if they have their own id rule or are positioned
+            if (element_id and element_id in stylesheet.id_styles) or _is_positioned(styled.style):
+                items.append(('text', styled))
+    if include_images:
+        items.extend(('image', styled) for styled in elements['img'])
+
+    outside_page = DEFAULT_PAGE
+    if (html_width, html_height) != (DEFAULT_PAGE.width, DEFAULT_PAGE.height):
+        outside_page = DEFAULT_PAGE._replace(width=html_width, height=html_height)
+    page_cache = {}
+    pages = {}
+    fonts = {}
+    boxes = []
+    for kind, styled in items:
+        element = styled.element
+        page = find_page_element(element, page_cache)
+        if page is None:
+            page = outside_page
+        else:
+            page_element, (page_width, page_height) = page
+            page = pages.get(id(page_element))
+            if page is None:
+                page = Page(len(pages) + 1, page_element.get('id'), page_width, page_height, None)
+                pages[id(page_element)] = page
+
+        values = [parse_px(styled.style.get(prop)) for prop in BOX_PROPERTIES]
+        class_names = element.get('class') or ()
+        if kind == 'image':
+            for index, name in ((3, 'width'), (4, 'height')):
+                if values[index] is None:
+                    values[index] = _image_size_attribute(element, name)
+            boxes.append(ElementBox(kind, element.get('id'), *values, text=element.get('src', ''),
+                                    style_class=font_class(stylesheet, class_names), page=page))
+            continue
+
+        font = stylesheet.font(element.get('id'), class_names, element.get('style'))
+        font = fonts.setdefault(tuple(font.values()), font)
+        boxes.append(ElementBox(kind, element.get('id'), *values, text=element.get_text(),
+                                style_class=font_class(stylesheet, class_names), font=font, page=page))
+
+    # Pages in document order, the elements of a page in the order of the tags
+    boxes.sort(key=lambda box: box.page.number)
+    return boxes
+
+
+def element_boxes_to_arrays(element_boxes):
+    """
+    Collect element boxes into box arrays for the batched transforms.
+
+    Args:
+        element_boxes (list): The ElementBox objects
+
+    Returns:
+        BoxArrays: The boxes with NaN for missing values and the element ids
+    """
+    if np is None:
+        raise ImportError("NumPy is required for the coordinate transforms. Install it with 'pip install numpy'.")
+    nan = float('nan')
+    columns = [
+        np.array([nan if value is None else value for value in (getattr(box, prop) for box in element_boxes)],
+                 dtype=np.float64)
+        for prop in BOX_PROPERTIES
+    ]
+    return BoxArrays([box.element_id for box in element_boxes], *columns)
+
+
+def transform_element_boxes(element_boxes, bottom_to_top=False, offset_x=0, offset_y=0, scale_x=1.0,
+                            scale_y=1.0):
+    """
+    Flip, offset and scale element boxes, every box in the frame of its page.
+
+    Bottom values are flipped against the height of the page of each box. The scale factors
+    can be given per box.
+
+    Args:
+        element_boxes (list): The ElementBox objects
+        bottom_to_top (bool, optional): Compute missing top values from bottom values. Defaults to False.
+        offset_x (float, optional): Horizontal offset (positive = right, negative = left). Defaults to 0.
+        offset_y (float, optional): Vertical offset (positive = down, negative = up). Defaults to 0.
+        scale_x (float or sequence, optional): Horizontal scale factor. Defaults to 1.0.
+        scale_y (float or sequence, optional): Vertical scale factor. Defaults to 1.0.
+
+    Returns:
+        list: New ElementBox objects with the transformed values
+    """
+    boxes = transform_boxes(element_boxes_to_arrays(element_boxes), bottom_to_top, offset_x, offset_y,
+                            scale_x, scale_y, html_height=[box.page.height for box in element_boxes])
+    columns = [getattr(boxes, prop).tolist() for prop in BOX_PROPERTIES]
+    transformed = []
+    for box, values in zip(element_boxes, zip(*columns)):
+        # NaN is the only value not equal to itself
+        transformed.append(box.moved(*(value if value == value else None for value in values)))
+    return transformed
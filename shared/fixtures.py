@@ -0,0 +1,325 @@
+"""
+Fixture data for filling converted reports.
+
+The converted delivery note reports are filled from the tables Company, Articles and
+ArticleDataRows. This module generates rows for these tables, as generate_sql_inserts and
+generate_article_data_row_inserts of the old notebook did, but for any number of articles:
+the rows are generated lazily from a seeded random generator and written in batches, as
+multi-row INSERT statements, as CSV files or directly into a SQLite database. At most one
+batch per table is held in memory, however many rows are written.
+"""
+
+import csv
+import os
+import random
+import sqlite3
+
+# Number of value columns (value0 to value12) and size columns of ArticleDataRows
+VALUE_COLUMN_COUNT = 13
+SIZE_COLUMN_COUNT = 8
+
+# Maximum number of data rows per article
+MAX_ROWS_PER_ARTICLE = 3
+
+# Number of rows per INSERT statement, CSV write or SQLite executemany
+DEFAULT_BATCH_SIZE = 1000
+
+# Number of rows per SQLite transaction
+DEFAULT_TRANSACTION_ROWS = 100000
+
+DEFAULT_COMPANY_NAME = 'CompanyName'
+
+# Columns and their SQL types per table, in the order tables are filled
+TABLE_COLUMNS = {
+    'Company': (('id', 'INT PRIMARY KEY'), ('name', 'VARCHAR(255) NOT NULL')),
+    'Articles': (
+        ('id', 'INT PRIMARY KEY'),
+        ('article_name', 'VARCHAR(255) NOT NULL'),
+        ('article_rows_data_values_sum', 'INT NOT NULL'),
+        ('article_row_count_max', 'INT NOT NULL'),
+        ('article_row_count', 'INT NOT NULL'),
+    ),
+    'ArticleDataRows': (
+        ('id', 'INT PRIMARY KEY'),
+        ('article_id', 'INT'),
+        ('row_num', 'INT'),
+        ('row_name', 'VARCHAR(10)'),
+        ('row_data_values_sum', 'INT NOT NULL'),
+        ('data_count', 'INT NOT NULL'),
+        *((f'value{index}', 'VARCHAR(10)') for index in range(VALUE_COLUMN_COUNT)),
+        *((f'SizeHeader{index}', 'VARCHAR(10)') for index in range(SIZE_COLUMN_COUNT)),
+        ('ArticleNumValue', 'INT'),
+        ('ArticleColorValue', 'VARCHAR(20)'),
+        ('ArticleModellNameValue', 'VARCHAR(50)'),
+        ('ArticleCountValue', 'INT'),
+        *((f'ArticleSizeValue{index}', 'INT') for index in range(SIZE_COLUMN_COUNT)),
+        ('ArticleModellCode', 'VARCHAR(50)'),
+        ('ArticlePosValue', 'INT'),
+    ),
+}
+
+
+def create_table_statements():
+    """
+    Create the statements dropping and creating the fixture tables.
+
+    Returns:
+        list: The DROP TABLE and CREATE TABLE statements
+    """
+    statements = [f'DROP TABLE IF EXISTS {table};' for table in reversed(TABLE_COLUMNS)]
+    for table, columns in TABLE_COLUMNS.items():
+        definitions = [f'{column} {column_type}' for column, column_type in columns]
+        if table == 'ArticleDataRows':
+            definitions.append('FOREIGN KEY (article_id) REFERENCES Articles(id)')
+        statements.append(f'CREATE TABLE {table} ({", ".join(definitions)});')
+    return statements
+
+
+def iter_fixture_rows(articles, seed=0, max_rows_per_article=MAX_ROWS_PER_ARTICLE,
+                      company_name=DEFAULT_COMPANY_NAME):
+    """
+    Generate the rows of the fixture tables.
+
+    The company comes first, then every article followed by its data rows. The rows only
+    depend on the arguments, so the same seed always gives the same data.
+
+    Args:
+        articles (int): The number of articles
+        seed (int, optional): The seed of the random values. Defaults to 0.
+        max_rows_per_article (int, optional): The maximum number of data rows of an article.
+                                              Defaults to MAX_ROWS_PER_ARTICLE.
+        company_name (str, optional): The name of the company. Defaults to DEFAULT_COMPANY_NAME.
+
+    Yields:
+        tuple: The table name and the row as a tuple in the column order of TABLE_COLUMNS,
+               with None for NULL
+    """
+    # random() scaled to the range is several times faster than randrange
+    uniform = random.Random(seed).random
+    yield 'Company', (1, company_name)
+
+    row_id = 1
+    for article_id in range(1, articles + 1):
+        row_count = 1 + int(uniform() * max_rows_per_article)
+        rows = []
+        for row_num in range(1, row_count + 1):
+            data_count = 1 + int(uniform() * VALUE_COLUMN_COUNT)
+            values = [int(uniform() * 30) for _ in range(data_count)]
+            rows.append((
+                row_id, article_id, row_num, f'Row {chr(64 + row_num)}:', sum(values), data_count,
+                *(str(value) for value in values), *((None,) * (VALUE_COLUMN_COUNT - data_count)),
+                *(f'XL{1 + int(uniform() * 9)}' for _ in range(SIZE_COLUMN_COUNT)),
+                1000 + int(uniform() * 9000),
+                f'Color{1 + int(uniform() * 5)}',
+                f'Model{1 + int(uniform() * 5)}',
+                1 + int(uniform() * 10),
+                *(28 + int(uniform() * 11) for _ in range(SIZE_COLUMN_COUNT)),
+                f'Code{100 + int(uniform() * 401)}',
+                row_num,
+            ))
+            row_id += 1
+
+        yield 'Articles', (article_id, f'Artikel {article_id}', sum(row[4] for row in rows),
+                           max_rows_per_article, row_count)
+        for row in rows:
+            yield 'ArticleDataRows', row
+
+
+def iter_fixture_batches(articles, seed=0, batch_size=DEFAULT_BATCH_SIZE, **kwargs):
+    """
+    Generate the rows of the fixture tables in batches per table.
+
+    A batch of data rows is only yielded after the batches with the articles it refers to.
+
+    Args:
+        articles (int): The number of articles
+        seed (int, optional): The seed of the random values. Defaults to 0.
+        batch_size (int, optional): The maximum number of rows per batch. Defaults to DEFAULT_BATCH_SIZE.
+        **kwargs: Arguments of iter_fixture_rows
+
+    Yields:
+        tuple: The table name and a list of rows
+    """
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be positive, got {batch_size}")
+    batches = {table: [] for table in TABLE_COLUMNS}
+    for table, row in iter_fixture_rows(articles, seed, **kwargs):
+        batch = batches[table]
+        batch.append(row)
+        if len(batch) >= batch_size:
+            if table == 'ArticleDataRows' and batches['Articles']:
+                yield 'Articles', batches['Articles']
+                batches['Articles'] = []
+            yield table, batch
+            batches[table] = []
+    for table, batch in batches.items():
+        if batch:
+            yield table, batch
+
+
+def sql_literal(value):
+    """
+    Format a value as an SQL literal.
+
+    Args:
+        value: The value, None for NULL
+
+    Returns:
+        str: The literal
+    """
+    if value is None:
+        return 'NULL'
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return str(value)
+
+
+def iter_sql_inserts(articles, seed=0, batch_size=DEFAULT_BATCH_SIZE, include_schema=True, **kwargs):
+    """
+    Generate the fixture data as SQL statements with one multi-row INSERT per batch.
+
+    Args:
+        articles (int): The number of articles
+        seed (int, optional): The seed of the random values. Defaults to 0.
+        batch_size (int, optional): The maximum number of rows per INSERT. Defaults to DEFAULT_BATCH_SIZE.
+        include_schema (bool, optional): Start with the statements creating the tables. Defaults to True.
+        **kwargs: Arguments of iter_fixture_rows
+
+    Yields:
+        str: The statements, each ending with a semicolon
+    """
+    if include_schema:
+        yield from create_table_statements()
+    for table, batch in iter_fixture_batches(articles, seed, batch_size, **kwargs):
+        columns = ', '.join(column for column, _ in TABLE_COLUMNS[table])
+        values = ',\n'.join('(' + ', '.join(map(sql_literal, row)) + ')' for row in batch)
+        yield f'INSERT INTO {table} ({columns}) VALUES\n{values};'
+
+
+def _row_counts(batches):
+    """Consume (table, batch) pairs and return the number of rows per table."""
+    counts = {table: 0 for table in TABLE_COLUMNS}
+    for table, batch in batches:
+        counts[table] += len(batch)
+    return counts
+
+
+def write_sql_fixtures(output, articles, seed=0, batch_size=DEFAULT_BATCH_SIZE, include_schema=True, **kwargs):
+    """
+    Write the fixture data as an SQL script.
+
+    Args:
+        output (str or file): The path of the SQL file or a text stream to write to
+        articles (int): The number of articles
+        seed (int, optional): The seed of the random values. Defaults to 0.
+        batch_size (int, optional): The maximum number of rows per INSERT. Defaults to DEFAULT_BATCH_SIZE.
+        include_schema (bool, optional): Start with the statements creating the tables. Defaults to True.
+        **kwargs: Arguments of iter_fixture_rows
+
+    Returns:
+        int: The number of statements written
+    """
+    if isinstance(output, (str, os.PathLike)):
+        output_dir = os.path.dirname(output)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as file:
+            return write_sql_fixtures(file, articles, seed, batch_size, include_schema, **kwargs)
+
+    statement_count = 0
+    for statement in iter_sql_inserts(articles, seed, batch_size, include_schema, **kwargs):
+        output.write(statement + '\n')
+        statement_count += 1
+    return statement_count
+
+
+def write_csv_fixtures(folder, articles, seed=0, batch_size=DEFAULT_BATCH_SIZE, **kwargs):
+    """
+    Write the fixture data as one CSV file per table.
+
+    The files are named after the tables and have a header row; NULL is written as an
+    empty field.
+
+    Args:
+        folder (str): The folder to write the CSV files to
+        articles (int): The number of articles
+        seed (int, optional): The seed of the random values. Defaults to 0.
+        batch_size (int, optional): The number of rows written at once. Defaults to DEFAULT_BATCH_SIZE.
+        **kwargs: Arguments of iter_fixture_rows
+
+    Returns:
+        dict: The number of rows per table
+    """
+    os.makedirs(folder, exist_ok=True)
+    files = {}
+    try:
+        writers = {}
+        for table, columns in TABLE_COLUMNS.items():
+            files[table] = open(os.path.join(folder, f'{table}.csv'), 'w', encoding='utf-8', newline='')
+            writers[table] = csv.writer(files[table])
+            writers[table].writerow(column for column, _ in columns)
+
+        def write_batches():
+            for table, batch in iter_fixture_batches(articles, seed, batch_size, **kwargs):
+                writers[table].writerows(batch)
+                yield table, batch
+
+        return _row_counts(write_batches())
+    finally:
+        for file in files.values():
+            file.close()
+
+
+def load_sqlite_fixtures(database_path, articles, seed=0, batch_size=DEFAULT_BATCH_SIZE,
+                         transaction_rows=DEFAULT_TRANSACTION_ROWS, **kwargs):
+    """
+    Create the fixture tables in a SQLite database and fill them.
+
+    Existing fixture tables are replaced. The rows are inserted with one executemany per
+    batch and committed every transaction_rows rows. The database is written without
+    waiting for the disk (synchronous=OFF), as fixture databases can be generated again.
+
+    Args:
+        database_path (str): The path of the SQLite file
+        articles (int): The number of articles
+        seed (int, optional): The seed of the random values. Defaults to 0.
+        batch_size (int, optional): The number of rows per executemany. Defaults to DEFAULT_BATCH_SIZE.
+        transaction_rows (int, optional): The number of rows per transaction. Defaults to DEFAULT_TRANSACTION_ROWS.
+        **kwargs: Arguments of iter_fixture_rows
+
+    Returns:
+        dict: The number of rows per table
+    """
+    database_dir = os.path.dirname(database_path)
+    if database_dir:
+        os.makedirs(database_dir, exist_ok=True)
+
+    statements = {table: f'INSERT INTO {table} VALUES ({", ".join("?" * len(columns))})'
+                  for table, columns in TABLE_COLUMNS.items()}
+    connection = sqlite3.connect(database_path, isolation_level=None)
+    try:
+        connection.execute('PRAGMA synchronous = OFF')
+        connection.execute('BEGIN')
+        for statement in create_table_statements():
+            connection.execute(statement)
+
+        def insert_batches():
+            uncommitted = 0
+            for table, batch in iter_fixture_batches(articles, seed, batch_size, **kwargs):
+                connection.executemany(statements[table], batch)
+                uncommitted += len(batch)
+                if uncommitted >= transaction_rows:
+                    connection.execute('COMMIT')
+                    connection.execute('BEGIN')
+                    uncommitted = 0
+                yield table, batch
+
+        counts = _row_counts(insert_batches())
+        connection.execute('COMMIT')
+        return counts
+    except BaseException:
+        if connection.in_transaction:
+            connection.execute('ROLLBACK')
+        raise
+    finally:
+        connection.close()
@@ -7,7 +7,43 @@ This module contains reusable functions for parsing, manipulating, and convertin
 import re
 import os
 import datetime
+import hashlib
+import json
+import threading
+import time
+import warnings
+from collections import OrderedDict, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
 from shared.constants import HTML_HEIGHT
+from shared.css_rewrite import (
+    DEFAULT_CHUNK_SIZE, rewrite_page_positions, rewrite_style_positions, stream_rewrite_style_positions
+)
+from shared.instrumentation import (
+    current_recorder, file_size, html_characters, measure, record_document, recording_options, stage
+)
+from shared.page_profiles import resolve_page_profile
+from shared.stylesheet import Stylesheet, iter_style_contents
+
+# Precompiled patterns for extracting styles and pixel values
+CSS_ID_RULE_PATTERN = re.compile(r'#([\w]+)\s*{([^}]+)}')
+PX_VALUE_PATTERN = re.compile(r'(\d+\.?\d*)px')
+
+# Tags collected by extract_elements and collect_elements
+ELEMENT_TAGS = ('div', 'table', 'img', 'p', 'span')
+
+# An element of the document paired with its computed style
+StyledElement = namedtuple('StyledElement', ['element', 'style'])
+
+# Name of the manifest written to the output folder by incremental batch conversions
+BATCH_MANIFEST_FILENAME = "batch_manifest.json"
+
+# Limits of the document cache: number of entries and estimated size in characters
+DOCUMENT_CACHE_MAX_ENTRIES = 64
+DOCUMENT_CACHE_MAX_SIZE = 256 * 1024 * 1024
+
+# Estimated memory of a cached value relative to the length of its HTML string
+# (a BeautifulSoup tree takes about four times the memory of its source)
+CACHE_SIZE_FACTORS = {'soup': 4, 'stylesheet': 1, 'css_styles': 1}
 
 # Try to import BeautifulSoup, but don't fail if it's not installed
 try:
@@ -19,23 +55,198 @@ except ImportError:
         def __init__(self, *args, **kwargs):
             pass
 
-def parse_html(html_code):
+# lxml is optional, it is only used as a faster parser backend for large documents
+try:
+    import lxml  # noqa: F401
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+def _count_elements(elements):
+    """Return the number of elements in a dictionary of element lists."""
+    return sum(len(nodes) for nodes in elements.values())
+
+@stage(characters=html_characters)
+def parse_html(html_code, use_lxml=False):
     """
     Parse HTML code with BeautifulSoup.
     
     Args:
         html_code (str): The HTML code to parse
+        use_lxml (bool, optional): Use the lxml parser backend, which is considerably faster on
+                                   large documents. Falls back to html.parser if lxml is not
+                                   installed. Defaults to False.
         
     Returns:
         BeautifulSoup: The parsed HTML document
     """
+    parser = 'html.parser'
+    if use_lxml:
+        if LXML_AVAILABLE:
+            parser = 'lxml'
+        else:
+            print("Warning: lxml is not installed. Falling back to html.parser.")
+    
     try:
-        soup = BeautifulSoup(html_code, 'html.parser')
+        soup = BeautifulSoup(html_code, parser)
         return soup
     except Exception as e:
         print(f"Error parsing HTML code: {e}")
         return None
 
+class DocumentCache:
+    """
+    Bounded LRU cache for values derived from an HTML string (parsed documents, stylesheets).
+    
+    Entries are keyed by the kind of value and the SHA-256 hash of the HTML content, so equal
+    documents share their entries no matter where the string comes from. The least recently
+    used entries are evicted when the number of entries or their estimated size exceeds the
+    limits. Cached values are shared between callers and must not be modified.
+    """
+    
+    def __init__(self, max_entries=DOCUMENT_CACHE_MAX_ENTRIES, max_size=DOCUMENT_CACHE_MAX_SIZE):
+        """
+        Create an empty cache.
+        
+        Args:
+            max_entries (int, optional): The maximum number of entries. Defaults to DOCUMENT_CACHE_MAX_ENTRIES.
+            max_size (int, optional): The maximum estimated size of all entries in characters.
+                                      Defaults to DOCUMENT_CACHE_MAX_SIZE.
+        """
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def content_hash(html_string):
+        """
+        Return the SHA-256 hex digest of an HTML string.
+        
+        Args:
+            html_string (str): The HTML string
+        
+        Returns:
+            str: The hex digest of the UTF-8 encoded string
+        """
+        return hashlib.sha256(html_string.encode('utf-8', 'surrogatepass')).hexdigest()
+    
+    def get(self, kind, html_string, factory, *args):
+        """
+        Return the cached value for an HTML string or create it with the factory.
+        
+        Values the factory returns as None (e.g. failed parses) are not cached.
+        
+        Args:
+            kind (str): The kind of value, a key of CACHE_SIZE_FACTORS
+            html_string (str): The HTML string the value is derived from
+            factory (callable): Function creating the value from html_string and args
+            *args: Further arguments of the factory, part of the cache key
+        
+        Returns:
+            The cached or created value
+        """
+        key = (kind, self.content_hash(html_string)) + args
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        
+        value = factory(html_string, *args)
+        if value is None:
+            return value
+        
+        size = len(html_string) * CACHE_SIZE_FACTORS.get(kind, 1)
+        if size > self.max_size:
+            return value
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (value, size)
+                self.size += size
+            while len(self._entries) > self.max_entries or self.size > self.max_size:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+                self.evictions += 1
+        return value
+    
+    def clear(self):
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+            self.hits = self.misses = self.evictions = 0
+    
+    def stats(self):
+        """
+        Return the counters of the cache.
+        
+        Returns:
+            dict: hits, misses, evictions, the number of entries and their estimated size
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self._entries), 'size': self.size}
+
+# Cache shared by the functions of this module and the JRXML conversion
+DOCUMENT_CACHE = DocumentCache()
+
+@stage(characters=html_characters)
+def parse_html_cached(html_code, use_lxml=False):
+    """
+    Parse HTML code with BeautifulSoup, reusing the tree of an earlier parse of the same content.
+    
+    The returned tree is shared with other callers and must not be modified; use parse_html
+    for a private copy.
+    
+    Args:
+        html_code (str): The HTML code to parse
+        use_lxml (bool, optional): Use the lxml parser backend. Defaults to False.
+    
+    Returns:
+        BeautifulSoup: The parsed HTML document
+    """
+    return DOCUMENT_CACHE.get('soup', html_code, parse_html, use_lxml)
+
+@stage(characters=html_characters)
+def get_stylesheet(html_string):
+    """
+    Return the Stylesheet of an HTML string, reusing an earlier parse of the same content.
+    
+    Args:
+        html_string (str): The HTML string
+    
+    Returns:
+        Stylesheet: The stylesheet of all style tags of the document
+    """
+    return DOCUMENT_CACHE.get('stylesheet', html_string, Stylesheet.from_html)
+
+def _add_css_id_rules(css_content, styles):
+    """
+    Add the `#id{...}` rules of a CSS string to a styles dictionary.
+    
+    Args:
+        css_content (str): The content of a style tag
+        styles (dict): The dictionary with element IDs as keys and styles as values to update
+    """
+    # Regex to extract selectors and their styles
+    for selector, style_text in CSS_ID_RULE_PATTERN.findall(css_content):
+        # Convert styles to a dictionary
+        style_dict = {}
+        style_parts = style_text.split(';')
+        for part in style_parts:
+            if ':' in part:
+                prop, value = part.split(':', 1)
+                style_dict[prop.strip()] = value.strip()
+        styles[selector] = style_dict
+
+@stage(elements=len)
 def extract_css_styles(soup):
     """
     Extract CSS styles from the HTML document.
@@ -53,20 +264,33 @@ def extract_css_styles(soup):
     for style_tag in style_tags:
         css_content = style_tag.string
         if css_content:
-            # Regex to extract selectors and their styles
-            style_matches = re.findall(r'#([\w]+)\s*{([^}]+)}', css_content)
-            for selector, style_text in style_matches:
-                # Convert styles to a dictionary
-                style_dict = {}
-                style_parts = style_text.split(';')
-                for part in style_parts:
-                    if ':' in part:
-                        prop, value = part.split(':', 1)
-                        style_dict[prop.strip()] = value.strip()
-                styles[selector] = style_dict
+            _add_css_id_rules(css_content, styles)
+    
+    return styles
+
+@stage(characters=html_characters, elements=len)
+def extract_css_styles_from_html(html_string):
+    """
+    Extract CSS styles directly from an HTML string without building a document tree.
+    
+    This is the fast path of extract_css_styles: only the style tags are scanned, so large
+    documents with many elements and embedded images are not parsed.
+    
+    Args:
+        html_string (str): The HTML string to extract the styles from
+        
+    Returns:
+        dict: A dictionary with element IDs as keys and styles as values
+    """
+    styles = {}
+    
+    for css_content in iter_style_contents(html_string):
+        if css_content:
+            _add_css_id_rules(css_content, styles)
     
     return styles
 
+@stage(elements=_count_elements)
 def extract_elements(soup):
     """
     Extract relevant elements from the HTML document.
@@ -77,78 +301,87 @@ def extract_elements(soup):
     Returns:
         dict: A dictionary with element types as keys and lists of elements as values
     """
-    elements = {
-        'div': soup.find_all('div'),
-        'table': soup.find_all('table'),
-        'img': soup.find_all('img'),
-        'p': soup.find_all('p'),
-        'span': soup.find_all('span')
-    }
+    elements = {tag: [] for tag in ELEMENT_TAGS}
+    
+    # Walk the tree once instead of once per tag
+    for node in soup.descendants:
+        bucket = elements.get(node.name)
+        if bucket is not None:
+            bucket.append(node)
+    
+    return elements
+
+@stage(elements=_count_elements)
+def collect_elements(soup, stylesheet=None, tags=ELEMENT_TAGS):
+    """
+    Collect elements by tag and pair each one with its computed style.
+    
+    The tree is walked once. If no stylesheet is given, it is built from the style tags
+    found during the same walk, so style tags anywhere in the document are taken into account.
+    
+    Args:
+        soup (BeautifulSoup): The parsed HTML document
+        stylesheet (Stylesheet, optional): The parsed stylesheet of the document. Defaults to None.
+        tags (iterable, optional): The tags to collect. Defaults to ELEMENT_TAGS.
+        
+    Returns:
+        dict: A dictionary with tags as keys and lists of StyledElement tuples as values, in
+              document order
+    """
+    buckets = {tag: [] for tag in tags}
+    css_contents = []
+    
+    for node in soup.descendants:
+        name = node.name
+        if name is None:
+            continue
+        if name == 'style' and stylesheet is None and node.string:
+            css_contents.append(node.string)
+        bucket = buckets.get(name)
+        if bucket is not None:
+            bucket.append(node)
+    
+    if stylesheet is None:
+        stylesheet = Stylesheet()
+        for css_content in css_contents:
+            stylesheet.add_css(css_content)
+    
+    elements = {}
+    for tag, nodes in buckets.items():
+        elements[tag] = [
+            StyledElement(node, stylesheet.computed_style(node.get('id'), node.get('class') or (),
+                                                          node.get('style')))
+            for node in nodes
+        ]
     
     return elements
 
-def convert_bottom_to_top(html_string, offset_x=0, offset_y=0):
+@stage(characters=html_characters)
+def convert_bottom_to_top(html_string, offset_x=0, offset_y=0, workers=None, page_profile=None):
     """
     Convert bottom-positioned elements to top-positioned elements in HTML.
     
+    Bottom values are flipped against the height of the page container (e.g. `#p1` or `.page`)
+    they belong to; content outside of page containers uses the HTML height of the page
+    profile (HTML_HEIGHT by default).
+    
     Args:
         html_string (str): The HTML string containing bottom-positioned elements
         offset_x (int, optional): Horizontal offset to apply to left values (positive = right, negative = left). Defaults to 0.
         offset_y (int, optional): Vertical offset to apply to top values (positive = down, negative = up). Defaults to 0.
+        workers (int, optional): The number of worker processes to rewrite the pages with. Defaults to None.
+        page_profile (str or PageProfile, optional): The page profile, its name or "auto" to
+                                                     detect it from the first page container
+                                                     (see shared.page_profiles). Defaults to None.
     
     Returns:
         str: The modified HTML string with bottom positions converted to top positions
     """
-    # Define a pattern to find CSS rules with bottom property
-    pattern = r'([^{]+)\{([^}]+)\}'
-    
-    # Define a function to replace bottom with top in CSS rules
-    def replace_css_rule(match):
-        selector = match.group(1)
-        properties = match.group(2)
-        
-        # Find bottom property
-        bottom_match = re.search(r'bottom:(\d+\.?\d*)px', properties)
-        if bottom_match:
-            bottom_px = float(bottom_match.group(1))
-            # Calculate top value: top = HTML_HEIGHT - bottom
-            top_px = HTML_HEIGHT - bottom_px
-            
-            # Apply vertical offset if provided
-            if offset_y != 0:
-                top_px += offset_y
-            
-            # Replace bottom with top
-            properties = re.sub(r'bottom:(\d+\.?\d*)px', f'top:{top_px:.0f}px', properties)
-        
-        # Apply horizontal offset to left property if provided
-        if offset_x != 0:
-            left_match = re.search(r'left:(\d+\.?\d*)px', properties)
-            if left_match:
-                left_px = float(left_match.group(1))
-                new_left_px = left_px + offset_x
-                properties = re.sub(r'left:(\d+\.?\d*)px', f'left:{new_left_px:.0f}px', properties)
-        
-        return f'{selector}{{{properties}}}'
-    
-    # Find all style tags in the HTML
-    style_pattern = r'<style[^>]*>(.*?)</style>'
-    
-    # Function to process style content
-    def process_style(style_match):
-        style_tag_start = style_match.group(0).split('>')[0] + '>'
-        style_content = style_match.group(1)
-        
-        # Apply the CSS rule replacement
-        new_style_content = re.sub(pattern, replace_css_rule, style_content)
-        
-        return f"{style_tag_start}{new_style_content}</style>"
-    
-    # Replace style tags with processed content
-    result_html = re.sub(style_pattern, process_style, html_string, flags=re.DOTALL)
-    
-    return result_html
+    html_height = HTML_HEIGHT if page_profile is None else resolve_page_profile(page_profile, html_string).html_height
+    return rewrite_page_positions(html_string, bottom_to_top=True, offset_x=offset_x, offset_y=offset_y,
+                                  html_height=html_height, workers=workers)
 
+@stage(characters=html_characters)
 def apply_offset(html_string, offset_x=0, offset_y=0):
     """
     Apply offset to left and top values in HTML.
@@ -161,97 +394,156 @@ def apply_offset(html_string, offset_x=0, offset_y=0):
     Returns:
         str: The modified HTML string with offsets applied
     """
-    # If no offset is provided, return the original HTML
-    if offset_x == 0 and offset_y == 0:
-        return html_string
+    return rewrite_style_positions(html_string, offset_x=offset_x, offset_y=offset_y)
+
+def _stream_convert_file(input_path, output_path, chunk_size, **rewrite_kwargs):
+    """
+    Stream an HTML file through stream_rewrite_style_positions into another file.
     
-    # Define a pattern to find CSS rules
-    pattern = r'([^{]+)\{([^}]+)\}'
+    Line endings are kept as they are, so everything outside of the rewritten values is
+    copied byte for byte.
     
-    # Define a function to apply offsets to CSS rules
-    def apply_offset_to_rule(match):
-        selector = match.group(1)
-        properties = match.group(2)
-        
-        # Apply horizontal offset to left property
-        if offset_x != 0:
-            left_match = re.search(r'left:(\d+\.?\d*)px', properties)
-            if left_match:
-                left_px = float(left_match.group(1))
-                new_left_px = left_px + offset_x
-                properties = re.sub(r'left:(\d+\.?\d*)px', f'left:{new_left_px:.0f}px', properties)
-        
-        # Apply vertical offset to top property
-        if offset_y != 0:
-            top_match = re.search(r'top:(\d+\.?\d*)px', properties)
-            if top_match:
-                top_px = float(top_match.group(1))
-                new_top_px = top_px + offset_y
-                properties = re.sub(r'top:(\d+\.?\d*)px', f'top:{new_top_px:.0f}px', properties)
-        
-        return f'{selector}{{{properties}}}'
+    Args:
+        input_path (str): The path to the HTML file to convert
+        output_path (str): The path to save the converted HTML file to
+        chunk_size (int): The number of characters to read at once
+        **rewrite_kwargs: Arguments for stream_rewrite_style_positions
     
-    # Find all style tags in the HTML
-    style_pattern = r'<style[^>]*>(.*?)</style>'
+    Returns:
+        str: The path to the saved file
+    """
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
     
-    # Function to process style content
-    def process_style(style_match):
-        style_tag_start = style_match.group(0).split('>')[0] + '>'
-        style_content = style_match.group(1)
-        
-        # Apply the CSS rule replacement
-        new_style_content = re.sub(pattern, apply_offset_to_rule, style_content)
-        
-        return f"{style_tag_start}{new_style_content}</style>"
+    with open(input_path, 'r', encoding='utf-8', newline='') as reader, \
+            open(output_path, 'w', encoding='utf-8', newline='') as writer:
+        stream_rewrite_style_positions(reader, writer, chunk_size=chunk_size, **rewrite_kwargs)
     
-    # Replace style tags with processed content
-    result_html = re.sub(style_pattern, process_style, html_string, flags=re.DOTALL)
+    return output_path
+
+@stage(size=file_size)
+def convert_bottom_to_top_file(input_path, output_path, offset_x=0, offset_y=0, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Convert bottom-positioned elements to top-positioned elements while streaming a file.
+    
+    The file is read in chunks and only the style blocks are held in memory, so files with
+    large embedded images can be converted with bounded memory. Every page is flipped against
+    the height of its own page container, as in convert_bottom_to_top.
     
-    return result_html
+    Args:
+        input_path (str): The path to the HTML file containing bottom-positioned elements
+        output_path (str): The path to save the converted HTML file to
+        offset_x (int, optional): Horizontal offset to apply to left values (positive = right, negative = left). Defaults to 0.
+        offset_y (int, optional): Vertical offset to apply to top values (positive = down, negative = up). Defaults to 0.
+        chunk_size (int, optional): The number of characters to read at once. Defaults to DEFAULT_CHUNK_SIZE.
+    
+    Returns:
+        str: The path to the saved file
+    """
+    return _stream_convert_file(input_path, output_path, chunk_size, bottom_to_top=True,
+                                offset_x=offset_x, offset_y=offset_y, html_height=HTML_HEIGHT)
 
-def extract_positions(html_string):
+@stage(size=file_size)
+def apply_offset_file(input_path, output_path, offset_x=0, offset_y=0, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Apply offset to left and top values while streaming a file.
+    
+    Args:
+        input_path (str): The path to the HTML file to modify
+        output_path (str): The path to save the modified HTML file to
+        offset_x (int, optional): Horizontal offset to apply to left values (positive = right, negative = left). Defaults to 0.
+        offset_y (int, optional): Vertical offset to apply to top values (positive = down, negative = up). Defaults to 0.
+        chunk_size (int, optional): The number of characters to read at once. Defaults to DEFAULT_CHUNK_SIZE.
+    
+    Returns:
+        str: The path to the saved file
+    """
+    return _stream_convert_file(input_path, output_path, chunk_size, offset_x=offset_x, offset_y=offset_y)
+
+@stage(characters=html_characters, elements=len)
+def extract_positions(html_string, use_beautifulsoup=False, stylesheet=None, element_boxes=None):
     """
     Extract position information (top/left) from HTML elements.
     
     Args:
         html_string (str): The HTML string to extract positions from
+        use_beautifulsoup (bool, optional): Parse the whole document with BeautifulSoup instead of
+                                            scanning only the style tags. Defaults to False.
+        stylesheet (Stylesheet, optional): An already parsed stylesheet of the document. If given,
+                                           the positions are read from its id index, where
+                                           repeated rules for an ID are merged, and the HTML
+                                           string is not scanned again. Defaults to None.
+        element_boxes (list, optional): The ElementBox objects built from the document by
+                                        shared.element_boxes.build_element_boxes. If given, the
+                                        positions of the boxes with an ID are returned without
+                                        parsing anything. Defaults to None.
     
     Returns:
         list: A list of dictionaries with element IDs and their positions
     """
     positions = []
     
-    # Parse the HTML
-    soup = parse_html(html_string)
-    if not soup:
+    if element_boxes is not None:
+        for box in element_boxes:
+            if box.element_id:
+                position = {'id': box.element_id}
+                for prop in ('left', 'top', 'bottom'):
+                    value = getattr(box, prop)
+                    if value is not None:
+                        position[prop] = value
+                positions.append(position)
         return positions
     
-    # Extract CSS styles
-    css_styles = extract_css_styles(soup)
+    if stylesheet is not None:
+        css_styles = stylesheet.id_styles
+    elif use_beautifulsoup:
+        # Parse the HTML, or reuse the tree of an earlier step
+        soup = parse_html_cached(html_string)
+        if not soup:
+            return positions
+        
+        # Extract CSS styles
+        css_styles = extract_css_styles(soup)
+    else:
+        css_styles = DOCUMENT_CACHE.get('css_styles', html_string, extract_css_styles_from_html)
     
     # Extract positions from CSS styles
     for element_id, style_dict in css_styles.items():
         position = {'id': element_id}
         
-        if 'left' in style_dict:
-            match = re.search(r'(\d+\.?\d*)px', style_dict['left'])
-            if match:
-                position['left'] = float(match.group(1))
-        
-        if 'top' in style_dict:
-            match = re.search(r'(\d+\.?\d*)px', style_dict['top'])
-            if match:
-                position['top'] = float(match.group(1))
-        
-        if 'bottom' in style_dict:
-            match = re.search(r'(\d+\.?\d*)px', style_dict['bottom'])
-            if match:
-                position['bottom'] = float(match.group(1))
+        for prop in ('left', 'top', 'bottom'):
+            if prop in style_dict:
+                match = PX_VALUE_PATTERN.search(style_dict[prop])
+                if match:
+                    position[prop] = float(match.group(1))
         
         positions.append(position)
     
     return positions
 
+@stage(size=file_size)
+def read_html_file(file_path):
+    """
+    Read HTML from a file, raising errors instead of printing them.
+    
+    Use this in file functions run with run_file_tasks, so a file that cannot be read is
+    reported with status 'error' and nothing is printed to stdout.
+    
+    Args:
+        file_path (str): The path to the HTML file
+    
+    Returns:
+        str: The HTML string read from the file
+    
+    Raises:
+        OSError: If the file cannot be read
+        UnicodeDecodeError: If the file is not valid UTF-8
+    """
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return file.read()
+
+@stage(size=file_size)
 def load_html_from_file(file_path):
     """
     Load HTML from a file.
@@ -269,6 +561,7 @@ def load_html_from_file(file_path):
         print(f"Error loading file: {e}")
         return ""
 
+@stage(characters=html_characters)
 def save_html_to_file(html_string, function_name="converted", timestamp=None):
     """
     Save HTML string to a file with a timestamp in the filename.
@@ -302,6 +595,7 @@ def save_html_to_file(html_string, function_name="converted", timestamp=None):
     print(f"HTML saved to: {file_path}")
     return file_path
 
+@stage(characters=html_characters)
 def save_original_html(html_string, timestamp=None):
     """
     Save the original HTML string to a file in the original directory.
@@ -333,11 +627,300 @@ def save_original_html(html_string, timestamp=None):
     print(f"Original HTML saved to: {file_path}")
     return file_path
 
+def _convert_file(input_path, output_path, conversion_function, kwargs, instrumentation=None):
+    """
+    Load, convert and save a single HTML file for batch_convert_folder.
+    
+    This function runs in the worker processes of the batch conversion, so it reports
+    errors in its result instead of raising or printing them.
+    
+    Args:
+        input_path (str): The path to the HTML file to convert
+        output_path (str): The path to save the converted HTML file to
+        conversion_function (function): The function to use for conversion
+        kwargs (dict): Additional arguments to pass to the conversion function
+        instrumentation (dict, optional): The options to record the file with, see
+                                          shared.instrumentation.recording_options. Defaults to None.
+    
+    Returns:
+        dict: The result for the file with input, output, status, error and seconds, and the
+              report of the file as instrumentation if it was recorded
+    """
+    start_time = time.perf_counter()
+    result = {'input': input_path, 'output': None, 'status': 'converted', 'error': None}
+    
+    with record_document(input_path, instrumentation) as recorder:
+        try:
+            with measure('read_file', size=os.path.getsize(input_path)):
+                with open(input_path, 'r', encoding='utf-8') as file:
+                    html_string = file.read()
+            
+            # Skip empty files
+            if not html_string:
+                result['status'] = 'skipped'
+                result['error'] = 'empty file'
+            else:
+                converted_html = conversion_function(html_string, **kwargs)
+                with measure('write_file', characters=len(converted_html)):
+                    with open(output_path, 'w', encoding='utf-8') as file:
+                        file.write(converted_html)
+                result['output'] = output_path
+        except Exception as e:
+            result['status'] = 'error'
+            result['error'] = f"{type(e).__name__}: {e}"
+    
+    result['seconds'] = time.perf_counter() - start_time
+    if recorder is not None:
+        result['instrumentation'] = recorder.report()
+    return result
+
+def _future_result(future, input_path):
+    """
+    Get the result of a task future, reporting pool failures as errors.
+    
+    Args:
+        future (concurrent.futures.Future): The future of a task function
+        input_path (str): The path to the HTML file of the future
+    
+    Returns:
+        dict: The result for the file
+    """
+    try:
+        return future.result()
+    except Exception as e:
+        # E.g. a conversion function that cannot be sent to the worker processes
+        return {'input': input_path, 'output': None, 'status': 'error',
+                'error': f"{type(e).__name__}: {e}", 'seconds': 0.0}
+
+def _run_file_function(input_path, output_path, file_function, kwargs, instrumentation=None):
+    """
+    Run a file function for run_file_tasks, reporting errors in its result.
+    
+    Args:
+        input_path (str): The path to the input file
+        output_path (str): The path to the output file
+        file_function (function): The function to call with input path, output path and kwargs
+        kwargs (dict): Additional arguments to pass to the file function
+        instrumentation (dict, optional): The options to record the file with, see
+                                          shared.instrumentation.recording_options. Defaults to None.
+    
+    Returns:
+        dict: The result for the file with input, output, status, error and seconds, updated
+              with the return value of the file function if it is a dictionary, and the
+              report of the file as instrumentation if it was recorded
+    """
+    start_time = time.perf_counter()
+    result = {'input': input_path, 'output': None, 'status': 'converted', 'error': None}
+    
+    with record_document(input_path, instrumentation) as recorder:
+        try:
+            value = file_function(input_path, output_path, **kwargs)
+            result['output'] = output_path
+            if isinstance(value, dict):
+                result.update(value)
+        except Exception as e:
+            result['status'] = 'error'
+            result['error'] = f"{type(e).__name__}: {e}"
+    
+    result['seconds'] = time.perf_counter() - start_time
+    if recorder is not None:
+        result['instrumentation'] = recorder.report()
+    return result
+
+def _run_tasks(tasks, task_function, args, workers):
+    """
+    Run a task function for a list of tasks, sequentially or in a process pool.
+    
+    Args:
+        tasks (list): A list of (input_path, output_path) tuples
+        task_function (function): The function to call with input path, output path and args,
+                                  returning a result dictionary
+        args (tuple): Additional positional arguments to pass to the task function
+        workers (int): The number of worker processes, None or 1 for sequential execution
+    
+    Returns:
+        list: The results of the task function in the order of the tasks
+    """
+    # Within a recording every file is recorded separately, also in the worker processes
+    recorder = current_recorder()
+    if recorder is not None:
+        args = args + (recording_options(),)
+    
+    if not workers or workers <= 1:
+        results = [task_function(input_path, output_path, *args) for input_path, output_path in tasks]
+    else:
+        results = _run_pool_tasks(tasks, task_function, args, workers)
+    
+    if recorder is not None:
+        for result in results:
+            if 'instrumentation' in result:
+                recorder.add_document(result.pop('instrumentation'))
+    return results
+
+def _run_pool_tasks(tasks, task_function, args, workers):
+    """
+    Run a task function for a list of tasks in a process pool.
+    
+    Args:
+        tasks (list): A list of (input_path, output_path) tuples
+        task_function (function): The function to call with input path, output path and args
+        args (tuple): Additional positional arguments to pass to the task function
+        workers (int): The number of worker processes
+    
+    Returns:
+        list: The results of the task function in the order of the tasks
+    """
+    # Run in a process pool with at most two pending files per worker
+    results = [None] * len(tasks)
+    max_in_flight = workers * 2
+    pending = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for index, (input_path, output_path) in enumerate(tasks):
+            if len(pending) >= max_in_flight:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index_done = pending.pop(future)
+                    results[index_done] = _future_result(future, tasks[index_done][0])
+            future = executor.submit(task_function, input_path, output_path, *args)
+            pending[future] = index
+        
+        for future in as_completed(pending):
+            results[pending[future]] = _future_result(future, tasks[pending[future]][0])
+    
+    return results
+
+def _run_conversions(tasks, conversion_function, kwargs, workers):
+    """
+    Run _convert_file for a list of tasks, sequentially or in a process pool.
+    
+    Args:
+        tasks (list): A list of (input_path, output_path) tuples
+        conversion_function (function): The function to use for conversion
+        kwargs (dict): Additional arguments to pass to the conversion function
+        workers (int): The number of worker processes, None or 1 for sequential conversion
+    
+    Returns:
+        list: The results of _convert_file in the order of the tasks
+    """
+    return _run_tasks(tasks, _convert_file, (conversion_function, kwargs), workers)
+
+@stage(elements=len)
+def run_file_tasks(tasks, file_function, workers=None, **kwargs):
+    """
+    Run a file-to-file function for a list of files, sequentially or in a process pool.
+    
+    The function is called as `file_function(input_path, output_path, **kwargs)`. Errors are
+    reported per file instead of raised. In process pool mode the function must be defined
+    at module level so it can be sent to the worker processes.
+    
+    Args:
+        tasks (list): A list of (input_path, output_path) tuples
+        file_function (function): The function to run for every file
+        workers (int, optional): The number of worker processes. If None or 1, the files are
+                                 processed one after another in the current process. Defaults to None.
+        **kwargs: Additional arguments to pass to the file function.
+    
+    Returns:
+        list: A list of dictionaries in the order of the tasks with the keys input, output,
+              status ('converted' or 'error'), error and seconds, plus the keys of a dictionary
+              returned by the file function
+    """
+    return _run_tasks(tasks, _run_file_function, (file_function, kwargs), workers)
+
+def _file_sha256(file_path, chunk_size=1024 * 1024):
+    """
+    Calculate the SHA-256 hash of a file without loading it completely.
+    
+    Args:
+        file_path (str): The path to the file
+        chunk_size (int, optional): The number of bytes to read at once. Defaults to 1 MiB.
+    
+    Returns:
+        str: The hex digest of the file content
+    """
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+def load_batch_manifest(output_folder):
+    """
+    Load the batch conversion manifest of an output folder.
+    
+    Args:
+        output_folder (str): The folder containing the converted HTML files
+    
+    Returns:
+        dict: The manifest with conversion function names as keys and dictionaries of
+              input filenames and their entries (sha256, size, mtime_ns, parameters and the
+              output filename) as values, empty if there is no manifest or it cannot be used
+    """
+    manifest_path = os.path.join(output_folder, BATCH_MANIFEST_FILENAME)
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as file:
+            manifest = json.load(file)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        # Warn instead of printing, stdout carries the JSON summary of the CLI
+        warnings.warn(f"Error loading manifest, converting all files: {e}")
+        return {}
+    functions = manifest.get('functions', {}) if isinstance(manifest, dict) else None
+    if not isinstance(functions, dict):
+        warnings.warn(f"Invalid manifest {manifest_path}, converting all files")
+        return {}
+    return functions
+
+def save_batch_manifest(output_folder, manifest):
+    """
+    Save the batch conversion manifest of an output folder atomically.
+    
+    Args:
+        output_folder (str): The folder containing the converted HTML files
+        manifest (dict): The manifest as returned by load_batch_manifest
+    
+    Returns:
+        str: The path to the manifest file
+    """
+    manifest_path = os.path.join(output_folder, BATCH_MANIFEST_FILENAME)
+    temp_path = manifest_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump({'version': 1, 'functions': manifest}, file, indent=2, sort_keys=True)
+    os.replace(temp_path, manifest_path)
+    return manifest_path
+
+def _remove_stale_output(output_path):
+    """
+    Remove an output file that no longer belongs to a current input.
+    
+    Args:
+        output_path (str): The path to the stale output file
+    
+    Returns:
+        bool: True if the file was removed
+    """
+    try:
+        os.remove(output_path)
+        return True
+    except FileNotFoundError:
+        return False
+
+@stage(elements=len)
 def batch_convert_folder(input_folder="data/original", output_folder="data/output", 
-                         conversion_function=convert_bottom_to_top, **kwargs):
+                         conversion_function=convert_bottom_to_top, workers=None, timestamp=None,
+                         incremental=False, **kwargs):
     """
     Batch convert all HTML files in a folder.
     
+    All output files of a run share one timestamp and the input files are processed in
+    sorted order, so a run with a given timestamp always produces the same file names.
+    
+    In incremental mode a manifest in the output folder records the content hash, the
+    conversion function and its arguments for every input. Inputs whose hash and arguments
+    did not change since the last run are not converted again, and outputs of changed or
+    deleted inputs are removed.
+    
     Args:
         input_folder (str, optional): The folder containing HTML files to convert. 
                                      Defaults to "data/original".
@@ -345,44 +928,87 @@ def batch_convert_folder(input_folder="data/original", output_folder="data/outpu
                                       Defaults to "data/output".
         conversion_function (function, optional): The function to use for conversion. 
                                                 Defaults to convert_bottom_to_top.
+        workers (int, optional): The number of worker processes. If None or 1, the files are
+                                 converted one after another in the current process. Defaults to None.
+        timestamp (str, optional): A custom timestamp to use in the output filenames.
+                                  If None, the start time of the run will be used.
+        incremental (bool, optional): Skip unchanged inputs and remove stale outputs using the
+                                      manifest in the output folder. Defaults to False.
         **kwargs: Additional arguments to pass to the conversion function.
     
     Returns:
-        list: A list of paths to the converted files
+        list: A list of dictionaries, one per input file in sorted order, with the keys
+              input, output, status ('converted', 'unchanged', 'skipped' or 'error'), error
+              and seconds. In incremental mode, inputs that were deleted since the last run
+              follow with status 'removed' and the removed output.
     """
     # Create output folder if it doesn't exist
     os.makedirs(output_folder, exist_ok=True)
     
-    # Get all HTML files in the input folder
-    html_files = [f for f in os.listdir(input_folder) if f.endswith('.html')]
+    # Generate one timestamp for the whole run if not provided
+    if timestamp is None:
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H%M%S")
     
-    converted_files = []
+    # Get all HTML files in the input folder
+    html_files = sorted(f for f in os.listdir(input_folder) if f.endswith('.html'))
     
-    # Convert each HTML file
+    # Generate input and output paths
+    function_name = conversion_function.__name__
+    tasks = []
     for html_file in html_files:
-        input_path = os.path.join(input_folder, html_file)
-        
-        # Load HTML from file
-        html_string = load_html_from_file(input_path)
-        
-        # Skip empty files
-        if not html_string:
-            continue
+        output_filename = f"{function_name}_{os.path.splitext(html_file)[0]}_{timestamp}.html"
+        tasks.append((os.path.join(input_folder, html_file), os.path.join(output_folder, output_filename)))
+    
+    if not incremental:
+        return _run_conversions(tasks, conversion_function, kwargs, workers)
+    
+    manifest = load_batch_manifest(output_folder)
+    entries = manifest.setdefault(function_name, {})
+    parameters = json.loads(json.dumps(kwargs, sort_keys=True, default=repr))
+    
+    results = [None] * len(tasks)
+    fingerprints = {}
+    pending_indexes = []
+    for index, (html_file, (input_path, output_path)) in enumerate(zip(html_files, tasks)):
+        stat = os.stat(input_path)
+        entry = entries.get(html_file)
         
-        # Convert HTML
-        converted_html = conversion_function(html_string, **kwargs)
+        # Only hash the file again if its size or modification time changed
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            content_hash = entry['sha256']
+        else:
+            content_hash = _file_sha256(input_path)
+        fingerprints[html_file] = {'sha256': content_hash, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
         
-        # Generate output filename
-        function_name = conversion_function.__name__
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H%M%S")
-        output_filename = f"{function_name}_{os.path.splitext(html_file)[0]}_{timestamp}.html"
-        output_path = os.path.join(output_folder, output_filename)
+        if (entry and entry['sha256'] == content_hash and entry['parameters'] == parameters
+                and os.path.exists(os.path.join(output_folder, entry['output']))):
+            entry.update(fingerprints[html_file])
+            results[index] = {'input': input_path, 'output': os.path.join(output_folder, entry['output']),
+                              'status': 'unchanged', 'error': None, 'seconds': 0.0}
+        else:
+            pending_indexes.append(index)
+    
+    converted = _run_conversions([tasks[index] for index in pending_indexes], conversion_function, kwargs, workers)
+    for index, result in zip(pending_indexes, converted):
+        results[index] = result
+        html_file = html_files[index]
+        old_entry = entries.pop(html_file, None)
         
-        # Save converted HTML
-        with open(output_path, 'w', encoding='utf-8') as file:
-            file.write(converted_html)
+        # Remove the output of the previous conversion of a changed input
+        if old_entry and os.path.join(output_folder, old_entry['output']) != result['output']:
+            _remove_stale_output(os.path.join(output_folder, old_entry['output']))
         
-        print(f"Converted {html_file} to {output_filename}")
-        converted_files.append(output_path)
-    
-    return converted_files
\ No newline at end of file
+        if result['status'] == 'converted':
+            entries[html_file] = dict(fingerprints[html_file], output=os.path.basename(result['output']),
+                                      parameters=parameters)
+    
+    # Remove the outputs of inputs that no longer exist
+    for html_file in sorted(set(entries) - set(html_files)):
+        old_entry = entries.pop(html_file)
+        stale_path = os.path.join(output_folder, old_entry['output'])
+        _remove_stale_output(stale_path)
+        results.append({'input': os.path.join(input_folder, html_file), 'output': stale_path,
+                        'status': 'removed', 'error': None, 'seconds': 0.0})
+    
+    save_batch_manifest(output_folder, manifest)
+    return results
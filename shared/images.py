@@ -0,0 +1,353 @@
+"""
+Extraction of embedded images for HTML to JasperReport conversion.
+
+PDF exports embed page scans as `data:` URIs in the src attributes of img elements, often
+several megabytes per page. This module streams these payloads out of the HTML into image
+files named after the SHA-256 hash of their content and replaces the URIs with references
+to the files. Identical images, e.g. the same logo on every page or in every document of a
+batch, are stored once. The payloads are decoded while the HTML is read in chunks, so no
+payload is ever held in memory as a whole.
+"""
+
+import base64
+import hashlib
+import html
+import io
+import mimetypes
+import os
+import re
+import urllib.parse
+import uuid
+
+from shared.css_rewrite import DEFAULT_CHUNK_SIZE
+
+# Pattern for the start of a quoted src attribute with a data URI, up to the "data:"
+DATA_URI_ATTRIBUTE_PATTERN = re.compile(r'(?<![\w-])src\s*=\s*(["\'])data:', re.IGNORECASE)
+
+# Number of characters at the end of the buffer that can hold the start of a data URI attribute
+_ATTRIBUTE_HOLDBACK = 32
+
+# Longest character reference kept back from decoding until its ";" is read
+_MAX_CHARACTER_REFERENCE = 32
+
+# File extensions of image types that mimetypes does not know or maps ambiguously
+IMAGE_EXTENSIONS = {
+    'image/jpeg': '.jpg',
+    'image/svg+xml': '.svg',
+    'image/webp': '.webp',
+}
+
+# Name of the image folder next to the output files of extract_images_file
+DEFAULT_IMAGE_DIR_NAME = 'images'
+
+
+def image_extension(mime_type):
+    """
+    Return the file extension of an image type.
+
+    Args:
+        mime_type (str): The MIME type of the image (e.g. "image/png")
+
+    Returns:
+        str: The extension including the dot, ".bin" for unknown types
+    """
+    mime_type = mime_type.strip().lower()
+    return IMAGE_EXTENSIONS.get(mime_type) or mimetypes.guess_extension(mime_type) or '.bin'
+
+
+class _PayloadDecoder:
+    """
+    Incremental decoder of the payload of a data URI in an HTML attribute.
+
+    Character references of the attribute are resolved first, then the payload is decoded as
+    base64 or percent encoding. Incomplete references, base64 quanta and percent escapes at
+    the end of a piece are kept until the next piece.
+    """
+
+    def __init__(self, is_base64):
+        self.is_base64 = is_base64
+        self._raw = ''
+        self._text = ''
+
+    def feed(self, raw, final=False):
+        """
+        Decode the next piece of the payload.
+
+        Args:
+            raw (str): The next characters of the attribute value
+            final (bool, optional): Whether this is the last piece. Defaults to False.
+
+        Returns:
+            bytes: The decoded bytes available so far
+        """
+        raw = self._raw + raw
+        cut = len(raw)
+        if not final:
+            ampersand = raw.rfind('&', max(len(raw) - _MAX_CHARACTER_REFERENCE, 0))
+            if ampersand != -1 and ';' not in raw[ampersand:]:
+                cut = ampersand
+        self._raw = raw[cut:]
+        text = self._text + html.unescape(raw[:cut])
+
+        if self.is_base64:
+            text = ''.join(text.split())
+            if final:
+                text += '=' * (-len(text) % 4)
+                cut = len(text)
+            else:
+                cut = len(text) - len(text) % 4
+            data = base64.b64decode(text[:cut])
+        else:
+            cut = len(text)
+            if not final:
+                percent = text.rfind('%', max(len(text) - 2, 0))
+                if percent != -1:
+                    cut = percent
+            data = urllib.parse.unquote_to_bytes(text[:cut])
+        self._text = '' if final else text[cut:]
+        return data
+
+
+class _ImageFile:
+    """A content-addressed image file of an ImageStore being written."""
+
+    def __init__(self, store, mime_type):
+        self.store = store
+        self.mime_type = mime_type
+        self.size = 0
+        self._hash = hashlib.sha256()
+        # Created like open() would, so the current umask applies; mkstemp is owner-only but
+        # the image folder is shared
+        flags = os.O_CREAT | os.O_EXCL | os.O_WRONLY | getattr(os, 'O_BINARY', 0)
+        while True:
+            self._temp_path = os.path.join(store.image_dir, uuid.uuid4().hex + '.part')
+            try:
+                handle = os.open(self._temp_path, flags, 0o666)
+                break
+            except FileExistsError:
+                continue
+        self._file = os.fdopen(handle, 'wb')
+
+    def write(self, data):
+        """Write the next bytes of the image."""
+        if data:
+            self._hash.update(data)
+            self._file.write(data)
+            self.size += len(data)
+
+    def close(self):
+        """Finish the file and return its reference."""
+        self._file.close()
+        return self.store._finish(self._temp_path, self._hash.hexdigest(), self.size, self.mime_type)
+
+    def discard(self):
+        """Remove the unfinished file."""
+        self._file.close()
+        os.remove(self._temp_path)
+
+
+class ImageStore:
+    """
+    Folder of content-addressed image files.
+
+    Every image is stored as `<sha256><extension>`; an image whose file already exists, from
+    this document or an earlier one, is not written again. Several processes can share a
+    store folder, since files are moved into place atomically.
+    """
+
+    def __init__(self, image_dir, reference_dir=None):
+        """
+        Create a store.
+
+        Args:
+            image_dir (str): The folder to write the image files to
+            reference_dir (str, optional): The folder written in the references, e.g. relative to
+                                           the converted HTML. Defaults to image_dir.
+        """
+        self.image_dir = image_dir
+        self.reference_dir = image_dir if reference_dir is None else reference_dir
+        self.stats = {'images': 0, 'written': 0, 'duplicates': 0, 'bytes_written': 0}
+
+    def open(self, mime_type):
+        """
+        Start an image file to write to.
+
+        Args:
+            mime_type (str): The MIME type of the image
+
+        Returns:
+            _ImageFile: The file, which returns its reference when it is closed
+        """
+        os.makedirs(self.image_dir, exist_ok=True)
+        return _ImageFile(self, mime_type)
+
+    def add(self, data, mime_type):
+        """
+        Store an image.
+
+        Args:
+            data (bytes): The content of the image
+            mime_type (str): The MIME type of the image
+
+        Returns:
+            str: The reference of the image file
+        """
+        image_file = self.open(mime_type)
+        image_file.write(data)
+        return image_file.close()
+
+    def _finish(self, temp_path, digest, size, mime_type):
+        """Move a written file to its content address, or drop it if the image is stored already."""
+        name = digest + image_extension(mime_type)
+        path = os.path.join(self.image_dir, name)
+        self.stats['images'] += 1
+        if os.path.exists(path):
+            os.remove(temp_path)
+            self.stats['duplicates'] += 1
+        else:
+            os.replace(temp_path, path)
+            self.stats['written'] += 1
+            self.stats['bytes_written'] += size
+        if not self.reference_dir:
+            return name
+        return self.reference_dir.replace(os.sep, '/').rstrip('/') + '/' + name
+
+
+def _parse_data_uri_header(header):
+    """Return the MIME type of a data URI header and whether its payload is base64."""
+    parts = [part.strip() for part in html.unescape(header).split(';')]
+    is_base64 = len(parts) > 1 and parts[-1].lower() == 'base64'
+    return parts[0] or 'text/plain', is_base64
+
+
+def stream_extract_images(reader, writer, store, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Move data URI images into an image store while copying HTML from a reader to a writer.
+
+    Every quoted src attribute holding a data URI gets the reference of the stored image
+    instead; everything else is written through unchanged. The payloads are decoded and
+    written to the store piece by piece as they are read.
+
+    Args:
+        reader (io.TextIOBase): The text stream to read the HTML from
+        writer (io.TextIOBase): The text stream to write the HTML with references to
+        store (ImageStore): The store to put the images in
+        chunk_size (int, optional): The number of characters to read at once. Defaults to DEFAULT_CHUNK_SIZE.
+
+    Returns:
+        int: The number of images replaced
+
+    Raises:
+        ValueError: If a data URI is not terminated or its base64 payload is invalid
+    """
+    buffer = ''
+    eof = False
+    image_count = 0
+    # Decoder, image file and quote character of the payload being read
+    payload = None
+
+    while True:
+        if payload is not None:
+            decoder, image_file, quote = payload
+            end = buffer.find(quote)
+            try:
+                if end == -1:
+                    if eof:
+                        raise ValueError("unterminated data URI")
+                    image_file.write(decoder.feed(buffer))
+                    buffer = ''
+                else:
+                    image_file.write(decoder.feed(buffer[:end], final=True))
+                    writer.write(html.escape(image_file.close()))
+                    image_count += 1
+                    # The closing quote is written with the rest
+                    buffer = buffer[end:]
+                    payload = None
+                    continue
+            except ValueError:
+                # Also raised by base64 for invalid payloads
+                image_file.discard()
+                raise
+        else:
+            match = DATA_URI_ATTRIBUTE_PATTERN.search(buffer)
+            if match:
+                quote = match.group(1)
+                comma = buffer.find(',', match.end())
+                quote_end = buffer.find(quote, match.end())
+                if quote_end != -1 and (comma == -1 or quote_end < comma):
+                    # Not a data URI with a payload, e.g. "data:," cut short; leave it unchanged
+                    writer.write(buffer[:quote_end])
+                    buffer = buffer[quote_end:]
+                    continue
+                if comma != -1:
+                    mime_type, is_base64 = _parse_data_uri_header(buffer[match.end():comma])
+                    writer.write(buffer[:match.end() - len('data:')])
+                    payload = (_PayloadDecoder(is_base64), store.open(mime_type), quote)
+                    buffer = buffer[comma + 1:]
+                    continue
+                if eof:
+                    writer.write(buffer)
+                    return image_count
+                # The header is not complete yet
+                writer.write(buffer[:match.start()])
+                buffer = buffer[match.start():]
+            else:
+                if eof:
+                    writer.write(buffer)
+                    return image_count
+                keep_start = max(len(buffer) - _ATTRIBUTE_HOLDBACK, 0)
+                writer.write(buffer[:keep_start])
+                buffer = buffer[keep_start:]
+
+        chunk = reader.read(chunk_size)
+        if chunk:
+            buffer += chunk
+        else:
+            eof = True
+
+
+def extract_images(html_string, store):
+    """
+    Move the data URI images of an HTML string into an image store.
+
+    Args:
+        html_string (str): The HTML code
+        store (ImageStore): The store to put the images in
+
+    Returns:
+        str: The HTML code with references to the image files
+    """
+    output = io.StringIO()
+    stream_extract_images(io.StringIO(html_string), output, store)
+    return output.getvalue()
+
+
+def extract_images_file(input_path, output_path, image_dir=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Move the data URI images of an HTML file into image files while streaming it to another file.
+
+    The references in the output file are relative to the folder of the output file.
+
+    Args:
+        input_path (str): The path to the HTML file
+        output_path (str): The path to save the HTML file with references to
+        image_dir (str, optional): The folder of the image files. Defaults to an "images" folder
+                                   next to the output file.
+        chunk_size (int, optional): The number of characters to read at once. Defaults to DEFAULT_CHUNK_SIZE.
+
+    Returns:
+        dict: The number of images, of image files written and of images already stored
+    """
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    if image_dir is None:
+        image_dir = os.path.join(output_dir, DEFAULT_IMAGE_DIR_NAME)
+    store = ImageStore(image_dir, os.path.relpath(image_dir, output_dir or os.curdir))
+
+    with open(input_path, 'r', encoding='utf-8', newline='') as reader, \
+            open(output_path, 'w', encoding='utf-8', newline='') as writer:
+        stream_extract_images(reader, writer, store, chunk_size)
+
+    return {'images': store.stats['images'], 'written': store.stats['written'],
+            'duplicates': store.stats['duplicates']}
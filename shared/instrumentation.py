@@ -0,0 +1,365 @@
+"""
+Opt-in instrumentation of the conversion pipeline.
+
+The conversion functions are wrapped with `stage`, which does nothing unless a recording is
+active. Inside `record(...)`, every call of a wrapped function adds its time, the size of its
+input and the number of elements it returned to the stage of the same name, so a report
+shows where the time of a conversion goes: parsing, CSS extraction, rewriting or file I/O.
+A recording can also capture a cProfile profile and the peak traced memory, and reports
+through a callback and/or a logger as a JSON-compatible dictionary.
+
+Batch functions record every document separately, also in worker processes, and add the
+document reports to the recording they run in.
+
+Usage:
+    with record(callback=print) as recorder:
+        convert_bottom_to_top(html_string)
+"""
+
+import contextlib
+import contextvars
+import cProfile
+import functools
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+# Logger of the reports of recordings created with log=True
+LOGGER = logging.getLogger('shared.instrumentation')
+
+# Number of functions with the highest cumulative time in the profile of a report
+PROFILE_TOP_FUNCTIONS = 20
+
+# Recorder of the current context, None if nothing is recorded
+_current_recorder = contextvars.ContextVar('instrumentation_recorder', default=None)
+
+# Whether a recorder of the current thread is running cProfile; a profiler only sees its own thread
+_profiler_state = threading.local()
+
+# Recorders measuring memory; tracemalloc runs while there are any
+_memory_recorders = set()
+_memory_lock = threading.Lock()
+_started_tracing = False
+
+
+def _new_stage():
+    """Return the counters of a stage without calls."""
+    return {'calls': 0, 'seconds': 0.0, 'self_seconds': 0.0, 'characters': 0, 'bytes': 0, 'elements': 0}
+
+
+class Recorder:
+    """
+    Collects the stages of a recording.
+
+    Every stage has the number of calls, the total time including nested stages, the self
+    time without nested stages, the characters of HTML and bytes of files it read, and the
+    number of elements it returned.
+    """
+
+    def __init__(self, document=None, profile=False, trace_memory=False):
+        """
+        Create a recorder.
+
+        Args:
+            document (str, optional): The document the recording is for, e.g. its path. Defaults to None.
+            profile (bool, optional): Capture a cProfile profile. Defaults to False.
+            trace_memory (bool, optional): Capture the peak traced memory. Defaults to False.
+        """
+        self.document = document
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.documents = []
+        self.seconds = 0.0
+        self.memory_peak_bytes = None
+        self.profile_functions = None
+        # Time of the nested stages of every running stage
+        self._nested_seconds = []
+
+    def options(self):
+        """Return the options that document recordings started within this recording use."""
+        return {'profile': self.profile, 'trace_memory': self.trace_memory}
+
+    def add(self, name, seconds, characters=0, size=0, elements=0, nested_seconds=0.0):
+        """
+        Add a call to a stage.
+
+        Args:
+            name (str): The name of the stage
+            seconds (float): The time of the call
+            characters (int, optional): The characters of HTML the call read. Defaults to 0.
+            size (int, optional): The bytes of files the call read. Defaults to 0.
+            elements (int, optional): The number of elements the call returned. Defaults to 0.
+            nested_seconds (float, optional): The time of the nested stages of the call. Defaults to 0.0.
+        """
+        stage = self.stages.setdefault(name, _new_stage())
+        stage['calls'] += 1
+        stage['seconds'] += seconds
+        stage['self_seconds'] += seconds - nested_seconds
+        stage['characters'] += characters
+        stage['bytes'] += size
+        stage['elements'] += elements
+
+    def add_document(self, report):
+        """
+        Add the report of a document recording, e.g. from a worker process.
+
+        Its stages are added to the stages of this recorder.
+
+        Args:
+            report (dict): The report of the document
+        """
+        self.documents.append(report)
+        for name, values in report['stages'].items():
+            stage = self.stages.setdefault(name, _new_stage())
+            for key, value in values.items():
+                stage[key] += value
+        if report.get('memory_peak_bytes') is not None:
+            self.memory_peak_bytes = max(self.memory_peak_bytes or 0, report['memory_peak_bytes'])
+
+    def report(self):
+        """
+        Build the report of the recording.
+
+        Returns:
+            dict: The document, the wall time, the stages sorted by total time, the peak traced
+                  memory, the profiled functions and the reports of the documents
+        """
+        stages = dict(sorted(self.stages.items(), key=lambda item: item[1]['seconds'], reverse=True))
+        return {
+            'document': self.document,
+            'seconds': self.seconds,
+            'stages': stages,
+            'memory_peak_bytes': self.memory_peak_bytes,
+            'profile': self.profile_functions,
+            'documents': self.documents,
+        }
+
+
+def current_recorder():
+    """
+    Return the recorder of the current context.
+
+    Returns:
+        Recorder: The recorder, or None if nothing is recorded
+    """
+    return _current_recorder.get()
+
+
+def _profile_functions(profiler):
+    """Return the functions of a profile with the highest cumulative time."""
+    stats = pstats.Stats(profiler).stats
+    functions = []
+    for (file_name, line, function_name), (_, calls, self_time, cumulative, _) in stats.items():
+        functions.append({
+            'function': f'{os.path.basename(file_name)}:{line}({function_name})',
+            'calls': calls,
+            'self_seconds': self_time,
+            'cumulative_seconds': cumulative,
+        })
+    functions.sort(key=lambda function: function['cumulative_seconds'], reverse=True)
+    return functions[:PROFILE_TOP_FUNCTIONS]
+
+
+def _add_memory_peak():
+    """Add the traced memory peak since the last reset to the running memory recorders."""
+    peak = tracemalloc.get_traced_memory()[1]
+    for recorder in _memory_recorders:
+        recorder.memory_peak_bytes = max(recorder.memory_peak_bytes or 0, peak)
+
+
+def _start_memory_trace(recorder):
+    """Start measuring the memory peak of a recorder, starting tracemalloc if needed."""
+    global _started_tracing
+    with _memory_lock:
+        if tracemalloc.is_tracing():
+            # The peak is reset for the new recorder, the running ones keep it
+            _add_memory_peak()
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.start()
+            _started_tracing = True
+        _memory_recorders.add(recorder)
+
+
+def _stop_memory_trace(recorder):
+    """Stop measuring the memory peak of a recorder, stopping tracemalloc after the last one."""
+    global _started_tracing
+    with _memory_lock:
+        _add_memory_peak()
+        _memory_recorders.discard(recorder)
+        if not _memory_recorders and _started_tracing:
+            tracemalloc.stop()
+            _started_tracing = False
+
+
+@contextlib.contextmanager
+def record(document=None, callback=None, log=False, profile=False, trace_memory=False):
+    """
+    Record the stages of the conversion functions called in the block.
+
+    Recordings can be nested; the inner one gets the stages called in its block. Only the
+    outermost recording of a thread with profile=True runs cProfile, which profiles the
+    calls of its own thread. The memory peak is that of the whole process, so recordings
+    running at the same time in other threads include each other's allocations.
+
+    Args:
+        document (str, optional): The document the recording is for, e.g. its path. Defaults to None.
+        callback (function, optional): Called with the report when the block ends. Defaults to None.
+        log (bool, optional): Log the report as JSON to LOGGER at INFO level. Defaults to False.
+        profile (bool, optional): Capture a cProfile profile of the block. Defaults to False.
+        trace_memory (bool, optional): Capture the peak memory traced by tracemalloc. Defaults to False.
+
+    Yields:
+        Recorder: The recorder of the block
+    """
+    recorder = Recorder(document, profile, trace_memory)
+    token = _current_recorder.set(recorder)
+
+    profiler = None
+    if profile and not getattr(_profiler_state, 'active', False):
+        profiler = cProfile.Profile()
+        profiler.enable()
+        _profiler_state.active = True
+    if trace_memory:
+        _start_memory_trace(recorder)
+
+    start_time = time.perf_counter()
+    try:
+        yield recorder
+    finally:
+        recorder.seconds = time.perf_counter() - start_time
+        if profiler is not None:
+            profiler.disable()
+            _profiler_state.active = False
+            recorder.profile_functions = _profile_functions(profiler)
+        if trace_memory:
+            _stop_memory_trace(recorder)
+        _current_recorder.reset(token)
+
+        report = recorder.report()
+        if callback is not None:
+            callback(report)
+        if log:
+            LOGGER.info('%s', json.dumps(report), extra={'instrumentation': report})
+
+
+@contextlib.contextmanager
+def record_document(document, options):
+    """
+    Record a document of a batch if the batch is recorded.
+
+    Args:
+        document (str): The document, e.g. its path
+        options (dict): The options of Recorder.options of the batch recording, or None
+
+    Yields:
+        Recorder: The recorder of the document, or None if the batch is not recorded
+    """
+    if options is None:
+        yield None
+        return
+    with record(document, **options) as recorder:
+        yield recorder
+
+
+def recording_options():
+    """
+    Return the options for document recordings of the current recording.
+
+    Returns:
+        dict: The options, or None if nothing is recorded
+    """
+    recorder = _current_recorder.get()
+    return None if recorder is None else recorder.options()
+
+
+def html_characters(args, kwargs):
+    """Return the length of the HTML string passed as first argument."""
+    value = args[0] if args else kwargs.get('html_string', kwargs.get('html_code'))
+    return len(value) if isinstance(value, str) else 0
+
+
+def file_size(args, kwargs):
+    """Return the size of the file whose path is passed as first argument."""
+    value = args[0] if args else kwargs.get('input_path', kwargs.get('file_path'))
+    try:
+        return os.path.getsize(value)
+    except (OSError, TypeError):
+        return 0
+
+
+@contextlib.contextmanager
+def measure(name, characters=0, size=0):
+    """
+    Record a block as a call of a stage.
+
+    Without an active recording nothing is recorded.
+
+    Args:
+        name (str): The name of the stage
+        characters (int, optional): The characters of HTML the block reads. Defaults to 0.
+        size (int, optional): The bytes of files the block reads. Defaults to 0.
+
+    Yields:
+        dict: The counters characters, bytes and elements of the call, which the block can update
+    """
+    counters = {'characters': characters, 'bytes': size, 'elements': 0}
+    recorder = _current_recorder.get()
+    if recorder is None:
+        yield counters
+        return
+
+    recorder._nested_seconds.append(0.0)
+    start_time = time.perf_counter()
+    try:
+        yield counters
+    finally:
+        seconds = time.perf_counter() - start_time
+        nested_seconds = recorder._nested_seconds.pop()
+        if recorder._nested_seconds:
+            recorder._nested_seconds[-1] += seconds
+        recorder.add(name, seconds, counters['characters'], counters['bytes'], counters['elements'],
+                     nested_seconds)
+
+
+def stage(name=None, characters=None, size=None, elements=None):
+    """
+    Decorate a function to record its calls as a stage.
+
+    Without an active recording the function is called directly.
+
+    Args:
+        name (str, optional): The name of the stage. Defaults to the name of the function.
+        characters (function, optional): Returns the characters of HTML a call reads, from its
+                                         positional and keyword arguments. Defaults to None.
+        size (function, optional): Returns the bytes of files a call reads, from its positional
+                                   and keyword arguments. Defaults to None.
+        elements (function, optional): Returns the number of elements of the result of a call.
+                                       Defaults to None.
+
+    Returns:
+        function: The decorator
+    """
+    def decorator(function):
+        stage_name = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _current_recorder.get() is None:
+                return function(*args, **kwargs)
+
+            with measure(stage_name, characters(args, kwargs) if characters else 0,
+                         size(args, kwargs) if size else 0) as counters:
+                result = function(*args, **kwargs)
+                if elements and result is not None:
+                    counters['elements'] = elements(result)
+            return result
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,618 @@
+"""
+JasperReport XML generation for HTML to JasperReport conversion.
+
+This module contains the JrxmlWriter class, which writes a JRXML report element by element
+to a file or stream, and the functions converting HTML documents to JRXML with it. The
+elements are written as soon as they are converted, so the output is never held in memory.
+Every page container of the HTML is converted in its own frame: its bottom values are flipped
+against its own height and it is scaled to fit the report page. The report page size and
+margins are taken from a page profile (see shared.page_profiles), selected per call or detected
+from the first page container. Each distinct font becomes one named report style that the text
+elements reference.
+"""
+
+import io
+import os
+import uuid
+from xml.sax.saxutils import quoteattr
+
+from shared.element_boxes import TEXT_ELEMENT_TAGS, build_element_boxes, transform_element_boxes
+from shared.html_utils import convert_bottom_to_top, read_html_file
+from shared.images import ImageStore, extract_images
+from shared.page_profiles import get_page_profile, resolve_page_profile
+from shared.pages import find_pages
+from shared.spatial_index import merge_line_fragments
+
+# Size of text elements without width or height in JasperReport units
+DEFAULT_ELEMENT_WIDTH = 100
+DEFAULT_ELEMENT_HEIGHT = 20
+
+# Font of text elements without font styles
+DEFAULT_FONT_NAME = "Arial"
+DEFAULT_FONT_SIZE = 10
+
+# Name of the report written by JrxmlWriter.write_header
+DEFAULT_REPORT_NAME = "HTML5_Converted_Report"
+
+
+def cdata(text):
+    """
+    Wrap text in a CDATA section.
+
+    A `]]>` in the text is split across two sections, so any text can be wrapped.
+
+    Args:
+        text (str): The text to wrap
+
+    Returns:
+        str: The CDATA section
+    """
+    return '<![CDATA[' + text.replace(']]>', ']]]]><![CDATA[>') + ']]>'
+
+
+def java_string_literal(text):
+    """
+    Quote text as a Java string literal for JasperReport expressions.
+
+    Args:
+        text (str): The text to quote
+
+    Returns:
+        str: The string literal including the quotes
+    """
+    escaped = text.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n').replace('\r', '\\r')
+    return '"' + escaped + '"'
+
+
+def font_attributes(font):
+    """
+    Return the attributes a font is written with.
+
+    Args:
+        font (dict): The font with font_name, font_size, is_bold and is_italic
+
+    Returns:
+        tuple: The font name, the integer size, bold and italic, with the defaults for missing values
+    """
+    return (font.get('font_name') or DEFAULT_FONT_NAME, int(font.get('font_size') or DEFAULT_FONT_SIZE),
+            bool(font.get('is_bold')), bool(font.get('is_italic')))
+
+
+class JrxmlWriter:
+    """
+    Streaming writer for JasperReport XML.
+
+    The header, the elements and the footer are written to the stream as they are added. The
+    elements are placed in the title band of the report, or in detail bands that are started
+    with next_band, one per page of a multi-page document.
+    """
+
+    def __init__(self, stream, page_profile=None):
+        """
+        Create a writer for a text stream.
+
+        Args:
+            stream: The text stream to write to (e.g. an open file or io.StringIO)
+            page_profile (str or PageProfile, optional): The page profile or its name of the
+                                                         report page. Defaults to None (the
+                                                         default profile, A4).
+        """
+        self.stream = stream
+        self.element_count = 0
+        self.section = 'title'
+        self.page_profile = get_page_profile(page_profile)
+        self.band_width = self.page_profile.band_width
+        self.band_height = self.page_profile.band_height
+        # Style name of every font attribute tuple registered with write_header
+        self.styles = {}
+
+    def write_header(self, page_width=None, page_height=None, margin_top=None, margin_right=None,
+                     margin_bottom=None, margin_left=None, report_name=DEFAULT_REPORT_NAME, section='title',
+                     styles=None):
+        """
+        Write the XML header up to the opening tag of the first band.
+
+        The given styles are written as named report styles. Text elements written afterwards
+        with a font equal to one of these styles reference the style instead of writing the
+        font themselves. Unset page sizes and margins are taken from the page profile of the writer.
+
+        Args:
+            page_width (int, optional): Page width. Defaults to the page width of the profile.
+            page_height (int, optional): Page height. Defaults to the page height of the profile.
+            margin_top (int, optional): Top margin. Defaults to the top margin of the profile.
+            margin_right (int, optional): Right margin. Defaults to the right margin of the profile.
+            margin_bottom (int, optional): Bottom margin. Defaults to the bottom margin of the profile.
+            margin_left (int, optional): Left margin. Defaults to the left margin of the profile.
+            report_name (str, optional): The name of the report. Defaults to DEFAULT_REPORT_NAME.
+            section (str, optional): The section of the bands, "title" or "detail". Defaults to "title".
+            styles (dict, optional): The fonts of the report styles by style name. Defaults to None.
+        """
+        profile = self.page_profile
+        page_width = profile.page_width if page_width is None else page_width
+        page_height = profile.page_height if page_height is None else page_height
+        margin_top = profile.margin_top if margin_top is None else margin_top
+        margin_right = profile.margin_right if margin_right is None else margin_right
+        margin_bottom = profile.margin_bottom if margin_bottom is None else margin_bottom
+        margin_left = profile.margin_left if margin_left is None else margin_left
+
+        self.section = section
+        self.band_width = page_width - margin_left - margin_right
+        self.band_height = page_height - margin_top - margin_bottom
+        self.styles = {font_attributes(font): name for name, font in (styles or {}).items()}
+        self.stream.write(create_jasper_xml_header(page_width, page_height, margin_top, margin_right,
+                                                   margin_bottom, margin_left, report_name, section, styles))
+
+    def next_band(self):
+        """
+        Close the current band and open the next one, which starts on a new page.
+
+        Raises:
+            ValueError: If the section is not "detail", the only section with several bands
+        """
+        if self.section != 'detail':
+            raise ValueError(f"the {self.section} section has only one band")
+        self.stream.write(f'        </band>\n'
+                          f'        <band height="{self.band_height}" splitType="Prevent">\n')
+
+    def write_footer(self):
+        """Write the closing tags of the band, its section and the report."""
+        self.stream.write(create_jasper_xml_footer(self.section))
+
+    def _report_element(self, x, y, width, height, element_uuid, style=None):
+        """Return the reportElement tag of an element."""
+        if element_uuid is None:
+            element_uuid = str(uuid.uuid4())
+        style_attribute = f' style={quoteattr(style)}' if style else ''
+        return (f'                <reportElement x="{int(x)}" y="{int(y)}" width="{int(width)}" '
+                f'height="{int(height)}" uuid={quoteattr(element_uuid)}{style_attribute}/>\n')
+
+    def _text_style(self, font, style):
+        """Return the style and the inline font of a text element; registered fonts use their style."""
+        if style is None and font is not None:
+            style = self.styles.get(font_attributes(font))
+            if style is not None:
+                return style, None
+        return style, font
+
+    @staticmethod
+    def _text_element(font):
+        """Return the textElement tag of a text element with the given font."""
+        if font is None:
+            return ''
+        font_name, font_size, is_bold, is_italic = font_attributes(font)
+        return (f'                <textElement>\n'
+                f'                    <font fontName={quoteattr(font_name)} size="{font_size}" '
+                f'isBold="{str(is_bold).lower()}" isItalic="{str(is_italic).lower()}"/>\n'
+                f'                </textElement>\n')
+
+    def write_static_text(self, x, y, width, height, text, font=None, element_uuid=None, style=None):
+        """
+        Write a staticText element.
+
+        Args:
+            x (float): The x position in JasperReport units
+            y (float): The y position in JasperReport units
+            width (float): The width in JasperReport units
+            height (float): The height in JasperReport units
+            text (str): The text of the element
+            font (dict, optional): The font with font_name, font_size, is_bold and is_italic.
+                                   Defaults to None (no textElement).
+            element_uuid (str, optional): The UUID of the element. Defaults to a random UUID.
+            style (str, optional): The name of the report style of the element. Defaults to None
+                                   (the registered style of the font, if any).
+        """
+        style, font = self._text_style(font, style)
+        self.stream.write('            <staticText>\n'
+                          + self._report_element(x, y, width, height, element_uuid, style)
+                          + self._text_element(font)
+                          + f'                <text>{cdata(text)}</text>\n'
+                          + '            </staticText>\n')
+        self.element_count += 1
+
+    def write_text_field(self, x, y, width, height, expression, font=None, element_uuid=None,
+                         expression_class=None, style=None):
+        """
+        Write a textField element.
+
+        Args:
+            x (float): The x position in JasperReport units
+            y (float): The y position in JasperReport units
+            width (float): The width in JasperReport units
+            height (float): The height in JasperReport units
+            expression (str): The text field expression (e.g. `$F{name}` or a Java string literal)
+            font (dict, optional): The font with font_name, font_size, is_bold and is_italic.
+                                   Defaults to None (no textElement).
+            element_uuid (str, optional): The UUID of the element. Defaults to a random UUID.
+            expression_class (str, optional): The class of the expression (e.g. "java.lang.String").
+                                              Defaults to None.
+            style (str, optional): The name of the report style of the element. Defaults to None
+                                   (the registered style of the font, if any).
+        """
+        style, font = self._text_style(font, style)
+        class_attribute = f' class={quoteattr(expression_class)}' if expression_class else ''
+        self.stream.write('            <textField>\n'
+                          + self._report_element(x, y, width, height, element_uuid, style)
+                          + self._text_element(font)
+                          + f'                <textFieldExpression{class_attribute}>{cdata(expression)}'
+                            '</textFieldExpression>\n'
+                          + '            </textField>\n')
+        self.element_count += 1
+
+    def write_image(self, x, y, width, height, expression, element_uuid=None):
+        """
+        Write an image element.
+
+        Args:
+            x (float): The x position in JasperReport units
+            y (float): The y position in JasperReport units
+            width (float): The width in JasperReport units
+            height (float): The height in JasperReport units
+            expression (str): The image expression (e.g. a Java string literal with the path)
+            element_uuid (str, optional): The UUID of the element. Defaults to a random UUID.
+        """
+        self.stream.write('            <image>\n'
+                          + self._report_element(x, y, width, height, element_uuid)
+                          + f'                <imageExpression>{cdata(expression)}</imageExpression>\n'
+                          + '            </image>\n')
+        self.element_count += 1
+
+
+def create_jasper_xml_header(page_width, page_height, margin_top, margin_right, margin_bottom, margin_left,
+                             report_name=DEFAULT_REPORT_NAME, section='title', styles=None):
+    """
+    Create the XML header of a JasperReport document.
+
+    Args:
+        page_width (int): Page width
+        page_height (int): Page height
+        margin_top (int): Top margin
+        margin_right (int): Right margin
+        margin_bottom (int): Bottom margin
+        margin_left (int): Left margin
+        report_name (str, optional): The name of the report. Defaults to DEFAULT_REPORT_NAME.
+        section (str, optional): The section of the first band, "title" or "detail". Defaults to "title".
+        styles (dict, optional): The fonts of the report styles by style name. Defaults to None.
+
+    Returns:
+        str: The XML header
+    """
+    style_tags = ''.join(create_jasper_style(name, font) for name, font in (styles or {}).items())
+    header = f"""<?xml version="1.0" encoding="UTF-8"?>
+<!-- Created with HTML5 to JasperReports Converter -->
+<jasperReport xmlns="http://jasperreports.sourceforge.net/jasperreports"
+              xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
+              xsi:schemaLocation="http://jasperreports.sourceforge.net/jasperreports http://jasperreports.sourceforge.net/xsd/jasperreport.xsd"
+              name={quoteattr(report_name)}
+              pageWidth="{page_width}"
+              pageHeight="{page_height}"
+              topMargin="{margin_top}"
+              rightMargin="{margin_right}"
+              bottomMargin="{margin_bottom}"
+              leftMargin="{margin_left}">
+    <property name="com.jaspersoft.studio.data.defaultdataadapter" value="One Empty Record"/>
+{style_tags}    <queryString>
+        <![CDATA[]]>
+    </queryString>
+    <background>
+        <band splitType="Stretch"/>
+    </background>
+    <{section}>
+        <band height="{page_height - margin_top - margin_bottom}" splitType="{'Stretch' if section == 'title' else 'Prevent'}">
+"""
+    return header
+
+
+def create_jasper_style(name, font):
+    """
+    Create a named report style with a font.
+
+    Args:
+        name (str): The name of the style
+        font (dict): The font with font_name, font_size, is_bold and is_italic
+
+    Returns:
+        str: The style tag
+    """
+    font_name, font_size, is_bold, is_italic = font_attributes(font)
+    return (f'    <style name={quoteattr(name)} fontName={quoteattr(font_name)} fontSize="{font_size}" '
+            f'isBold="{str(is_bold).lower()}" isItalic="{str(is_italic).lower()}"/>\n')
+
+
+def create_jasper_xml_footer(section='title'):
+    """
+    Create the XML footer of a JasperReport document.
+
+    Args:
+        section (str, optional): The section of the last band, "title" or "detail". Defaults to "title".
+
+    Returns:
+        str: The XML footer
+    """
+    footer = f"""        </band>
+    </{section}>
+</jasperReport>
+"""
+    return footer
+
+
+def prepare_element_boxes(html_string, convert_bottom=True, html_height=None, include_images=True,
+                          merge_lines=False, image_dir=None, page_profile=None):
+    """
+    Build the element boxes of an HTML document for the JRXML conversion.
+
+    With image_dir, data URI images are moved into files first (see extract_images), so the
+    image expressions reference the files instead of holding the image data and the later
+    passes do not carry the payloads.
+
+    Args:
+        html_string (str): The HTML code to convert
+        convert_bottom (bool, optional): Convert bottom positions to top positions in the HTML
+                                         first. Defaults to True.
+        html_height (float, optional): The height of content outside of page containers.
+                                       Defaults to the HTML height of the page profile.
+        include_images (bool, optional): Convert img elements. Defaults to True.
+        merge_lines (bool, optional): Merge text fragments of the same line (see
+                                      merge_line_fragments). Defaults to False.
+        image_dir (str, optional): The folder to move data URI images to. Defaults to None
+                                   (keep them in the image expressions).
+        page_profile (str or PageProfile, optional): The page profile, its name or "auto" for the
+                                                     size of content outside of page containers.
+                                                     Defaults to None (the default profile).
+
+    Returns:
+        list: The ElementBox objects, or None if the HTML could not be parsed
+    """
+    profile = resolve_page_profile(page_profile, html_string)
+    if html_height is not None and html_height != profile.html_height:
+        profile = profile._replace(html_height=html_height)
+    if image_dir is not None:
+        html_string = extract_images(html_string, ImageStore(image_dir))
+    if convert_bottom:
+        html_string = convert_bottom_to_top(html_string, page_profile=profile)
+
+    element_boxes = build_element_boxes(html_string, include_images, profile.html_height, profile.html_width)
+    if element_boxes is not None and merge_lines:
+        element_boxes = merge_line_fragments(element_boxes)
+    return element_boxes
+
+
+def write_html_as_jasper(html_string, writer, scale_factor_x=None, scale_factor_y=None, **kwargs):
+    """
+    Convert the elements of an HTML document and write them with a JrxmlWriter.
+
+    The document is turned into element boxes with prepare_element_boxes and written with
+    write_element_boxes.
+
+    Args:
+        html_string (str): The HTML code to convert
+        writer (JrxmlWriter): The writer to write the elements with
+        scale_factor_x (float, optional): Horizontal scale factor for all pages. Defaults to None
+                                          (band width / page width of every page).
+        scale_factor_y (float, optional): Vertical scale factor for all pages. Defaults to None
+                                          (band height / page height of every page).
+        **kwargs: Arguments of prepare_element_boxes
+
+    Returns:
+        int: The number of elements written, or -1 if the HTML could not be parsed
+    """
+    element_boxes = prepare_element_boxes(html_string, **kwargs)
+    if element_boxes is None:
+        return -1
+    return write_element_boxes(element_boxes, writer, scale_factor_x, scale_factor_y)
+
+
+def _box_scale_factors(element_boxes, band_width, band_height, scale_factor_x, scale_factor_y):
+    """Return the horizontal and vertical scale factor of every box, fitting its page to the band if not given."""
+    # The pages are shared between the boxes, their factors are computed once per page
+    page_factors = {}
+    for box in element_boxes:
+        if box.page not in page_factors:
+            page_factors[box.page] = (band_width / box.page.width if scale_factor_x is None else scale_factor_x,
+                                      band_height / box.page.height if scale_factor_y is None else scale_factor_y)
+    factors = [page_factors[box.page] for box in element_boxes]
+    return [factor[0] for factor in factors], [factor[1] for factor in factors]
+
+
+def _scaled_font(font, scale):
+    """Return a copy of a font with the size scaled, or the default size if it has none."""
+    # Fonts are shared between boxes, the scaled size goes into a copy
+    font = dict(font)
+    if font['font_size'] is None:
+        font['font_size'] = DEFAULT_FONT_SIZE
+    else:
+        font['font_size'] *= scale
+    return font
+
+
+def collect_font_styles(element_boxes, band_width, band_height, scale_factor_x=None, scale_factor_y=None):
+    """
+    Collect one report style per distinct font of the text boxes.
+
+    The fonts are scaled like in write_element_boxes and compared by the attributes they are
+    written with. A style is named after the font class of the first box using it (e.g. `s0`);
+    further fonts of the same class, e.g. from pages of other sizes, get a numbered suffix, and
+    fonts of boxes without font class are named `font1`, `font2`, ...
+
+    Args:
+        element_boxes (list): The ElementBox objects in pixels
+        band_width (float): The width of the band the pages are scaled to
+        band_height (float): The height of the band the pages are scaled to
+        scale_factor_x (float, optional): Horizontal scale factor for all pages. Defaults to None
+                                          (band width / page width of every page).
+        scale_factor_y (float, optional): Vertical scale factor for all pages. Defaults to None
+                                          (band height / page height of every page).
+
+    Returns:
+        dict: The scaled fonts by style name, in the order of first use
+    """
+    scale_x, scale_y = _box_scale_factors(element_boxes, band_width, band_height, scale_factor_x, scale_factor_y)
+    styles = {}
+    names = {}
+    for index, box in enumerate(element_boxes):
+        if box.kind != 'text':
+            continue
+        font = _scaled_font(box.font, min(scale_x[index], scale_y[index]))
+        attributes = font_attributes(font)
+        if attributes in names:
+            continue
+        base = box.style_class or 'font'
+        name = base if box.style_class else f'{base}1'
+        number = 1
+        while name in styles:
+            number += 1
+            name = f'{base}_{number}' if box.style_class else f'{base}{number}'
+        names[attributes] = name
+        styles[name] = font
+    return styles
+
+
+def write_element_boxes(element_boxes, writer, scale_factor_x=None, scale_factor_y=None):
+    """
+    Write element boxes with a JrxmlWriter.
+
+    Text boxes are written as staticText elements with their text and font, image boxes as
+    image elements with their source as expression. Every box is transformed in the frame of
+    its page: bottom values are flipped against the page height and the page is scaled to the
+    band of the writer. All boxes are transformed in one batch. If the writer is in the detail
+    section, every page after the first starts a new band. Fonts registered as styles with
+    the header of the writer are referenced by their style name.
+
+    Args:
+        element_boxes (list): The ElementBox objects in pixels, ordered by page
+        writer (JrxmlWriter): The writer to write the elements with
+        scale_factor_x (float, optional): Horizontal scale factor for all pages. Defaults to None
+                                          (band width / page width of every page).
+        scale_factor_y (float, optional): Vertical scale factor for all pages. Defaults to None
+                                          (band height / page height of every page).
+
+    Returns:
+        int: The number of elements written
+    """
+    scale_x, scale_y = _box_scale_factors(element_boxes, writer.band_width, writer.band_height,
+                                          scale_factor_x, scale_factor_y)
+    transformed = transform_element_boxes(element_boxes, bottom_to_top=True, scale_x=scale_x, scale_y=scale_y)
+
+    start_count = writer.element_count
+    current_page = transformed[0].page.number if transformed else 0
+    for index, box in enumerate(transformed):
+        if box.page.number != current_page:
+            current_page = box.page.number
+            if writer.section == 'detail':
+                writer.next_band()
+
+        x = box.left or 0
+        y = box.top or 0
+        if box.kind == 'image':
+            writer.write_image(x, y, box.width or 0, box.height or 0, java_string_literal(box.text))
+            continue
+
+        font = _scaled_font(box.font, min(scale_x[index], scale_y[index]))
+        writer.write_static_text(x, y, DEFAULT_ELEMENT_WIDTH if box.width is None else box.width,
+                                 DEFAULT_ELEMENT_HEIGHT if box.height is None else box.height, box.text, font)
+
+    return writer.element_count - start_count
+
+
+def convert_html_to_jasper(html_string, output, include_header=True, include_footer=True, shared_styles=True,
+                           scale_factor_x=None, scale_factor_y=None, page_profile=None, **kwargs):
+    """
+    Convert an HTML document to JasperReport XML and write it to a file or stream.
+
+    With shared_styles, every distinct font becomes a report style in the header (see
+    collect_font_styles) and the text elements reference it instead of repeating the font.
+    The report page is that of the page profile; with "auto" it is detected per document from
+    its first page container, so documents of different formats can be converted in one batch.
+
+    Args:
+        html_string (str): The HTML code to convert
+        output (str or file): The path of the JRXML file or a text stream to write to
+        include_header (bool, optional): Write the XML header. Defaults to True.
+        include_footer (bool, optional): Write the XML footer. Defaults to True.
+        shared_styles (bool, optional): Write the fonts as report styles in the header. Only
+                                        used with include_header. Defaults to True.
+        scale_factor_x (float, optional): Horizontal scale factor for all pages. Defaults to None
+                                          (band width / page width of every page).
+        scale_factor_y (float, optional): Vertical scale factor for all pages. Defaults to None
+                                          (band height / page height of every page).
+        page_profile (str or PageProfile, optional): The page profile, its name or "auto" (see
+                                                     shared.page_profiles). Defaults to None
+                                                     (the default profile, A4).
+        **kwargs: Arguments of prepare_element_boxes
+
+    Returns:
+        int: The number of elements written, or -1 if the HTML could not be parsed
+
+    Raises:
+        ValueError: If no page profile has the given name
+    """
+    if isinstance(output, (str, os.PathLike)):
+        output_dir = os.path.dirname(output)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as file:
+            return convert_html_to_jasper(html_string, file, include_header, include_footer, shared_styles,
+                                          scale_factor_x, scale_factor_y, page_profile, **kwargs)
+
+    profile = resolve_page_profile(page_profile, html_string)
+    element_boxes = prepare_element_boxes(html_string, page_profile=profile, **kwargs)
+    writer = JrxmlWriter(output, profile)
+    if include_header:
+        styles = None
+        if shared_styles and element_boxes:
+            styles = collect_font_styles(element_boxes, writer.band_width, writer.band_height,
+                                         scale_factor_x, scale_factor_y)
+        # Multi-page documents get one detail band per page
+        writer.write_header(section='detail' if len(find_pages(html_string)) > 1 else 'title', styles=styles)
+    element_count = -1
+    if element_boxes is not None:
+        element_count = write_element_boxes(element_boxes, writer, scale_factor_x, scale_factor_y)
+    if include_footer:
+        writer.write_footer()
+    return element_count
+
+
+def convert_html_file_to_jasper(input_path, output_path, **kwargs):
+    """
+    Convert an HTML file to a JRXML file.
+
+    Args:
+        input_path (str): The path of the HTML file
+        output_path (str): The path of the JRXML file to write
+        **kwargs: Arguments of convert_html_to_jasper
+
+    Returns:
+        int: The number of elements written, or -1 if the HTML could not be parsed
+
+    Raises:
+        OSError: If the HTML file cannot be read
+        UnicodeDecodeError: If the HTML file is not valid UTF-8
+    """
+    return convert_html_to_jasper(read_html_file(input_path), output_path, **kwargs)
+
+
+def convert_html_to_jasper_snippets(html_string, scale_factor_x=None, scale_factor_y=None,
+                                    include_header=True, include_footer=True, convert_bottom=True,
+                                    shared_styles=True, page_profile=None):
+    """
+    Convert HTML code to JasperReport XML snippets.
+
+    Args:
+        html_string (str): The HTML code to convert
+        scale_factor_x (float, optional): Horizontal scale factor. Defaults to None (fit every page).
+        scale_factor_y (float, optional): Vertical scale factor. Defaults to None (fit every page).
+        include_header (bool, optional): Include the XML header. Defaults to True.
+        include_footer (bool, optional): Include the XML footer. Defaults to True.
+        convert_bottom (bool, optional): Convert bottom positions to top positions. Defaults to True.
+        shared_styles (bool, optional): Write the fonts as report styles in the header. Defaults to True.
+        page_profile (str or PageProfile, optional): The page profile, its name or "auto". Defaults to None.
+
+    Returns:
+        str: The JasperReport XML
+    """
+    output = io.StringIO()
+    element_count = convert_html_to_jasper(html_string, output, include_header, include_footer, shared_styles,
+                                           scale_factor_x=scale_factor_x, scale_factor_y=scale_factor_y,
+                                           page_profile=page_profile, convert_bottom=convert_bottom)
+    if element_count < 0:
+        return "Error parsing the HTML code."
+    return output.getvalue()
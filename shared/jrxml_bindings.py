@@ -0,0 +1,488 @@
+"""
+Rule-driven binding of static report texts to parameters and fields.
+
+This module replaces the interactive transform_jasper_report of the old notebook, which
+asked for every textField whether it becomes a parameter or a field. Here a list of rules
+decides: the first rule whose text pattern, region, band and style match an element binds
+it to a `$P{name}` parameter or `$F{name}` field, or leaves it static. The `<parameter>`
+and `<field>` declarations the bound elements need are inserted into the report, so a
+template can be derived from any number of reports in a batch.
+
+The report is processed as a token stream in two passes, the first collecting the
+declarations and the second writing the report, so memory does not grow with the report.
+"""
+
+import io
+import json
+import os
+import re
+from collections import namedtuple
+from xml.sax.saxutils import quoteattr
+
+from shared.css_rewrite import DEFAULT_CHUNK_SIZE
+from shared.jasper_xml import cdata, java_string_literal
+from shared.jrxml_postprocess import TAG_NAME_PATTERN, iter_xml_tokens
+
+# A binding rule:
+#   kind: "parameter", "field" or "static" (keep the element as it is)
+#   name: the name of the parameter or field; may refer to groups of the pattern as \1 or \g<name>
+#   pattern: regular expression searched in the text of the element, None for any text
+#   region: (x, y, width, height) in report units the top left corner of the element lies in, None for anywhere
+#   band: the number of the band in document order (e.g. the page), None for any band
+#   style: regular expression matching the whole style name of the element, None for any style
+#   value_class: the Java class of the parameter or field
+#   default: write the text as defaultValueExpression of a java.lang.String parameter
+BindingRule = namedtuple('BindingRule', ['kind', 'name', 'pattern', 'region', 'band', 'style', 'value_class',
+                                         'default'],
+                         defaults=(None, None, None, None, None, 'java.lang.String', True))
+
+RULE_KINDS = ('parameter', 'field', 'static')
+
+# Expression prefix of the bound elements by rule kind
+EXPRESSION_PREFIXES = {'parameter': 'P', 'field': 'F'}
+
+# Pattern for one attribute of a tag
+ATTRIBUTE_PATTERN = re.compile(r'\s([\w:.-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+
+# Pattern for an expression that is a single Java string literal
+JAVA_STRING_LITERAL_PATTERN = re.compile(r'\s*"((?:[^"\\]|\\.)*)"\s*', re.DOTALL)
+
+# Pattern for an escape sequence of a Java string literal
+JAVA_ESCAPE_PATTERN = re.compile(r'\\(u[0-9a-fA-F]{4}|.)', re.DOTALL)
+
+JAVA_ESCAPES = {'n': '\n', 'r': '\r', 't': '\t', 'b': '\b', 'f': '\f'}
+
+# Report children that follow the parameters and the fields in the JRXML schema
+_AFTER_PARAMETERS = ('queryString', 'field', 'sortField', 'variable', 'filterExpression', 'group', 'background',
+                     'title', 'pageHeader', 'columnHeader', 'detail', 'columnFooter', 'pageFooter',
+                     'lastPageFooter', 'summary', 'noData')
+_AFTER_FIELDS = _AFTER_PARAMETERS[2:]
+
+# Indentation of the inserted declarations
+_INDENT = '    '
+
+
+def compile_rules(rules):
+    """
+    Validate binding rules and compile their patterns.
+
+    Args:
+        rules (list): BindingRule objects or dictionaries with their fields
+
+    Returns:
+        list: The BindingRule objects with compiled patterns
+
+    Raises:
+        ValueError: If a rule has an unknown kind, no name or an invalid region
+    """
+    compiled = []
+    for rule in rules:
+        if isinstance(rule, dict):
+            rule = BindingRule(**rule)
+        if rule.kind not in RULE_KINDS:
+            raise ValueError(f"unknown rule kind {rule.kind!r}, expected one of {', '.join(RULE_KINDS)}")
+        if rule.kind != 'static' and not rule.name:
+            raise ValueError(f"the {rule.kind} rule for {rule.pattern!r} has no name")
+        if rule.region is not None and len(rule.region) != 4:
+            raise ValueError(f"the region {rule.region!r} is not (x, y, width, height)")
+        compiled.append(rule._replace(
+            pattern=re.compile(rule.pattern) if isinstance(rule.pattern, str) else rule.pattern,
+            style=re.compile(rule.style) if isinstance(rule.style, str) else rule.style,
+            region=tuple(rule.region) if rule.region is not None else None,
+        ))
+    return compiled
+
+
+def load_binding_rules(rules):
+    """
+    Load binding rules from a JSON file.
+
+    The file holds a list of objects with the fields of BindingRule, e.g.
+    `[{"kind": "field", "name": "article_number", "pattern": "^\\\\d{9}$"}]`.
+
+    Args:
+        rules (str or list): The path to the JSON file, or the rules themselves
+
+    Returns:
+        list: The compiled BindingRule objects
+    """
+    if isinstance(rules, (str, os.PathLike)):
+        with open(rules, 'r', encoding='utf-8') as file:
+            rules = json.load(file)
+    return compile_rules(rules)
+
+
+def declaration_name(name):
+    """
+    Make a parameter or field name a valid Java identifier.
+
+    Args:
+        name (str): The name, e.g. expanded from the text of an element
+
+    Returns:
+        str: The name with every other character replaced by an underscore
+    """
+    name = re.sub(r'\W', '_', name.strip(), flags=re.ASCII)
+    if not name or name[0].isdigit():
+        name = '_' + name
+    return name
+
+
+def parse_java_string_literal(expression):
+    """
+    Return the text of an expression that is a single Java string literal.
+
+    Args:
+        expression (str): The expression
+
+    Returns:
+        str: The text of the literal, or None if the expression is not a single string literal
+    """
+    match = JAVA_STRING_LITERAL_PATTERN.fullmatch(expression)
+    if not match:
+        return None
+
+    def unescape(escape):
+        value = escape.group(1)
+        if value[0] == 'u':
+            return chr(int(value[1:], 16))
+        return JAVA_ESCAPES.get(value, value)
+
+    return JAVA_ESCAPE_PATTERN.sub(unescape, match.group(1))
+
+
+def _attributes(tag):
+    """Return the attributes of a tag as a dictionary."""
+    return {match.group(1): _unescape_text(match.group(2) if match.group(2) is not None else match.group(3))
+            for match in ATTRIBUTE_PATTERN.finditer(tag)}
+
+
+def _int_attribute(attributes, name):
+    """Return an attribute as an integer, 0 if it is missing or not a number."""
+    try:
+        return int(float(attributes.get(name, 0)))
+    except ValueError:
+        return 0
+
+
+class _TextElement:
+    """The tokens of a textField or staticText element and what the rules match on."""
+
+    def __init__(self, name, band):
+        self.name = name
+        self.band = band
+        self.tokens = []
+        self.x = 0
+        self.y = 0
+        self.style = ''
+        self.content = []
+        # Whether the tokens are inside the expression or text of the element
+        self.in_content = False
+
+    def add(self, token, tag_name=None, is_end=False):
+        """Add the next token of the element."""
+        self.tokens.append(token)
+        if tag_name == 'reportElement' and not is_end:
+            attributes = _attributes(token)
+            self.x = _int_attribute(attributes, 'x')
+            self.y = _int_attribute(attributes, 'y')
+            self.style = attributes.get('style', '')
+        elif tag_name in ('textFieldExpression', 'text'):
+            self.in_content = not is_end and token[-2] != '/'
+        elif self.in_content:
+            self.content.append(token[9:-3] if token.startswith('<![CDATA[') else _unescape_text(token))
+
+    def text(self):
+        """Return the static text of the element, None if it is computed."""
+        content = ''.join(self.content)
+        if self.name == 'staticText':
+            return content
+        return parse_java_string_literal(content)
+
+    def bound(self, prefix, name):
+        """Return the element with the given expression as textField."""
+        parts = []
+        in_content = False
+        for token in self.tokens:
+            tag_name = _tag_name(token)
+            if in_content and tag_name not in ('textFieldExpression', 'text'):
+                continue
+            if tag_name == self.name:
+                token = token[:1 + (token[1] == '/')] + 'textField' + token[1 + (token[1] == '/') + len(self.name):]
+            elif tag_name in ('textFieldExpression', 'text'):
+                if token[1] == '/':
+                    parts.append(cdata(f'${prefix}{{{name}}}'))
+                    token = '</textFieldExpression>'
+                    in_content = False
+                else:
+                    attributes = token[1 + len(tag_name):].rstrip('>').rstrip('/')
+                    if token[-2] == '/':
+                        # An empty text
+                        token = (f'<textFieldExpression{attributes}>{cdata(f"${prefix}{{{name}}}")}'
+                                 '</textFieldExpression>')
+                    else:
+                        token = f'<textFieldExpression{attributes}>'
+                        in_content = True
+            parts.append(token)
+        return ''.join(parts)
+
+
+def _tag_name(token):
+    """Return the local name of a tag token, None for other tokens."""
+    if token[:1] != '<' or token[1:2] in ('!', '?'):
+        return None
+    match = TAG_NAME_PATTERN.match(token.replace('</', '<', 1))
+    return match.group(1).rpartition(':')[2] if match else None
+
+
+def _unescape_text(text):
+    """Resolve the predefined entities of XML text."""
+    for entity, character in (('&lt;', '<'), ('&gt;', '>'), ('&quot;', '"'), ('&apos;', "'"), ('&amp;', '&')):
+        text = text.replace(entity, character)
+    return text
+
+
+def _match_rule(rules, element):
+    """Return the first rule matching an element and the name it binds to, or (None, None)."""
+    text = element.text()
+    if text is None:
+        return None, None
+    for rule in rules:
+        if rule.band is not None and rule.band != element.band:
+            continue
+        if rule.style is not None and not rule.style.fullmatch(element.style):
+            continue
+        if rule.region is not None:
+            x, y, width, height = rule.region
+            if not (x <= element.x < x + width and y <= element.y < y + height):
+                continue
+        match = None
+        if rule.pattern is not None:
+            match = rule.pattern.search(text)
+            if not match:
+                continue
+        if rule.kind == 'static':
+            return None, None
+        try:
+            name = match.expand(rule.name) if match else rule.name
+        except (IndexError, re.error) as e:
+            raise ValueError(f"invalid name {rule.name!r} of the rule for {rule.pattern.pattern!r}: {e}") from e
+        return rule, declaration_name(name)
+    return None, None
+
+
+def _iter_elements(reader, chunk_size):
+    """
+    Split a report into tokens and text elements.
+
+    Yields:
+        tuple: (token, None, depth, tag name) for tokens outside of text elements and
+               (None, element, depth, None) for every complete textField or staticText element
+    """
+    depth = 0
+    band = 0
+    section = None
+    element = None
+    element_depth = 0
+
+    for token in iter_xml_tokens(reader, chunk_size):
+        tag_name = _tag_name(token)
+        is_end = token.startswith('</')
+        is_start = tag_name is not None and not is_end and token[-2] != '/'
+
+        if element is not None:
+            element.add(token, tag_name, is_end)
+            if is_start:
+                depth += 1
+            elif is_end:
+                depth -= 1
+                if depth == element_depth:
+                    yield None, element, depth, None
+                    element = None
+            continue
+
+        if is_start and tag_name in ('textField', 'staticText'):
+            element = _TextElement(tag_name, band)
+            element.add(token, tag_name)
+            element_depth = depth
+            depth += 1
+            continue
+
+        if tag_name is not None and not is_end:
+            if depth == 1:
+                section = tag_name
+            elif tag_name == 'band' and is_start and section != 'background':
+                band += 1
+        yield token, None, depth, tag_name
+        if is_start:
+            depth += 1
+        elif is_end:
+            depth -= 1
+
+    if element is not None:
+        raise ValueError(f"report ends inside a {element.name} element")
+
+
+def _collect_declarations(reader, rules, chunk_size):
+    """Return the declarations of the bound elements and the names declared in the report."""
+    declarations = {}
+    declared = set()
+    for token, element, depth, tag_name in _iter_elements(reader, chunk_size):
+        if element is None:
+            if depth == 1 and tag_name in ('parameter', 'field'):
+                declared.add((tag_name, _attributes(token).get('name')))
+            continue
+        rule, name = _match_rule(rules, element)
+        if rule is None:
+            continue
+        declaration = declarations.get(name)
+        if declaration is None:
+            declarations[name] = (rule.kind, rule.value_class, element.text() if rule.default else None)
+        elif declaration[:2] != (rule.kind, rule.value_class):
+            raise ValueError(f"{name} is bound as {declaration[0]} {declaration[1]} "
+                             f"and as {rule.kind} {rule.value_class}")
+    return declarations, declared
+
+
+def create_parameter_declaration(name, value_class, default_text=None):
+    """
+    Create a parameter declaration.
+
+    Args:
+        name (str): The name of the parameter
+        value_class (str): The Java class of the parameter
+        default_text (str, optional): The text of a java.lang.String default value. Defaults to None.
+
+    Returns:
+        str: The parameter tag
+    """
+    if default_text is None or value_class != 'java.lang.String':
+        return f'<parameter name={quoteattr(name)} class={quoteattr(value_class)}/>\n'
+    return (f'<parameter name={quoteattr(name)} class={quoteattr(value_class)}>\n'
+            f'{_INDENT * 2}<defaultValueExpression>{cdata(java_string_literal(default_text))}'
+            f'</defaultValueExpression>\n'
+            f'{_INDENT}</parameter>\n')
+
+
+def create_field_declaration(name, value_class, description=None):
+    """
+    Create a field declaration.
+
+    Args:
+        name (str): The name of the field
+        value_class (str): The Java class of the field
+        description (str, optional): The field description, e.g. the text it replaces. Defaults to None.
+
+    Returns:
+        str: The field tag
+    """
+    if description is None:
+        return f'<field name={quoteattr(name)} class={quoteattr(value_class)}/>\n'
+    return (f'<field name={quoteattr(name)} class={quoteattr(value_class)}>\n'
+            f'{_INDENT * 2}<fieldDescription>{cdata(description)}</fieldDescription>\n'
+            f'{_INDENT}</field>\n')
+
+
+def stream_bind_text_fields(reader, writer, rules, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Bind the static texts of a report to parameters and fields while copying it.
+
+    Every textField whose expression is a single string literal and every staticText is
+    matched against the rules in order; the first match binds it or leaves it static.
+    Bound elements become textFields with a `$P{name}` or `$F{name}` expression. The
+    declarations of the new names are inserted after the existing parameters and fields;
+    names the report declares already are not declared again. Everything else is copied
+    unchanged.
+
+    Args:
+        reader (io.TextIOBase): The seekable text stream to read the report from; it is read twice
+        writer (io.TextIOBase): The text stream to write the report to
+        rules (list): The BindingRule objects or dictionaries, see compile_rules
+        chunk_size (int, optional): The number of characters to read at once. Defaults to DEFAULT_CHUNK_SIZE.
+
+    Returns:
+        dict: The number of bound elements and of declared parameters and fields
+
+    Raises:
+        ValueError: If a name is bound as parameter and field or with different classes, or
+                    the report ends inside an element
+    """
+    rules = compile_rules(rules)
+    start = reader.tell()
+    declarations, declared = _collect_declarations(reader, rules, chunk_size)
+    reader.seek(start)
+
+    new_declarations = {kind: [] for kind in EXPRESSION_PREFIXES}
+    for name, (kind, value_class, text) in declarations.items():
+        if (kind, name) not in declared:
+            new_declarations[kind].append(
+                create_parameter_declaration(name, value_class, text) if kind == 'parameter'
+                else create_field_declaration(name, value_class, text))
+    pending = {kind: ''.join(_INDENT + tag for tag in tags) for kind, tags in new_declarations.items()}
+
+    bound_count = 0
+    for token, element, depth, tag_name in _iter_elements(reader, chunk_size):
+        if element is not None:
+            rule, name = _match_rule(rules, element)
+            if rule is None:
+                writer.write(''.join(element.tokens))
+            else:
+                writer.write(element.bound(EXPRESSION_PREFIXES[rule.kind], name))
+                bound_count += 1
+            continue
+
+        if depth == 1 and tag_name is not None and not token.startswith('</'):
+            # The whitespace before the tag is written already, so the tag gets the indentation
+            if pending['parameter'] and tag_name in _AFTER_PARAMETERS:
+                writer.write(pending['parameter'].lstrip(' ') + _INDENT)
+                pending['parameter'] = ''
+            if pending['field'] and tag_name in _AFTER_FIELDS:
+                writer.write(pending['field'].lstrip(' ') + _INDENT)
+                pending['field'] = ''
+        elif depth == 0 and tag_name == 'jasperReport' and token.startswith('</'):
+            # A report without bands
+            writer.write(pending['parameter'] + pending['field'])
+            pending = {kind: '' for kind in pending}
+        writer.write(token)
+
+    return {'bound': bound_count, 'parameters': len(new_declarations['parameter']),
+            'fields': len(new_declarations['field'])}
+
+
+def transform_jasper_report(xml_content, rules):
+    """
+    Bind the static texts of a JRXML string to parameters and fields by rules.
+
+    Args:
+        xml_content (str): The JRXML content
+        rules (list): The BindingRule objects or dictionaries, see compile_rules
+
+    Returns:
+        str: The JRXML content with bound elements and their declarations
+    """
+    output = io.StringIO()
+    stream_bind_text_fields(io.StringIO(xml_content), output, rules)
+    return output.getvalue()
+
+
+def bind_jrxml_file(input_path, output_path, rules, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Bind the static texts of a JRXML file to parameters and fields without loading it into memory.
+
+    Args:
+        input_path (str): The path to the JRXML file
+        output_path (str): The path to save the bound JRXML file to
+        rules (str or list): The path to a JSON rule file, or the rules, see load_binding_rules
+        chunk_size (int, optional): The number of characters to read at once. Defaults to DEFAULT_CHUNK_SIZE.
+
+    Returns:
+        dict: The number of bound elements and of declared parameters and fields
+    """
+    rules = load_binding_rules(rules)
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    with open(input_path, 'r', encoding='utf-8', newline='') as reader, \
+            open(output_path, 'w', encoding='utf-8', newline='') as writer:
+        return stream_bind_text_fields(reader, writer, rules, chunk_size)
@@ -0,0 +1,308 @@
+"""
+Streaming post-processing of JasperReport XML files.
+
+This module shifts the x/y positions of all report elements and sorts the textFields of
+every band by y and x while copying a JRXML document from a reader to a writer. The document
+is read in chunks and split into XML tokens, so everything except the changed start tags is
+written through byte for byte: CDATA sections, comments, attribute order and indentation
+stay as they are.
+"""
+
+import heapq
+import io
+import json
+import os
+import re
+import tempfile
+
+from shared.css_rewrite import DEFAULT_CHUNK_SIZE
+
+# Pattern for the name of a start tag
+TAG_NAME_PATTERN = re.compile(r'<([^\s/>]+)')
+
+# Pattern for the x and y attributes of a reportElement tag
+POSITION_ATTRIBUTE_PATTERN = re.compile(r'(\s(x|y)\s*=\s*["\'])(-?\d+)(["\'])')
+
+# Pattern for one token: comment, CDATA section, processing instruction, declaration, tag or text
+TOKEN_PATTERN = re.compile(
+    r'<!--.*?-->|<!\[CDATA\[.*?\]\]>|<\?.*?\?>|<![^>]*>'
+    r'|</?[^\s/>!?](?:[^>"\']|"[^"]*"|\'[^\']*\')*>|[^<]+',
+    re.DOTALL,
+)
+
+# Start markers of tokens with an end marker that a shorter match could stop before
+_LONG_MARKUP = (('<!--', '-->'), ('<![CDATA[', ']]>'))
+
+# Number of textFields per band kept in memory before a sorted run is written to a temporary file
+DEFAULT_MAX_BUFFERED_FIELDS = 10000
+
+
+def iter_xml_tokens(reader, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Split an XML stream into tags, special markup and text.
+
+    Tags, comments, CDATA sections and processing instructions are yielded as complete
+    tokens. Text between them may be split into several tokens.
+
+    Args:
+        reader (io.TextIOBase): The text stream to read the XML from
+        chunk_size (int, optional): The number of characters to read at once. Defaults to DEFAULT_CHUNK_SIZE.
+
+    Yields:
+        str: The tokens in document order; joined they give the input
+
+    Raises:
+        ValueError: If the document ends inside a tag
+    """
+    buffer = ''
+    position = 0
+    eof = False
+
+    while True:
+        for match in TOKEN_PATTERN.finditer(buffer, position):
+            token = match.group()
+            if match.start() != position or (token[1:2] == '!' and _is_cut_off(token)):
+                # The token at the position is not complete yet
+                break
+            yield token
+            position = match.end()
+
+        if eof:
+            if position < len(buffer):
+                raise ValueError(f"XML document ends inside a tag: {buffer[position:position + 80]!r}")
+            return
+        chunk = reader.read(chunk_size)
+        buffer = buffer[position:] + chunk
+        position = 0
+        eof = not chunk
+
+
+def _is_cut_off(token):
+    """Return whether a comment or CDATA token was matched without its end marker."""
+    for start_marker, end_marker in _LONG_MARKUP:
+        if token.startswith(start_marker):
+            return not token.endswith(end_marker) or len(token) < len(start_marker) + len(end_marker)
+    return False
+
+
+def _shift_positions(tag, x_offset, y_offset):
+    """Add the offsets to the x and y attributes of a reportElement tag."""
+    def replace(match):
+        offset = x_offset if match.group(2) == 'x' else y_offset
+        return f"{match.group(1)}{int(match.group(3)) + offset}{match.group(4)}"
+    return POSITION_ATTRIBUTE_PATTERN.sub(replace, tag)
+
+
+def _sort_key(tag):
+    """Return the (y, x) sort key of a reportElement tag."""
+    values = {'x': 0, 'y': 0}
+    for match in POSITION_ATTRIBUTE_PATTERN.finditer(tag):
+        values[match.group(2)] = int(match.group(3))
+    return values['y'], values['x']
+
+
+class _TextFieldSorter:
+    """
+    Collect the textFields of a band and write them sorted by y, x and document order.
+
+    Up to max_buffered textFields are kept in memory; more are written to temporary files
+    in sorted runs that are merged when the band ends.
+    """
+
+    def __init__(self, max_buffered):
+        self.max_buffered = max_buffered
+        self.fields = []
+        self.runs = []
+
+    def add(self, key, text):
+        """Add a textField with its (y, x) key and raw text."""
+        self.fields.append((key[0], key[1], len(self.fields) + len(self.runs) * self.max_buffered, text))
+        if len(self.fields) >= self.max_buffered:
+            self._spill()
+
+    def _spill(self):
+        """Write the buffered textFields to a temporary file as a sorted run."""
+        self.fields.sort()
+        run = tempfile.TemporaryFile(mode='w+', encoding='utf-8')
+        for field in self.fields:
+            run.write(json.dumps(field) + '\n')
+        run.seek(0)
+        self.runs.append(run)
+        self.fields = []
+
+    def write(self, writer):
+        """Write all textFields in sorted order and reset the sorter."""
+        if not self.runs:
+            self.fields.sort()
+            for field in self.fields:
+                writer.write(field[3])
+        else:
+            if self.fields:
+                self._spill()
+            runs = [(tuple(json.loads(line)) for line in run) for run in self.runs]
+            for field in heapq.merge(*runs):
+                writer.write(field[3])
+            for run in self.runs:
+                run.close()
+        self.fields = []
+        self.runs = []
+
+
+def stream_process_jrxml(reader, writer, x_offset=0, y_offset=0, sort_fields=True,
+                         chunk_size=DEFAULT_CHUNK_SIZE, max_buffered_fields=DEFAULT_MAX_BUFFERED_FIELDS):
+    """
+    Shift positions and sort textFields while copying JRXML from a reader to a writer.
+
+    The x and y attributes of every reportElement are shifted by the offsets. The textFields
+    that are direct children of a band are written at the end of the band, sorted by the y
+    and then the x of their reportElement; textFields at the same position keep their order.
+    Peak memory is bounded by the chunk size and max_buffered_fields textFields.
+
+    Args:
+        reader (io.TextIOBase): The text stream to read the JRXML from
+        writer (io.TextIOBase): The text stream to write the processed JRXML to
+        x_offset (int, optional): Offset to add to x values. Defaults to 0.
+        y_offset (int, optional): Offset to add to y values. Defaults to 0.
+        sort_fields (bool, optional): Sort the textFields of every band. Defaults to True.
+        chunk_size (int, optional): The number of characters to read at once. Defaults to DEFAULT_CHUNK_SIZE.
+        max_buffered_fields (int, optional): The number of textFields per band kept in memory.
+                                             Defaults to DEFAULT_MAX_BUFFERED_FIELDS.
+
+    Returns:
+        int: The number of textFields sorted
+    """
+    shift = x_offset != 0 or y_offset != 0
+    sorter = _TextFieldSorter(max_buffered_fields)
+    sorted_count = 0
+
+    depth = 0
+    band_depth = None   # Depth of the children of the current band
+    field = None        # Tokens of the textField being collected
+    field_key = None
+    pending_text = []   # Text between the children of the band, written with the next child
+
+    for token in iter_xml_tokens(reader, chunk_size):
+        if token[0] != '<' or token[1] in '!?':
+            # Text, comments, CDATA sections and processing instructions
+            if field is not None:
+                field.append(token)
+            elif depth == band_depth:
+                pending_text.append(token)
+            else:
+                writer.write(token)
+            continue
+
+        if token[1] == '/':
+            # End tag
+            if field is not None:
+                field.append(token)
+                depth -= 1
+                if depth == band_depth:
+                    sorter.add(field_key or (0, 0), ''.join(field))
+                    sorted_count += 1
+                    field = None
+                continue
+            if depth == band_depth:
+                # End of the band
+                sorter.write(writer)
+                writer.write(''.join(pending_text))
+                pending_text = []
+                band_depth = None
+            writer.write(token)
+            depth -= 1
+            continue
+
+        # Start tag or empty-element tag
+        name = TAG_NAME_PATTERN.match(token).group(1).rpartition(':')[2]
+        is_start = token[-2] != '/'
+        if name == 'reportElement':
+            if shift:
+                token = _shift_positions(token, x_offset, y_offset)
+            if field is not None and field_key is None:
+                field_key = _sort_key(token)
+
+        if field is not None:
+            field.append(token)
+            depth += is_start
+            continue
+        if depth == band_depth:
+            if is_start and name == 'textField':
+                field = pending_text + [token]
+                field_key = None
+                pending_text = []
+                depth += 1
+                continue
+            writer.write(''.join(pending_text))
+            pending_text = []
+
+        writer.write(token)
+        if is_start:
+            depth += 1
+            if sort_fields and name == 'band':
+                band_depth = depth
+
+    if field is not None or pending_text:
+        # Unterminated band, write what was collected
+        sorter.write(writer)
+        writer.write(''.join(field or []) + ''.join(pending_text))
+
+    return sorted_count
+
+
+def adjust_jrxml_positions(xml_content, x_offset=0, y_offset=0):
+    """
+    Shift the x and y positions of all reportElements of a JRXML string.
+
+    Args:
+        xml_content (str): The JRXML content
+        x_offset (int, optional): Offset to add to x values. Defaults to 0.
+        y_offset (int, optional): Offset to add to y values. Defaults to 0.
+
+    Returns:
+        str: The JRXML content with shifted positions
+    """
+    output = io.StringIO()
+    stream_process_jrxml(io.StringIO(xml_content), output, x_offset, y_offset, sort_fields=False)
+    return output.getvalue()
+
+
+def sort_jrxml_text_fields(xml_content):
+    """
+    Sort the textFields of every band of a JRXML string by y and then x.
+
+    Args:
+        xml_content (str): The JRXML content
+
+    Returns:
+        str: The JRXML content with sorted textFields
+    """
+    output = io.StringIO()
+    stream_process_jrxml(io.StringIO(xml_content), output)
+    return output.getvalue()
+
+
+def process_jrxml_file(input_path, output_path, x_offset=0, y_offset=0, sort_fields=True,
+                       chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Shift positions and sort textFields of a JRXML file without loading it into memory.
+
+    Args:
+        input_path (str): The path to the JRXML file
+        output_path (str): The path to save the processed JRXML file to
+        x_offset (int, optional): Offset to add to x values. Defaults to 0.
+        y_offset (int, optional): Offset to add to y values. Defaults to 0.
+        sort_fields (bool, optional): Sort the textFields of every band. Defaults to True.
+        chunk_size (int, optional): The number of characters to read at once. Defaults to DEFAULT_CHUNK_SIZE.
+
+    Returns:
+        str: The path to the saved file
+    """
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    with open(input_path, 'r', encoding='utf-8', newline='') as reader, \
+            open(output_path, 'w', encoding='utf-8', newline='') as writer:
+        stream_process_jrxml(reader, writer, x_offset, y_offset, sort_fields, chunk_size)
+
+    return output_path
@@ -0,0 +1,353 @@
+"""
+Memory-mapped access to large HTML files.
+
+Our largest exports consist mostly of inline base64 page images. Decoding such a file into a
+Python string keeps the raw bytes and the decoded string in memory, doubling the peak memory
+before a single rule is rewritten. This module maps the file into memory instead and searches
+the style blocks, page containers and text nodes directly in the bytes. Only these small
+regions are decoded; all other byte ranges are written from the map to the output without
+being copied.
+
+Usage:
+    with MappedHTML('page.html') as document:
+        stylesheet = document.stylesheet()
+
+    convert_bottom_to_top_mapped_file('page.html', 'data/output/page.html', offset_x=3)
+"""
+
+import mmap
+import os
+import re
+
+from shared.constants import HTML_HEIGHT
+from shared.css_rewrite import _position_transforms, rewrite_css_positions
+from shared.instrumentation import file_size, stage
+from shared.pages import DIV_TAG_PATTERN, Page, _PAGE_TAG_HINT_PATTERN, page_size, parse_tag_attributes
+from shared.stylesheet import Stylesheet
+
+# Byte patterns of the style blocks, the same as in shared.css_rewrite
+STYLE_OPEN_TAG_PATTERN = re.compile(rb'<style[^>]*>')
+STYLE_CLOSE_TAG = b'</style>'
+
+# Byte patterns of the page containers, the same as in shared.pages
+DIV_TAG_BYTES_PATTERN = re.compile(DIV_TAG_PATTERN.pattern.encode('ascii'), re.IGNORECASE)
+_PAGE_TAG_HINT_BYTES_PATTERN = re.compile(_PAGE_TAG_HINT_PATTERN.pattern.encode('ascii'), re.IGNORECASE)
+
+# Tags with quoted attribute values, so long data URIs are skipped as one tag
+TAG_PATTERN = re.compile(rb'<(/?)([a-zA-Z][\w:-]*)(?:[^>"\']|"[^"]*"|\'[^\']*\')*>')
+
+# Closing tags of the elements whose content is no text
+RAW_TEXT_CLOSE_TAG_PATTERNS = {name: re.compile(b'</' + name, re.IGNORECASE) for name in (b'style', b'script')}
+
+# Encoding of the HTML files
+ENCODING = 'utf-8'
+
+
+def iter_style_blocks_bytes(data, start=0, end=None):
+    """
+    Locate the content of all style blocks in HTML bytes.
+
+    The bytes version of shared.css_rewrite.iter_style_blocks: the offsets are byte offsets
+    and data can be any object supporting find and regular expressions, e.g. an mmap.
+
+    Args:
+        data (bytes or mmap.mmap): The HTML bytes to search
+        start (int, optional): The offset to start searching at. Defaults to 0.
+        end (int, optional): The offset to stop searching at. Defaults to the end of the data.
+
+    Yields:
+        tuple: The start and end offset of the content of each style block
+    """
+    if end is None:
+        end = len(data)
+
+    position = data.find(b'<style', start, end)
+    while position != -1:
+        open_tag_match = STYLE_OPEN_TAG_PATTERN.match(data, position, end)
+        if not open_tag_match:
+            return
+        content_end = data.find(STYLE_CLOSE_TAG, open_tag_match.end(), end)
+        if content_end == -1:
+            return
+        yield open_tag_match.end(), content_end
+        position = data.find(b'<style', content_end + len(STYLE_CLOSE_TAG), end)
+
+
+def iter_pages_bytes(data, start=0, number=1):
+    """
+    Find the page containers of HTML bytes.
+
+    The bytes version of shared.pages.iter_pages: only the div tags that can be page
+    containers are decoded.
+
+    Args:
+        data (bytes or mmap.mmap): The HTML bytes to search
+        start (int, optional): The offset to start searching at. Defaults to 0.
+        number (int, optional): The number of the first page found. Defaults to 1.
+
+    Yields:
+        Page: The page containers in document order, with the byte offset of the opening tag as start
+    """
+    for match in DIV_TAG_BYTES_PATTERN.finditer(data, start):
+        if not _PAGE_TAG_HINT_BYTES_PATTERN.search(data, match.start(), match.end()):
+            continue
+        attributes = parse_tag_attributes(match.group().decode(ENCODING, 'replace'))
+        size = page_size(attributes.get('id'), attributes.get('class', ''), attributes.get('style'))
+        if size:
+            yield Page(number, attributes.get('id'), size[0], size[1], match.start())
+            number += 1
+
+
+def iter_text_nodes(data, start=0, end=None):
+    """
+    Find the text nodes of HTML bytes.
+
+    Tags are skipped as a whole, including long attribute values such as data URIs, and the
+    content of style and script elements is no text. Whitespace-only nodes are left out.
+
+    Args:
+        data (bytes or mmap.mmap): The HTML bytes to search
+        start (int, optional): The offset to start searching at. Defaults to 0.
+        end (int, optional): The offset to stop searching at. Defaults to the end of the data.
+
+    Yields:
+        tuple: The start offset, end offset and decoded text of each text node
+    """
+    if end is None:
+        end = len(data)
+
+    position = start
+    while position < end:
+        tag_match = TAG_PATTERN.search(data, position, end)
+        text_end = tag_match.start() if tag_match else end
+        if text_end > position and data[position:text_end].strip():
+            yield position, text_end, data[position:text_end].decode(ENCODING)
+        if not tag_match:
+            return
+
+        position = tag_match.end()
+        close_tag_pattern = RAW_TEXT_CLOSE_TAG_PATTERNS.get(tag_match.group(2).lower())
+        if close_tag_pattern and not tag_match.group(1):
+            # Continue at the closing tag of the raw text element
+            close_tag_match = close_tag_pattern.search(data, position, end)
+            if not close_tag_match:
+                return
+            position = close_tag_match.start()
+
+
+class MappedHTML:
+    """
+    A read-only memory map of an HTML file.
+
+    The data attribute supports the bytes search methods and regular expressions without
+    reading the file into memory; the operating system pages it in on access. Regions are
+    decoded on request. Use the object as a context manager or close it when done.
+    """
+
+    def __init__(self, file_path):
+        """
+        Map an HTML file into memory.
+
+        Args:
+            file_path (str): The path to the HTML file
+
+        Raises:
+            OSError: If the file cannot be opened
+        """
+        self.file_path = file_path
+        with open(file_path, 'rb') as file:
+            # Empty files cannot be mapped
+            if os.fstat(file.fileno()).st_size:
+                self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self.data = b''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self.data)
+
+    def close(self):
+        """Unmap the file."""
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.data = b''
+
+    def decode(self, start=0, end=None):
+        """
+        Decode a byte range of the file.
+
+        Args:
+            start (int, optional): The start offset. Defaults to 0.
+            end (int, optional): The end offset. Defaults to the end of the file.
+
+        Returns:
+            str: The decoded text
+        """
+        return self.data[start:len(self.data) if end is None else end].decode(ENCODING)
+
+    def iter_style_blocks(self):
+        """Yield the start and end offset of the content of each style block."""
+        return iter_style_blocks_bytes(self.data)
+
+    def style_contents(self):
+        """
+        Decode the content of all style blocks.
+
+        Returns:
+            list: The CSS text of each style block
+        """
+        return [self.decode(start, end) for start, end in self.iter_style_blocks()]
+
+    def stylesheet(self):
+        """
+        Parse the style blocks of the file into a stylesheet.
+
+        Returns:
+            Stylesheet: The parsed stylesheet
+        """
+        stylesheet = Stylesheet()
+        for css_content in self.style_contents():
+            stylesheet.add_css(css_content)
+        return stylesheet
+
+    def pages(self):
+        """
+        Find the page containers of the file.
+
+        Returns:
+            list: The Page tuples in document order, with byte offsets as start
+        """
+        return list(iter_pages_bytes(self.data))
+
+    def iter_text_nodes(self):
+        """Yield the start offset, end offset and decoded text of each text node."""
+        return iter_text_nodes(self.data)
+
+
+def write_rewritten_positions(data, writer, bottom_to_top=False, offset_x=0, offset_y=0, html_height=HTML_HEIGHT):
+    """
+    Write HTML bytes with the position values of their style blocks rewritten.
+
+    Every style block is decoded, rewritten with rewrite_css_positions and encoded again; the
+    byte ranges between the style blocks are written as memoryview slices of data, so they
+    are not copied. Bottom values are flipped against the height of the page container the
+    style block is in, so the output is the same as that of rewrite_page_positions.
+
+    Args:
+        data (bytes or mmap.mmap): The HTML bytes to rewrite
+        writer (io.RawIOBase or io.BufferedIOBase): The binary stream to write the rewritten HTML to
+        bottom_to_top (bool, optional): Convert `bottom` values to `top` values. Defaults to False.
+        offset_x (int, optional): Horizontal offset to apply to left values (positive = right, negative = left). Defaults to 0.
+        offset_y (int, optional): Vertical offset to apply to top values (positive = down, negative = up). Defaults to 0.
+        html_height (int, optional): The height used outside of page containers. Defaults to HTML_HEIGHT.
+
+    Returns:
+        int: The number of rewritten style blocks
+    """
+    with memoryview(data) as view:
+        # Without a transform the content is copied unchanged
+        if not _position_transforms(bottom_to_top, offset_x, offset_y, html_height):
+            writer.write(view)
+            return 0
+
+        pages = iter_pages_bytes(data) if bottom_to_top else iter(())
+        next_page = next(pages, None)
+        page_height = html_height
+        rewritten_blocks = 0
+        last_end = 0
+        for content_start, content_end in iter_style_blocks_bytes(data):
+            # Take over the height of the last page container before the style block
+            while next_page is not None and next_page.start < content_start:
+                page_height = next_page.height
+                next_page = next(pages, None)
+
+            css = view[content_start:content_end].tobytes().decode(ENCODING)
+            rewritten_css = rewrite_css_positions(css, bottom_to_top, offset_x, offset_y, page_height)
+            if rewritten_css == css:
+                continue
+            writer.write(view[last_end:content_start])
+            writer.write(rewritten_css.encode(ENCODING))
+            last_end = content_end
+            rewritten_blocks += 1
+        writer.write(view[last_end:])
+    return rewritten_blocks
+
+
+def _mapped_convert_file(input_path, output_path, **rewrite_kwargs):
+    """
+    Rewrite a memory-mapped HTML file into another file.
+
+    Args:
+        input_path (str): The path to the HTML file to convert
+        output_path (str): The path to save the converted HTML file to
+        **rewrite_kwargs: Arguments for write_rewritten_positions
+
+    Returns:
+        str: The path to the saved file
+
+    Raises:
+        ValueError: If the output path is the input file, also through a link
+    """
+    # Truncating the mapped input file would crash the process with SIGBUS on the next read
+    if os.path.exists(output_path) and os.path.samefile(input_path, output_path):
+        raise ValueError(f"the output file {output_path} is the input file")
+
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    with MappedHTML(input_path) as document, open(output_path, 'wb') as writer:
+        write_rewritten_positions(document.data, writer, **rewrite_kwargs)
+
+    return output_path
+
+
+@stage(size=file_size)
+def convert_bottom_to_top_mapped_file(input_path, output_path, offset_x=0, offset_y=0):
+    """
+    Convert bottom-positioned elements to top-positioned elements of a memory-mapped file.
+
+    The result is the same as that of convert_bottom_to_top_file, but the file is neither
+    decoded nor read in chunks: only the style blocks and page container tags are decoded,
+    everything else is written from the map. Input and output path must differ.
+
+    Args:
+        input_path (str): The path to the HTML file containing bottom-positioned elements
+        output_path (str): The path to save the converted HTML file to
+        offset_x (int, optional): Horizontal offset to apply to left values (positive = right, negative = left). Defaults to 0.
+        offset_y (int, optional): Vertical offset to apply to top values (positive = down, negative = up). Defaults to 0.
+
+    Returns:
+        str: The path to the saved file
+
+    Raises:
+        ValueError: If the output path is the input file, also through a link
+    """
+    return _mapped_convert_file(input_path, output_path, bottom_to_top=True, offset_x=offset_x, offset_y=offset_y)
+
+
+@stage(size=file_size)
+def apply_offset_mapped_file(input_path, output_path, offset_x=0, offset_y=0):
+    """
+    Apply offset to left and top values of a memory-mapped file.
+
+    The result is the same as that of apply_offset_file. Input and output path must differ.
+
+    Args:
+        input_path (str): The path to the HTML file to modify
+        output_path (str): The path to save the modified HTML file to
+        offset_x (int, optional): Horizontal offset to apply to left values (positive = right, negative = left). Defaults to 0.
+        offset_y (int, optional): Vertical offset to apply to top values (positive = down, negative = up). Defaults to 0.
+
+    Returns:
+        str: The path to the saved file
+
+    Raises:
+        ValueError: If the output path is the input file, also through a link
+    """
+    return _mapped_convert_file(input_path, output_path, offset_x=offset_x, offset_y=offset_y)
@@ -0,0 +1,231 @@
+"""
+Page profiles for HTML to JasperReport conversion.
+
+A page profile combines the size of the HTML canvas with the JasperReport page and margins it
+is converted to. The default profile is defined by shared/constants.py (1210x825 pixels onto
+A4 with 20pt margins); the predefined profiles cover the paper sizes of JASPER_PAPER_SIZES in
+portrait and landscape orientation. Band size and scale factors are computed once when a
+profile is created, and the profile of a page container size is detected once per size, so
+a batch mixing A4, Letter and landscape documents needs no split by page size.
+
+Usage:
+    profile = get_page_profile('letter-landscape')
+    profile = resolve_page_profile('auto', html_string)
+    left_pt = left_px * profile.scale_x
+"""
+
+from collections import namedtuple
+from functools import lru_cache
+
+from shared.constants import (
+    HTML_HEIGHT,
+    HTML_PIXELS_PER_POINT,
+    HTML_WIDTH,
+    JASPER_MARGIN_BOTTOM,
+    JASPER_MARGIN_LEFT,
+    JASPER_MARGIN_RIGHT,
+    JASPER_MARGIN_TOP,
+    JASPER_PAGE_HEIGHT,
+    JASPER_PAGE_WIDTH,
+    JASPER_PAPER_SIZES,
+)
+from shared.pages import iter_pages
+
+# HTML canvas size in pixels, JasperReport page size and margins in points, and the band size
+# and scale factors derived from them
+PageProfile = namedtuple('PageProfile', [
+    'name', 'html_width', 'html_height', 'page_width', 'page_height',
+    'margin_top', 'margin_right', 'margin_bottom', 'margin_left',
+    'band_width', 'band_height', 'scale_x', 'scale_y',
+])
+
+# Profile name selecting the profile by the first page container of a document
+AUTO_PAGE_PROFILE = 'auto'
+
+# Suffix of the names of landscape profiles
+LANDSCAPE_SUFFIX = '-landscape'
+
+# Relative difference of aspect ratios up to which a page container matches a paper size
+PAGE_RATIO_TOLERANCE = 0.05
+
+
+def create_page_profile(name, html_width, html_height, page_width, page_height, margin_top=JASPER_MARGIN_TOP,
+                        margin_right=JASPER_MARGIN_RIGHT, margin_bottom=JASPER_MARGIN_BOTTOM,
+                        margin_left=JASPER_MARGIN_LEFT):
+    """
+    Create a page profile and compute its band size and scale factors.
+
+    Args:
+        name (str): The name of the profile
+        html_width (float): The width of the HTML canvas in pixels
+        html_height (float): The height of the HTML canvas in pixels
+        page_width (int): The JasperReport page width in points
+        page_height (int): The JasperReport page height in points
+        margin_top (int, optional): Top margin. Defaults to JASPER_MARGIN_TOP.
+        margin_right (int, optional): Right margin. Defaults to JASPER_MARGIN_RIGHT.
+        margin_bottom (int, optional): Bottom margin. Defaults to JASPER_MARGIN_BOTTOM.
+        margin_left (int, optional): Left margin. Defaults to JASPER_MARGIN_LEFT.
+
+    Returns:
+        PageProfile: The profile
+
+    Raises:
+        ValueError: If a size is not positive or the margins leave no band
+    """
+    band_width = page_width - margin_left - margin_right
+    band_height = page_height - margin_top - margin_bottom
+    if html_width <= 0 or html_height <= 0 or band_width <= 0 or band_height <= 0:
+        raise ValueError(f"page profile {name!r} has no positive HTML or band size")
+    return PageProfile(name, html_width, html_height, page_width, page_height,
+                       margin_top, margin_right, margin_bottom, margin_left,
+                       band_width, band_height, band_width / html_width, band_height / html_height)
+
+
+def paper_page_profile(paper, landscape=False):
+    """
+    Create the profile of a paper size of JASPER_PAPER_SIZES.
+
+    The HTML canvas has the size of the page in CSS pixels (HTML_PIXELS_PER_POINT).
+
+    Args:
+        paper (str): The paper name, e.g. "a4" or "letter"
+        landscape (bool, optional): Use landscape orientation. Defaults to False.
+
+    Returns:
+        PageProfile: The profile, named e.g. "a4" or "a4-landscape"
+    """
+    page_width, page_height = JASPER_PAPER_SIZES[paper]
+    if landscape:
+        page_width, page_height = page_height, page_width
+    return create_page_profile(paper + LANDSCAPE_SUFFIX if landscape else paper,
+                               round(page_width * HTML_PIXELS_PER_POINT), round(page_height * HTML_PIXELS_PER_POINT),
+                               page_width, page_height)
+
+
+# The profile of the constants, used when no profile is selected
+DEFAULT_PAGE_PROFILE = create_page_profile('default', HTML_WIDTH, HTML_HEIGHT, JASPER_PAGE_WIDTH,
+                                           JASPER_PAGE_HEIGHT)
+
+# Profiles by name, in the order they are preferred by detect_page_profile
+PAGE_PROFILES = {DEFAULT_PAGE_PROFILE.name: DEFAULT_PAGE_PROFILE}
+for _paper in JASPER_PAPER_SIZES:
+    for _landscape in (False, True):
+        _profile = paper_page_profile(_paper, _landscape)
+        PAGE_PROFILES[_profile.name] = _profile
+
+
+def register_page_profile(profile):
+    """
+    Add a profile to PAGE_PROFILES, e.g. for a company paper size.
+
+    Registered profiles can be selected by name and are detected like the predefined ones.
+
+    Args:
+        profile (PageProfile): The profile, created with create_page_profile
+
+    Returns:
+        PageProfile: The profile
+    """
+    PAGE_PROFILES[profile.name] = profile
+    detect_page_profile.cache_clear()
+    return profile
+
+
+def get_page_profile(profile=None):
+    """
+    Return a page profile by name.
+
+    Args:
+        profile (str or PageProfile, optional): The profile or its name. Defaults to None
+                                                (DEFAULT_PAGE_PROFILE).
+
+    Returns:
+        PageProfile: The profile
+
+    Raises:
+        ValueError: If no profile has the name
+    """
+    if profile is None:
+        return DEFAULT_PAGE_PROFILE
+    if isinstance(profile, PageProfile):
+        return profile
+    try:
+        return PAGE_PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"unknown page profile {profile!r}, use one of {', '.join(PAGE_PROFILES)}") from None
+
+
+@lru_cache(maxsize=256)
+def detect_page_profile(width, height):
+    """
+    Detect the profile of a page container.
+
+    The page is matched to the registered profile of the same orientation whose page has the
+    nearest aspect ratio, if it differs by at most PAGE_RATIO_TOLERANCE; papers of (almost)
+    the same aspect ratio such as A3, A4 and A5 are detected as the one registered first.
+    Pages matching no profile use the JasperReport page of the default profile. The HTML size
+    of the returned profile is the size of the container, so its scale factors fit the page
+    to the band. The result is cached per size.
+
+    Args:
+        width (float): The width of the page container in pixels
+        height (float): The height of the page container in pixels
+
+    Returns:
+        PageProfile: The profile
+    """
+    landscape = width > height
+    ratio = max(width, height) / min(width, height)
+    best_key = None
+    best = DEFAULT_PAGE_PROFILE
+    for index, profile in enumerate(PAGE_PROFILES.values()):
+        if profile is DEFAULT_PAGE_PROFILE or (profile.page_width > profile.page_height) != landscape:
+            continue
+        profile_ratio = max(profile.page_width, profile.page_height) / min(profile.page_width, profile.page_height)
+        difference = abs(ratio - profile_ratio) / profile_ratio
+        # Differences below one percent count as equal, the earlier profile wins
+        key = (round(difference, 2), index)
+        if difference <= PAGE_RATIO_TOLERANCE and (best_key is None or key < best_key):
+            best_key = key
+            best = profile
+
+    if (best.html_width, best.html_height) == (width, height):
+        return best
+    return create_page_profile(best.name, width, height, best.page_width, best.page_height,
+                               best.margin_top, best.margin_right, best.margin_bottom, best.margin_left)
+
+
+def document_page_profile(html_string):
+    """
+    Detect the profile of an HTML document from its first page container.
+
+    Args:
+        html_string (str): The HTML string
+
+    Returns:
+        PageProfile: The detected profile, or DEFAULT_PAGE_PROFILE without page containers
+    """
+    page = next(iter_pages(html_string), None)
+    if page is None:
+        return DEFAULT_PAGE_PROFILE
+    return detect_page_profile(page.width, page.height)
+
+
+def resolve_page_profile(profile=None, html_string=None):
+    """
+    Return the profile selected for a call or detected from its document.
+
+    Args:
+        profile (str or PageProfile, optional): The profile, its name or AUTO_PAGE_PROFILE.
+                                                Defaults to None (DEFAULT_PAGE_PROFILE).
+        html_string (str, optional): The document to detect the profile of with AUTO_PAGE_PROFILE
+
+    Returns:
+        PageProfile: The profile
+
+    Raises:
+        ValueError: If no profile has the name
+    """
+    if profile == AUTO_PAGE_PROFILE:
+        return document_page_profile(html_string or '')
+    return get_page_profile(profile)
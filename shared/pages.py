@@ -0,0 +1,172 @@
+"""
+Page containers of multi-page HTML exports.
+
+Exported documents place the elements of every page in a page container with its own size,
+e.g. `<div id="p1" style="width: 1210px; height: 825px;">` or
+`<div class="page" style="width: 909px; height: 1286px;">`. This module finds these containers,
+so positions can be flipped and scaled in the frame of their own page instead of a single
+global page size.
+"""
+
+import re
+from collections import namedtuple
+
+from shared.constants import HTML_HEIGHT, HTML_WIDTH
+from shared.stylesheet import parse_declarations, parse_px
+
+# Opening tags of div elements, the only elements used as page containers
+DIV_TAG_PATTERN = re.compile(r'<div\b(?:[^>"\']|"[^"]*"|\'[^\']*\')*>', re.IGNORECASE)
+
+# Attribute values of an opening tag
+ATTRIBUTE_PATTERN = re.compile(r'\s([\w:-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))')
+
+# IDs of page containers (p1, p2, ..., pg1, page1)
+PAGE_ID_PATTERN = re.compile(r'p(?:g|age)?\d+$', re.IGNORECASE)
+
+# Class of page containers
+PAGE_CLASS = 'page'
+
+# Cheap test for div tags that can be page containers
+_PAGE_TAG_HINT_PATTERN = re.compile(r'page|\bid\s*=\s*["\']?p', re.IGNORECASE)
+
+# A page container with its 1-based number, id, size in pixels and the index of its opening tag
+Page = namedtuple('Page', ['number', 'element_id', 'width', 'height', 'start'])
+
+
+def page_size(element_id, classes, style):
+    """
+    Return the size of a page container.
+
+    An element is a page container if its id is a page id (p1, pg1, page1) or it has the class
+    "page", and its style attribute sets both width and height in pixels.
+
+    Args:
+        element_id (str): The id of the element, or None
+        classes (str or list): The classes of the element as string or list
+        style (str): The style attribute of the element, or None
+
+    Returns:
+        tuple: The width and height in pixels, or None if the element is no page container
+    """
+    if isinstance(classes, str):
+        classes = classes.split()
+    if not (element_id and PAGE_ID_PATTERN.match(element_id)) and PAGE_CLASS not in (classes or ()):
+        return None
+    if not style:
+        return None
+
+    declarations = parse_declarations(style)
+    width = parse_px(declarations.get('width'))
+    height = parse_px(declarations.get('height'))
+    if not width or not height:
+        return None
+    return width, height
+
+
+def parse_tag_attributes(tag):
+    """
+    Parse the attributes of an opening tag.
+
+    Args:
+        tag (str): The opening tag, e.g. `<div id="p1" class="page">`
+
+    Returns:
+        dict: The attribute values by lower case name; for repeated attributes the first wins
+    """
+    attributes = {}
+    for match in ATTRIBUTE_PATTERN.finditer(tag):
+        value = next(group for group in match.groups()[1:] if group is not None)
+        attributes.setdefault(match.group(1).lower(), value)
+    return attributes
+
+
+def iter_pages(html_string, start=0, number=1):
+    """
+    Find the page containers of an HTML string with a plain scan of the div tags.
+
+    Args:
+        html_string (str): The HTML string to search
+        start (int, optional): The index to start searching at. Defaults to 0.
+        number (int, optional): The number of the first page found. Defaults to 1.
+
+    Yields:
+        Page: The page containers in document order
+    """
+    for match in DIV_TAG_PATTERN.finditer(html_string, start):
+        tag = match.group()
+        if not _PAGE_TAG_HINT_PATTERN.search(tag):
+            continue
+        attributes = parse_tag_attributes(tag)
+        size = page_size(attributes.get('id'), attributes.get('class', ''), attributes.get('style'))
+        if size:
+            yield Page(number, attributes.get('id'), size[0], size[1], match.start())
+            number += 1
+
+
+def find_pages(html_string):
+    """
+    Find the page containers of an HTML string.
+
+    Args:
+        html_string (str): The HTML string to search
+
+    Returns:
+        list: The Page tuples in document order
+    """
+    return list(iter_pages(html_string))
+
+
+def iter_page_segments(html_string, html_width=HTML_WIDTH, html_height=HTML_HEIGHT):
+    """
+    Split an HTML string into the segments of its pages.
+
+    Every page segment runs from the opening tag of its page container to the opening tag of
+    the next one. Content before the first page container uses the given default size.
+
+    Args:
+        html_string (str): The HTML string to split
+        html_width (float, optional): The width of content outside of pages. Defaults to HTML_WIDTH.
+        html_height (float, optional): The height of content outside of pages. Defaults to HTML_HEIGHT.
+
+    Yields:
+        tuple: The start index, end index, width and height of each segment
+    """
+    segment_start = 0
+    width, height = html_width, html_height
+    for page in iter_pages(html_string):
+        if page.start > segment_start:
+            yield segment_start, page.start, width, height
+        segment_start = page.start
+        width, height = page.width, page.height
+    yield segment_start, len(html_string), width, height
+
+
+def find_page_element(element, cache=None):
+    """
+    Find the innermost page container of a parsed element.
+
+    Args:
+        element (bs4.element.Tag): The element
+        cache (dict, optional): A dictionary to cache the results per parent. Defaults to None.
+
+    Returns:
+        tuple: The page container element and its (width, height), or None if the element is
+               not inside a page container
+    """
+    visited = []
+    result = None
+    for parent in element.parents:
+        if cache is not None and id(parent) in cache:
+            result = cache[id(parent)]
+            break
+        visited.append(parent)
+        if parent.name == 'div':
+            size = page_size(parent.get('id'), parent.get('class') or (), parent.get('style'))
+            if size:
+                result = (parent, size)
+                break
+
+    if cache is not None:
+        for parent in visited:
+            cache[id(parent)] = result
+    return result
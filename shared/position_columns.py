@@ -0,0 +1,276 @@
+"""
+Columnar position export for HTML to JasperReport conversion.
+
+This module extracts the positions of a document as one array per column instead of one
+dictionary per element, and writes the columns of many documents to a single CSV or Parquet
+dataset. The columns are NumPy arrays; Arrow tables and Parquet files need pyarrow.
+"""
+
+import bisect
+import csv
+import glob
+import os
+import re
+from collections import namedtuple
+
+from shared.coordinates import boxes_from_styles
+from shared.element_boxes import font_class
+from shared.html_utils import get_stylesheet, read_html_file, run_file_tasks
+from shared.pages import iter_pages, parse_tag_attributes
+
+# Try to import NumPy, but don't fail if it's not installed
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# pyarrow is optional, it is only needed for Arrow tables and Parquet files
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Columns of the position table: the source document, the element id, its box in pixels
+# (NaN if not set), the class setting its font (empty if none) and its page (0 outside of pages)
+POSITION_COLUMNS = ('source', 'id', 'left', 'top', 'bottom', 'width', 'height', 'font_class', 'page')
+
+# One array per column; all arrays have the same length
+PositionColumns = namedtuple('PositionColumns', POSITION_COLUMNS)
+
+# Opening tags with attributes, with quoted attribute values so a '>' in them does not end the tag
+ATTRIBUTE_TAG_PATTERN = re.compile(r'<[a-zA-Z][\w:-]*\s(?:[^>"\']|"[^"]*"|\'[^\']*\')*>')
+
+# Number of documents extracted before their rows are written to the dataset
+DEFAULT_EXPORT_BATCH_SIZE = 256
+
+
+def _require_numpy():
+    """Raise an ImportError if NumPy is not installed."""
+    if np is None:
+        raise ImportError("NumPy is required for the columnar export. Install it with 'pip install numpy'.")
+
+
+def _require_pyarrow():
+    """Raise an ImportError if pyarrow is not installed."""
+    if pa is None:
+        raise ImportError("pyarrow is required for Arrow tables and Parquet files. "
+                          "Install it with 'pip install pyarrow'.")
+
+
+def _scan_id_elements(html_string):
+    """
+    Find the classes and page number of every element with an id.
+
+    Args:
+        html_string (str): The HTML string to scan
+
+    Returns:
+        dict: The (classes, page number) of every id, the first element wins for repeated ids
+    """
+    page_starts = []
+    page_numbers = []
+    for page in iter_pages(html_string):
+        page_starts.append(page.start)
+        page_numbers.append(page.number)
+
+    elements = {}
+    for match in ATTRIBUTE_TAG_PATTERN.finditer(html_string):
+        tag = match.group()
+        if 'id' not in tag.lower():
+            continue
+        # Only the id attribute itself, not e.g. data-id
+        attributes = parse_tag_attributes(tag)
+        element_id = attributes.get('id')
+        if not element_id or element_id in elements:
+            continue
+        page_index = bisect.bisect_right(page_starts, match.start()) - 1
+        classes = attributes.get('class', '').split()
+        elements[element_id] = (classes, page_numbers[page_index] if page_index >= 0 else 0)
+    return elements
+
+
+def extract_position_columns(html_string, source='', stylesheet=None):
+    """
+    Extract the positions of a document as columns.
+
+    The rows are the `#id` rules of the document, like the results of extract_positions with
+    a stylesheet, with width and height added. Font class and page are read from the element
+    with the id; the page is the number of the page container (e.g. `#p2`) the element is in.
+
+    Args:
+        html_string (str): The HTML string to extract positions from
+        source (str, optional): The name of the document for the source column. Defaults to ''.
+        stylesheet (Stylesheet, optional): An already parsed stylesheet of the document.
+                                           Defaults to the cached stylesheet of the document.
+
+    Returns:
+        PositionColumns: The columns, with NaN for missing box values
+    """
+    _require_numpy()
+    if stylesheet is None:
+        stylesheet = get_stylesheet(html_string)
+
+    boxes = boxes_from_styles(stylesheet.id_styles)
+    elements = _scan_id_elements(html_string)
+    font_classes = []
+    pages = []
+    for element_id in boxes.ids:
+        classes, page = elements.get(element_id, ((), 0))
+        font_classes.append(font_class(stylesheet, classes))
+        pages.append(page)
+
+    return PositionColumns(
+        np.array([source] * len(boxes.ids), dtype=object),
+        np.array(boxes.ids, dtype=object),
+        boxes.left, boxes.top, boxes.bottom, boxes.width, boxes.height,
+        np.array(font_classes, dtype=object),
+        np.array(pages, dtype=np.int32),
+    )
+
+
+def _empty_columns():
+    """Return position columns without rows."""
+    text = np.array([], dtype=object)
+    number = np.array([], dtype=np.float64)
+    return PositionColumns(text, text, number, number, number, number, number, text,
+                           np.array([], dtype=np.int32))
+
+
+def concat_position_columns(columns_list):
+    """
+    Concatenate the columns of several documents.
+
+    Args:
+        columns_list (list): PositionColumns of the documents
+
+    Returns:
+        PositionColumns: The concatenated columns
+    """
+    _require_numpy()
+    if not columns_list:
+        return _empty_columns()
+    return PositionColumns(*(np.concatenate(arrays) for arrays in zip(*columns_list)))
+
+
+def position_columns_to_arrow(columns):
+    """
+    Convert position columns to an Arrow table.
+
+    Args:
+        columns (PositionColumns): The columns
+
+    Returns:
+        pyarrow.Table: The table with NaN box values as nulls
+    """
+    _require_pyarrow()
+    arrays = []
+    for values in columns:
+        if values.dtype == object:
+            arrays.append(pa.array(values.tolist(), type=pa.string()))
+        elif values.dtype.kind == 'f':
+            arrays.append(pa.array(values, mask=np.isnan(values), type=pa.float64()))
+        else:
+            arrays.append(pa.array(values, type=pa.int32()))
+    return pa.Table.from_arrays(arrays, names=list(POSITION_COLUMNS))
+
+
+def write_position_columns_csv(columns, output, write_header=True):
+    """
+    Write position columns as CSV rows; NaN box values are written as empty fields.
+
+    Args:
+        columns (PositionColumns): The columns
+        output (file): The text stream to write to, opened with newline=''
+        write_header (bool, optional): Write the header row first. Defaults to True.
+
+    Returns:
+        int: The number of rows written
+    """
+    writer = csv.writer(output)
+    if write_header:
+        writer.writerow(POSITION_COLUMNS)
+    # NaN is the only value not equal to itself
+    as_lists = [[value if value == value else '' for value in array.tolist()] for array in columns]
+    writer.writerows(zip(*as_lists))
+    return len(columns.id)
+
+
+def _extract_columns_file(input_path, output_path):
+    """
+    Extract the position columns of an HTML file for export_folder_positions.
+
+    Args:
+        input_path (str): The path to the HTML file
+        output_path (str): Not used, the columns are returned
+
+    Returns:
+        dict: The number of rows and the columns
+    """
+    columns = extract_position_columns(read_html_file(input_path), source=os.path.basename(input_path))
+    return {'rows': len(columns.id), 'columns': columns}
+
+
+def export_folder_positions(input_folder, output_path, file_pattern='*.html', workers=None, append=False,
+                            batch_size=DEFAULT_EXPORT_BATCH_SIZE):
+    """
+    Extract the positions of all HTML files of a folder into one CSV or Parquet dataset.
+
+    The format follows the extension of output_path (.csv or .parquet). The files are
+    extracted in batches, sequentially or in a process pool, and every batch is written
+    before the next one starts, so memory is bounded by the batch size. A Parquet file gets
+    one row group per batch.
+
+    Args:
+        input_folder (str): The folder containing the HTML files
+        output_path (str): The path of the dataset to write
+        file_pattern (str, optional): The glob pattern of the files. Defaults to '*.html'.
+        workers (int, optional): The number of worker processes. Defaults to None (sequential).
+        append (bool, optional): Append to an existing CSV file instead of replacing it. Parquet
+                                 files are always replaced. Defaults to False.
+        batch_size (int, optional): The number of files per batch. Defaults to DEFAULT_EXPORT_BATCH_SIZE.
+
+    Returns:
+        list: A result dictionary per file with input, status ('converted' or 'error'), error,
+              seconds and rows
+
+    Raises:
+        ValueError: If the extension of output_path is neither .csv nor .parquet
+    """
+    _require_numpy()
+    file_format = os.path.splitext(output_path)[1].lower()
+    if file_format not in ('.csv', '.parquet'):
+        raise ValueError(f"Unsupported dataset format: {file_format or output_path}")
+    if file_format == '.parquet':
+        _require_pyarrow()
+
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    input_paths = sorted(glob.glob(os.path.join(input_folder, file_pattern)))
+    results = []
+
+    if file_format == '.csv':
+        write_header = not (append and os.path.exists(output_path) and os.path.getsize(output_path) > 0)
+        dataset = open(output_path, 'a' if append else 'w', encoding='utf-8', newline='')
+    else:
+        dataset = pq.ParquetWriter(output_path, position_columns_to_arrow(concat_position_columns([])).schema)
+
+    try:
+        for batch_start in range(0, len(input_paths), batch_size):
+            tasks = [(input_path, None) for input_path in input_paths[batch_start:batch_start + batch_size]]
+            batch_results = run_file_tasks(tasks, _extract_columns_file, workers=workers)
+            columns = concat_position_columns([result.pop('columns') for result in batch_results
+                                               if 'columns' in result])
+            if file_format == '.csv':
+                write_position_columns_csv(columns, dataset, write_header)
+                write_header = False
+            else:
+                dataset.write_table(position_columns_to_arrow(columns))
+            results.extend(batch_results)
+    finally:
+        dataset.close()
+
+    return results
@@ -0,0 +1,425 @@
+"""
+Spatial index and layout analysis for positioned text fragments.
+
+PDF exports place every text fragment (`div.t`, `span`) as its own absolutely positioned
+element. This module puts the rectangles of these fragments into a uniform grid, so range,
+overlap and nearest-neighbour queries only look at the cells around the query instead of
+all fragments. On top of the index, fragments on the same line are merged and table
+regions (rows of fragments in aligned columns) are detected.
+
+All rectangles are in top-based pixels: (left, top, right, bottom) with top < bottom.
+"""
+
+import heapq
+import math
+from collections import defaultdict, namedtuple
+
+from shared.element_boxes import transform_element_boxes
+
+# Width of an average character relative to the font size, used for fragments without width
+AVERAGE_CHAR_WIDTH = 0.5
+
+# Height of fragments without height and font size in pixels
+DEFAULT_LINE_HEIGHT = 12.0
+
+# Minimum share of the smaller height two fragments must overlap vertically to share a line
+LINE_OVERLAP_RATIO = 0.5
+
+# A detected table: its page, bounds, the left positions of its columns and the indices of
+# the boxes of every row
+TableRegion = namedtuple('TableRegion', ['page', 'left', 'top', 'right', 'bottom', 'columns', 'rows'])
+
+
+class SpatialIndex:
+    """
+    Uniform grid index over rectangles, separated by page.
+
+    Every rectangle is stored in all grid cells it touches. Queries collect the candidates
+    of the cells touched by the query and test them exactly.
+    """
+
+    def __init__(self, rects, pages=None, cell_size=None):
+        """
+        Build the index.
+
+        Args:
+            rects (list): The (left, top, right, bottom) rectangles in pixels
+            pages (list, optional): The page number of every rectangle. Defaults to page 0 for all.
+            cell_size (float, optional): The edge length of the grid cells. Defaults to twice
+                                         the median rectangle height.
+        """
+        self.rects = [tuple(float(value) for value in rect) for rect in rects]
+        self.pages = list(pages) if pages is not None else [0] * len(self.rects)
+        if cell_size is None:
+            heights = sorted(bottom - top for _, top, _, bottom in self.rects)
+            cell_size = 2 * heights[len(heights) // 2] if heights else 1.0
+        self.cell_size = max(float(cell_size), 1.0)
+
+        self._cells = defaultdict(list)
+        for index, rect in enumerate(self.rects):
+            for key in self._cell_keys(self.pages[index], rect):
+                self._cells[key].append(index)
+
+    def __len__(self):
+        return len(self.rects)
+
+    def _cell_range(self, rect):
+        """Return the first and last cell column and row touched by a rectangle."""
+        size = self.cell_size
+        return (math.floor(rect[0] / size), math.floor(rect[1] / size),
+                math.floor(rect[2] / size), math.floor(rect[3] / size))
+
+    def _cell_keys(self, page, rect):
+        """Yield the keys of all cells touched by a rectangle on a page."""
+        first_column, first_row, last_column, last_row = self._cell_range(rect)
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                yield page, column, row
+
+    def _query_pages(self, page):
+        """Return the pages a query with the given page argument searches."""
+        return set(self.pages) if page is None else {page}
+
+    def query_range(self, rect, page=None):
+        """
+        Find the rectangles intersecting a rectangle; touching edges count as intersecting.
+
+        Args:
+            rect (tuple): The (left, top, right, bottom) query rectangle
+            page (int, optional): The page to search. Defaults to None (all pages).
+
+        Returns:
+            list: The indices of the intersecting rectangles in ascending order
+        """
+        left, top, right, bottom = rect
+        found = set()
+        for query_page in self._query_pages(page):
+            for key in self._cell_keys(query_page, rect):
+                for index in self._cells.get(key, ()):
+                    if index in found:
+                        continue
+                    other = self.rects[index]
+                    if other[0] <= right and left <= other[2] and other[1] <= bottom and top <= other[3]:
+                        found.add(index)
+        return sorted(found)
+
+    def overlaps(self, index):
+        """
+        Find the rectangles overlapping a rectangle of the index with a positive area.
+
+        Args:
+            index (int): The index of the rectangle
+
+        Returns:
+            list: The indices of the overlapping rectangles in ascending order
+        """
+        rect = self.rects[index]
+        return [other for other in self.query_range(rect, self.pages[index])
+                if other != index and _overlap_area(rect, self.rects[other]) > 0]
+
+    def overlapping_pairs(self):
+        """
+        Find all pairs of rectangles on the same page that overlap with a positive area.
+
+        Returns:
+            list: The (index, other index) pairs with index < other index, sorted
+        """
+        pairs = set()
+        for indices in self._cells.values():
+            for position, index in enumerate(indices):
+                for other in indices[position + 1:]:
+                    pair = (index, other) if index < other else (other, index)
+                    if pair not in pairs and _overlap_area(self.rects[index], self.rects[other]) > 0:
+                        pairs.add(pair)
+        return sorted(pairs)
+
+    def nearest(self, x, y, count=1, page=None):
+        """
+        Find the rectangles nearest to a point.
+
+        The distance is the Euclidean distance from the point to the rectangle, 0 for
+        rectangles containing the point. The grid is searched in growing rings of cells
+        until no unvisited cell can contain a nearer rectangle.
+
+        Args:
+            x (float): The x position of the point
+            y (float): The y position of the point
+            count (int, optional): The number of rectangles to find. Defaults to 1.
+            page (int, optional): The page to search. Defaults to None (all pages).
+
+        Returns:
+            list: The (distance, index) tuples of the nearest rectangles, nearest first
+        """
+        pages = self._query_pages(page)
+        candidates = sum(1 for rect_page in self.pages if rect_page in pages)
+        count = min(count, candidates)
+        if count <= 0:
+            return []
+
+        size = self.cell_size
+        center_column, center_row = math.floor(x / size), math.floor(y / size)
+        seen = set()
+        best = []  # Max-heap of (-distance, -index) with the best candidates found so far
+        ring = 0
+        while True:
+            for column, row in _ring_cells(center_column, center_row, ring):
+                for query_page in pages:
+                    for index in self._cells.get((query_page, column, row), ()):
+                        if index in seen:
+                            continue
+                        seen.add(index)
+                        candidate = (-_point_distance(x, y, self.rects[index]), -index)
+                        if len(best) < count:
+                            heapq.heappush(best, candidate)
+                        elif candidate > best[0]:
+                            heapq.heapreplace(best, candidate)
+            # Cells outside the searched rings are at least `ring * size` away from the point
+            if len(best) == count and -best[0][0] <= ring * size:
+                break
+            if len(seen) == candidates:
+                break
+            ring += 1
+        return sorted((-distance, -index) for distance, index in best)
+
+
+def _ring_cells(center_column, center_row, ring):
+    """Yield the cells at Chebyshev distance `ring` from a center cell."""
+    if ring == 0:
+        yield center_column, center_row
+        return
+    for column in range(center_column - ring, center_column + ring + 1):
+        yield column, center_row - ring
+        yield column, center_row + ring
+    for row in range(center_row - ring + 1, center_row + ring):
+        yield center_column - ring, row
+        yield center_column + ring, row
+
+
+def _overlap_area(rect, other):
+    """Return the area two rectangles share."""
+    width = min(rect[2], other[2]) - max(rect[0], other[0])
+    height = min(rect[3], other[3]) - max(rect[1], other[1])
+    return width * height if width > 0 and height > 0 else 0.0
+
+
+def _point_distance(x, y, rect):
+    """Return the distance from a point to a rectangle."""
+    dx = max(rect[0] - x, 0.0, x - rect[2])
+    dy = max(rect[1] - y, 0.0, y - rect[3])
+    return math.hypot(dx, dy)
+
+
+def _vertical_overlap_ratio(rect, other):
+    """Return the vertical overlap of two rectangles relative to the smaller height."""
+    overlap = min(rect[3], other[3]) - max(rect[1], other[1])
+    smaller = min(rect[3] - rect[1], other[3] - other[1])
+    return overlap / smaller if smaller > 0 else 0.0
+
+
+def element_box_rect(box):
+    """
+    Return the rectangle of a top-based element box, estimating missing sizes.
+
+    Without height the font size (or DEFAULT_LINE_HEIGHT) is used, without width the text
+    length times AVERAGE_CHAR_WIDTH times the font size.
+
+    Args:
+        box (ElementBox): The box with a top value
+
+    Returns:
+        tuple: The (left, top, right, bottom) rectangle in pixels
+    """
+    font_size = (box.font or {}).get('font_size') or DEFAULT_LINE_HEIGHT
+    left = box.left or 0.0
+    top = box.top or 0.0
+    width = box.width if box.width is not None else len(box.text.strip()) * font_size * AVERAGE_CHAR_WIDTH
+    height = box.height if box.height is not None else font_size
+    return left, top, left + width, top + height
+
+
+def index_element_boxes(element_boxes, cell_size=None):
+    """
+    Flip the element boxes to top-based positions and build a spatial index over them.
+
+    Args:
+        element_boxes (list): The ElementBox objects in HTML pixels
+        cell_size (float, optional): The edge length of the grid cells. Defaults to twice the
+                                     median box height.
+
+    Returns:
+        tuple: The top-based ElementBox objects and the SpatialIndex over their rectangles
+    """
+    boxes = transform_element_boxes(element_boxes, bottom_to_top=True)
+    index = SpatialIndex([element_box_rect(box) for box in boxes], [box.page.number for box in boxes], cell_size)
+    return boxes, index
+
+
+def merge_line_fragments(element_boxes, max_gap=None):
+    """
+    Merge text fragments that continue each other on the same line.
+
+    A fragment continues another one if both are text boxes on the same page with the same
+    font, they overlap vertically by at least LINE_OVERLAP_RATIO of the smaller height, and
+    it starts at most max_gap pixels after the end of the other one (anywhere after its
+    start if the width of the other one is estimated). Chains of fragments are
+    merged into one box spanning all of them; a space is put between fragments that are
+    further apart than a fifth of the font size.
+
+    Args:
+        element_boxes (list): The ElementBox objects in HTML pixels
+        max_gap (float, optional): The largest horizontal gap in pixels. Defaults to None
+                                   (half the font size of the left fragment).
+
+    Returns:
+        list: The top-based ElementBox objects with merged lines, ordered by page, top and left
+    """
+    boxes, index = index_element_boxes(element_boxes)
+    rects = index.rects
+
+    # Link every text fragment to the nearest fragment continuing it
+    successor = {}
+    predecessor = {}
+    order = sorted(range(len(boxes)), key=lambda i: (boxes[i].page.number, rects[i][0], rects[i][1]))
+    for i in order:
+        box = boxes[i]
+        if box.kind != 'text':
+            continue
+        font_size = (box.font or {}).get('font_size') or DEFAULT_LINE_HEIGHT
+        gap = font_size / 2 if max_gap is None else max_gap
+        left, top, right, bottom = rects[i]
+        # Estimated widths are rough, so without a width the next fragment may start inside the box
+        start = right - gap if box.width is not None else left
+        best = None
+        for j in index.query_range((start, top, right + gap, bottom), box.page.number):
+            if (j == i or boxes[j].kind != 'text' or rects[j][0] < start or rects[j][0] <= left
+                    or _vertical_overlap_ratio(rects[i], rects[j]) < LINE_OVERLAP_RATIO):
+                continue
+            if best is None or rects[j][0] < rects[best][0]:
+                best = j
+        # The next fragment on the line continues this one only with the same font
+        if best is not None and best not in predecessor and boxes[best].font == box.font:
+            successor[i] = best
+            predecessor[best] = i
+
+    merged = []
+    for i in order:
+        if i in predecessor:
+            continue
+        chain = [i]
+        while chain[-1] in successor:
+            chain.append(successor[chain[-1]])
+        if len(chain) == 1:
+            merged.append(boxes[i])
+            continue
+
+        font_size = (boxes[i].font or {}).get('font_size') or DEFAULT_LINE_HEIGHT
+        text = boxes[chain[0]].text
+        for previous, current in zip(chain, chain[1:]):
+            separator = ' ' if rects[current][0] - rects[previous][2] > font_size / 5 else ''
+            text += separator + boxes[current].text
+        left = min(rects[j][0] for j in chain)
+        top = min(rects[j][1] for j in chain)
+        right = max(rects[j][2] for j in chain)
+        bottom = max(rects[j][3] for j in chain)
+        first = boxes[chain[0]]
+        merged_box = first.moved(left, top, None, right - left, bottom - top)
+        merged_box.text = text
+        merged.append(merged_box)
+
+    merged.sort(key=lambda box: (box.page.number, box.top or 0.0, box.left or 0.0))
+    return merged
+
+
+def group_lines(boxes):
+    """
+    Group top-based text boxes into lines; image boxes are left out.
+
+    Boxes are sorted by page and top; a box joins the current line if it overlaps the line
+    vertically by at least LINE_OVERLAP_RATIO of the smaller height.
+
+    Args:
+        boxes (list): The top-based ElementBox objects
+
+    Returns:
+        list: The lines as lists of box indices, sorted by left within every line
+    """
+    rects = [element_box_rect(box) for box in boxes]
+    order = sorted((i for i, box in enumerate(boxes) if box.kind == 'text'),
+                   key=lambda i: (boxes[i].page.number, rects[i][1], rects[i][0]))
+    lines = []
+    line_rect = None
+    line_page = None
+    for i in order:
+        if (lines and boxes[i].page.number == line_page
+                and _vertical_overlap_ratio(line_rect, rects[i]) >= LINE_OVERLAP_RATIO):
+            lines[-1].append(i)
+            line_rect = (line_rect[0], line_rect[1], line_rect[2], max(line_rect[3], rects[i][3]))
+        else:
+            lines.append([i])
+            line_rect = rects[i]
+            line_page = boxes[i].page.number
+    for line in lines:
+        line.sort(key=lambda i: rects[i][0])
+    return lines
+
+
+def detect_table_regions(boxes, min_rows=3, min_columns=2, tolerance=2.0, max_row_gap=None):
+    """
+    Detect table regions: consecutive lines whose fragments start in the same columns.
+
+    A line belongs to a table if it has at least min_columns fragments and at least
+    min_columns of their left positions match a column of the table within tolerance
+    pixels. Consecutive matching lines with at most max_row_gap pixels between them form
+    one region; regions with fewer than min_rows lines are dropped.
+
+    Args:
+        boxes (list): The top-based ElementBox objects, e.g. from merge_line_fragments
+        min_rows (int, optional): The minimum number of rows. Defaults to 3.
+        min_columns (int, optional): The minimum number of columns. Defaults to 2.
+        tolerance (float, optional): The largest distance of aligned left positions in pixels. Defaults to 2.0.
+        max_row_gap (float, optional): The largest vertical gap between rows in pixels.
+                                       Defaults to None (twice the height of the previous row).
+
+    Returns:
+        list: The TableRegion tuples in page and top order
+    """
+    rects = [element_box_rect(box) for box in boxes]
+    regions = []
+    current = None  # Rows, columns and bottom of the region being built
+
+    def close_region():
+        if current and len(current['rows']) >= min_rows:
+            indices = [i for row in current['rows'] for i in row]
+            regions.append(TableRegion(
+                boxes[indices[0]].page.number,
+                min(rects[i][0] for i in indices), min(rects[i][1] for i in indices),
+                max(rects[i][2] for i in indices), max(rects[i][3] for i in indices),
+                sorted(current['columns']), current['rows'],
+            ))
+
+    for line in group_lines(boxes):
+        if len(line) < min_columns:
+            close_region()
+            current = None
+            continue
+
+        lefts = [rects[i][0] for i in line]
+        line_top = min(rects[i][1] for i in line)
+        line_bottom = max(rects[i][3] for i in line)
+        page = boxes[line[0]].page.number
+        if current is not None:
+            row_gap = 2 * current['row_height'] if max_row_gap is None else max_row_gap
+            aligned = [column for column in current['columns']
+                       if any(abs(column - left) <= tolerance for left in lefts)]
+            if page == current['page'] and line_top - current['bottom'] <= row_gap and len(aligned) >= min_columns:
+                current['rows'].append(line)
+                current['columns'] = aligned
+                current['bottom'] = line_bottom
+                current['row_height'] = line_bottom - line_top
+                continue
+            close_region()
+        current = {'page': page, 'rows': [line], 'columns': lefts, 'bottom': line_bottom,
+                   'row_height': line_bottom - line_top}
+
+    close_region()
+    return regions
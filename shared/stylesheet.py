@@ -0,0 +1,344 @@
+"""
+CSS stylesheet model for HTML to JasperReport conversion.
+
+This module contains the Stylesheet class, which parses the CSS of an HTML document once
+and indexes its rules by id, by class and by property. Position and font lookups for an
+element are answered from the indexes instead of scanning the CSS text again.
+"""
+
+import re
+from collections import namedtuple
+
+# Precompiled patterns for finding style tags and parsing CSS
+STYLE_OPEN_TAG_PATTERN = re.compile(r'<style(?:\s[^>]*)?(?<!/)>', re.IGNORECASE)
+STYLE_CLOSE_TAG_PATTERN = re.compile(r'</\s*style\s*>', re.IGNORECASE)
+CSS_COMMENT_PATTERN = re.compile(r'/\*.*?\*/', re.DOTALL)
+DECLARATION_PATTERN = re.compile(r'([-\w]+)\s*:\s*((?:[^;("\']+|\([^)]*\)|"[^"]*"|\'[^\']*\')*)')
+ID_SELECTOR_PATTERN = re.compile(r'#([-\w]+)$')
+CLASS_SELECTOR_PATTERN = re.compile(r'\.([-\w]+)$')
+PX_PATTERN = re.compile(r'(-?\d+\.?\d*)px')
+
+# At-rules whose blocks contain nested rules
+NESTED_AT_RULES = ('media', 'supports', 'document', 'layer', 'container')
+
+# Properties returned by Stylesheet.position
+POSITION_PROPERTIES = ('left', 'top', 'bottom', 'right', 'width', 'height')
+
+# A CSS rule with its selector, a dictionary of declarations and the enclosing at-rule preludes
+CssRule = namedtuple('CssRule', ['selector', 'declarations', 'conditions'])
+
+
+def iter_style_contents(html_string):
+    """
+    Find the content of all style tags in an HTML string without parsing the document.
+
+    Tag names are matched case-insensitively, self-closing style tags are empty and the
+    content ends at the next closing style tag, like the raw text handling of the HTML parser.
+
+    Args:
+        html_string (str): The HTML string to search
+
+    Yields:
+        str: The content of each style tag
+    """
+    position = 0
+    while True:
+        open_tag_match = STYLE_OPEN_TAG_PATTERN.search(html_string, position)
+        if not open_tag_match:
+            return
+        close_tag_match = STYLE_CLOSE_TAG_PATTERN.search(html_string, open_tag_match.end())
+        if not close_tag_match:
+            # An unterminated style tag runs until the end of the document
+            yield html_string[open_tag_match.end():]
+            return
+        yield html_string[open_tag_match.end():close_tag_match.start()]
+        position = close_tag_match.end()
+
+
+def parse_px(value):
+    """
+    Parse a CSS pixel value.
+
+    Args:
+        value (str): The CSS value (e.g. "12.5px")
+
+    Returns:
+        float: The value in pixels, or None if the value has no pixel value
+    """
+    if value is None:
+        return None
+    match = PX_PATTERN.search(value)
+    return float(match.group(1)) if match else None
+
+
+def parse_declarations(declarations_text):
+    """
+    Parse CSS declarations into a dictionary.
+
+    Semicolons inside parentheses and quotes (e.g. in `url(data:...;base64,...)`) do not end
+    a declaration.
+
+    Args:
+        declarations_text (str): The declarations of a rule or a style attribute
+
+    Returns:
+        dict: A dictionary with property names as keys and values as values
+    """
+    declarations = {}
+    for prop, value in DECLARATION_PATTERN.findall(declarations_text):
+        declarations[prop.lower()] = value.strip()
+    return declarations
+
+
+class Stylesheet:
+    """
+    Parsed CSS of an HTML document with rules indexed by id, class and property.
+
+    Only rules outside of conditional at-rules (@media, @supports, ...) are used for the
+    computed styles; all rules are kept in `rules` with their conditions.
+    """
+
+    def __init__(self, css_text=''):
+        """
+        Create a stylesheet from CSS text.
+
+        Args:
+            css_text (str, optional): The CSS to parse. Defaults to ''.
+        """
+        self.rules = []
+        self.font_faces = []
+        self._by_id = {}
+        self._by_class = {}
+        self._class_order = {}
+        self._by_property = {}
+        self._computed_cache = {}
+        self.add_css(css_text)
+
+    @classmethod
+    def from_html(cls, html_string):
+        """
+        Create a stylesheet from all style tags of an HTML string.
+
+        Args:
+            html_string (str): The HTML string containing the style tags
+
+        Returns:
+            Stylesheet: The parsed stylesheet
+        """
+        stylesheet = cls()
+        for css_content in iter_style_contents(html_string):
+            stylesheet.add_css(css_content)
+        return stylesheet
+
+    def add_css(self, css_text):
+        """
+        Parse CSS text and add its rules to the indexes.
+
+        Args:
+            css_text (str): The CSS to parse
+        """
+        if not css_text:
+            return
+        css_text = CSS_COMMENT_PATTERN.sub('', css_text)
+        self._computed_cache.clear()
+
+        position = 0
+        while position < len(css_text):
+            # A stray closing brace ends a block early, parsing continues after it
+            position = self._parse_block(css_text, position, ())
+
+    def _parse_block(self, css_text, position, conditions):
+        """
+        Parse rules until the end of the text or the closing brace of the current block.
+
+        Args:
+            css_text (str): The CSS to parse
+            position (int): The index to start parsing at
+            conditions (tuple): The preludes of the enclosing at-rules
+
+        Returns:
+            int: The index after the closing brace of the block or the length of the text
+        """
+        length = len(css_text)
+        while True:
+            brace = css_text.find('{', position)
+            close = css_text.find('}', position)
+            if brace == -1 or (close != -1 and close < brace):
+                return close + 1 if close != -1 else length
+
+            # Statements such as @import end with a semicolon before the prelude
+            prelude = css_text[position:brace].rsplit(';', 1)[-1].strip()
+
+            if prelude.startswith('@'):
+                at_rule = prelude[1:].split(None, 1)[0].lower() if len(prelude) > 1 else ''
+                if at_rule in NESTED_AT_RULES:
+                    position = self._parse_block(css_text, brace + 1, conditions + (prelude,))
+                    continue
+                body_end = css_text.find('}', brace + 1)
+                if body_end == -1:
+                    body_end = length
+                if at_rule == 'font-face':
+                    self.font_faces.append(parse_declarations(css_text[brace + 1:body_end]))
+                position = body_end + 1
+                continue
+
+            body_end = css_text.find('}', brace + 1)
+            if body_end == -1:
+                body_end = length
+            declarations = parse_declarations(css_text[brace + 1:body_end])
+            for selector in prelude.split(','):
+                selector = selector.strip()
+                if selector:
+                    self._add_rule(CssRule(selector, declarations, conditions))
+            position = body_end + 1
+            if position > length:
+                return length
+
+    def _add_rule(self, rule):
+        """
+        Add a rule to the rule list and the indexes.
+
+        Args:
+            rule (CssRule): The rule to add
+        """
+        self.rules.append(rule)
+        for prop in rule.declarations:
+            self._by_property.setdefault(prop, []).append(rule)
+
+        if rule.conditions:
+            return
+
+        id_match = ID_SELECTOR_PATTERN.match(rule.selector)
+        if id_match:
+            self._by_id.setdefault(id_match.group(1), {}).update(rule.declarations)
+            return
+
+        class_match = CLASS_SELECTOR_PATTERN.match(rule.selector)
+        if class_match:
+            class_name = class_match.group(1)
+            self._class_order.setdefault(class_name, len(self._class_order))
+            self._by_class.setdefault(class_name, {}).update(rule.declarations)
+
+    @property
+    def id_styles(self):
+        """dict: The declarations of all `#id` rules with element IDs as keys, in source order."""
+        return self._by_id
+
+    @property
+    def class_styles(self):
+        """dict: The declarations of all `.class` rules with class names as keys, in source order."""
+        return self._by_class
+
+    def id_style(self, element_id):
+        """
+        Get the declarations of the `#id` rules of an element.
+
+        Args:
+            element_id (str): The ID of the element
+
+        Returns:
+            dict: The declarations, empty if there is no rule for the ID
+        """
+        return self._by_id.get(element_id, {})
+
+    def class_style(self, class_name):
+        """
+        Get the declarations of the `.class` rules of a class.
+
+        Args:
+            class_name (str): The name of the class
+
+        Returns:
+            dict: The declarations, empty if there is no rule for the class
+        """
+        return self._by_class.get(class_name, {})
+
+    def rules_for_property(self, prop):
+        """
+        Get all rules declaring a property.
+
+        Args:
+            prop (str): The name of the CSS property (e.g. "font-size")
+
+        Returns:
+            list: The rules in source order
+        """
+        return self._by_property.get(prop, [])
+
+    def computed_style(self, element_id=None, class_names=(), inline_style=None):
+        """
+        Compute the style of an element from its class rules, id rules and style attribute.
+
+        Class rules are applied in source order, followed by the id rules and the style
+        attribute. The class and id part is cached per id and class list; every call returns
+        a new dictionary, so callers can change it without affecting later lookups.
+
+        Args:
+            element_id (str, optional): The ID of the element. Defaults to None.
+            class_names (iterable, optional): The classes of the element (a list or a class attribute string).
+            inline_style (str, optional): The style attribute of the element. Defaults to None.
+
+        Returns:
+            dict: The computed declarations
+        """
+        if isinstance(class_names, str):
+            class_names = class_names.split()
+        key = (element_id, tuple(class_names))
+
+        style = self._computed_cache.get(key)
+        if style is None:
+            style = {}
+            known_classes = [name for name in class_names if name in self._by_class]
+            for class_name in sorted(known_classes, key=self._class_order.__getitem__):
+                style.update(self._by_class[class_name])
+            if element_id is not None:
+                style.update(self._by_id.get(element_id, {}))
+            self._computed_cache[key] = style
+
+        style = dict(style)
+        if inline_style:
+            style.update(parse_declarations(inline_style))
+        return style
+
+    def position(self, element_id=None, class_names=(), inline_style=None):
+        """
+        Get the position and size properties of an element in pixels.
+
+        Args:
+            element_id (str, optional): The ID of the element. Defaults to None.
+            class_names (iterable, optional): The classes of the element.
+            inline_style (str, optional): The style attribute of the element. Defaults to None.
+
+        Returns:
+            dict: The pixel values of left, top, bottom, right, width and height that are set
+        """
+        style = self.computed_style(element_id, class_names, inline_style)
+        position = {}
+        for prop in POSITION_PROPERTIES:
+            value = parse_px(style.get(prop))
+            if value is not None:
+                position[prop] = value
+        return position
+
+    def font(self, element_id=None, class_names=(), inline_style=None):
+        """
+        Get the font properties of an element.
+
+        Args:
+            element_id (str, optional): The ID of the element. Defaults to None.
+            class_names (iterable, optional): The classes of the element.
+            inline_style (str, optional): The style attribute of the element. Defaults to None.
+
+        Returns:
+            dict: The font with font_name (str or None), font_size (float or None), is_bold,
+                  is_italic (bool) and color (str or None)
+        """
+        style = self.computed_style(element_id, class_names, inline_style)
+        font_family = style.get('font-family')
+        return {
+            'font_name': font_family.split(',')[0].strip().strip('\'"') if font_family else None,
+            'font_size': parse_px(style.get('font-size')),
+            'is_bold': style.get('font-weight', '') in ('bold', 'bolder', '700', '800', '900'),
+            'is_italic': style.get('font-style', '') in ('italic', 'oblique'),
+            'color': style.get('color'),
+        }
@@ -0,0 +1,132 @@
+"""
+Tests for the asyncio conversion service.
+
+This module contains tests for ConversionService, its concurrency limit and backpressure,
+and the async file functions.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+# Add parent directory to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.async_service import ConversionService, convert_async, convert_file_async, get_default_service
+from shared.html_utils import apply_offset, convert_bottom_to_top
+
+HTML = """<html><head></head><body>
+<div id="p1" style="width: 800px; height: 1000px;">
+<style>#t1{left:10px;bottom:100px;}</style>
+<div id="t1">Artikel</div>
+</div></body></html>"""
+
+
+class TestConversionService(unittest.IsolatedAsyncioTestCase):
+    """Test cases for shared.async_service."""
+
+    async def test_convert_in_processes(self):
+        """Conversions run in the process pool and give the synchronous results."""
+        async with ConversionService(max_concurrency=2) as service:
+            results = await asyncio.gather(
+                service.convert(HTML),
+                service.convert(HTML, apply_offset, offset_x=5),
+                convert_async(HTML, service=service, offset_y=10),
+            )
+        self.assertEqual(results, [convert_bottom_to_top(HTML), apply_offset(HTML, offset_x=5),
+                                   convert_bottom_to_top(HTML, offset_y=10)])
+        self.assertEqual(service.stats['completed'], 3)
+        with self.assertRaises(RuntimeError):
+            await service.convert(HTML)
+
+    async def test_concurrency_limit_and_backpressure(self):
+        """At most max_concurrency jobs run, max_queue wait and further requests are rejected."""
+        release = threading.Event()
+        running = []
+
+        def blocking_job(index):
+            running.append(index)
+            release.wait(5)
+            return index
+
+        async with ConversionService(max_concurrency=2, max_queue=1, use_processes=False) as service:
+            tasks = [asyncio.create_task(service.run(blocking_job, index)) for index in range(3)]
+            while service.stats['running'] < 2 or service.stats['waiting'] < 1:
+                await asyncio.sleep(0.01)
+            self.assertEqual(len(running), 2)
+
+            with self.assertRaises(asyncio.QueueFull):
+                await service.run(blocking_job, 3)
+            self.assertEqual(service.stats['rejected'], 1)
+
+            release.set()
+            self.assertEqual(await asyncio.gather(*tasks), [0, 1, 2])
+        self.assertEqual(service.stats['completed'], 3)
+        self.assertEqual(service.stats['running'], 0)
+
+    async def test_cancelled_request_keeps_slot(self):
+        """A cancelled request holds its slot until its job has finished in the pool."""
+        release = threading.Event()
+        async with ConversionService(max_concurrency=1, max_queue=0, use_processes=False) as service:
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(service.run(release.wait, 5), 0.05)
+            for _ in range(3):
+                with self.assertRaises(asyncio.QueueFull):
+                    await service.run(release.wait, 5)
+            self.assertEqual(service.stats['rejected'], 3)
+            self.assertEqual(service.stats['running'], 1)
+
+            release.set()
+            while service.stats['running']:
+                await asyncio.sleep(0.01)
+            self.assertEqual(await service.run(divmod, 7, 2), (3, 1))
+        self.assertEqual(service.stats['completed'], 2)
+
+    async def test_failed_job_releases_slot(self):
+        """A failing job is reported and frees its slot."""
+        async with ConversionService(max_concurrency=1, max_queue=0, use_processes=False) as service:
+            with self.assertRaises(ZeroDivisionError):
+                await service.run(divmod, 1, 0)
+            self.assertEqual(await service.run(divmod, 7, 2), (3, 1))
+        self.assertEqual(service.stats['failed'], 1)
+
+    async def test_files(self):
+        """Files are read, converted and written without blocking the event loop."""
+        with tempfile.TemporaryDirectory() as folder:
+            input_path = os.path.join(folder, 'page.html')
+            output_path = os.path.join(folder, 'out', 'page.html')
+            async with ConversionService(max_concurrency=1, use_processes=False) as service:
+                await service.write_text(input_path, HTML)
+                self.assertEqual(await service.load_html_from_file(input_path), HTML)
+                self.assertEqual(await convert_file_async(input_path, output_path, service=service), output_path)
+                self.assertEqual(await service.read_text(output_path), convert_bottom_to_top(HTML))
+
+    async def test_default_service(self):
+        """The default service is shared within an event loop."""
+        self.assertIs(get_default_service(), get_default_service())
+        self.assertEqual(await convert_async(HTML), convert_bottom_to_top(HTML))
+        await get_default_service().aclose()
+
+
+class TestDefaultServiceShutdown(unittest.TestCase):
+    """Test cases for the default services of event loops run by asyncio.run."""
+
+    def test_closed_with_loop(self):
+        """Every asyncio.run closes its default service and shuts its pools down."""
+        async def convert():
+            self.assertEqual(await convert_async(HTML), convert_bottom_to_top(HTML))
+            return get_default_service()
+
+        services = [asyncio.run(convert()) for _ in range(2)]
+        self.assertIsNot(services[0], services[1])
+        for service in services:
+            self.assertTrue(service._closed)
+            with self.assertRaises(RuntimeError):
+                service._executor.submit(len, '')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+Tests for batch conversion functionality.
+
+This module contains tests for batch_convert_folder in sequential and process pool mode.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+# Add parent directory to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.html_utils import (
+    apply_offset, batch_convert_folder, convert_bottom_to_top, load_batch_manifest, load_html_from_file
+)
+
+
+EXAMPLE_HTML = """<html><head><style type="text/css">
+#t1_1{left:18px;bottom:804px;}
+#t2_1{left:128px;bottom:777px;}
+</style></head><body><div id="t1_1" class="t">A</div><div id="t2_1" class="t">B</div></body></html>"""
+
+
+class TestBatchConvertFolder(unittest.TestCase):
+    """Test cases for batch_convert_folder."""
+
+    def setUp(self):
+        """Create an input folder with a few HTML files."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.input_folder = os.path.join(self.temp_dir, 'original')
+        self.output_folder = os.path.join(self.temp_dir, 'output')
+        os.makedirs(self.input_folder)
+        for name in ['b.html', 'a.html', 'c.html']:
+            with open(os.path.join(self.input_folder, name), 'w', encoding='utf-8') as file:
+                file.write(EXAMPLE_HTML)
+        open(os.path.join(self.input_folder, 'empty.html'), 'w').close()
+
+    def tearDown(self):
+        """Remove the temporary folders."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_sequential_report(self):
+        """Files are converted in sorted order with one timestamp and reported per file."""
+        results = batch_convert_folder(self.input_folder, self.output_folder, convert_bottom_to_top,
+                                       timestamp='run1', offset_x=2)
+
+        self.assertEqual([os.path.basename(r['input']) for r in results],
+                         ['a.html', 'b.html', 'c.html', 'empty.html'])
+        self.assertEqual([r['status'] for r in results], ['converted', 'converted', 'converted', 'skipped'])
+        self.assertEqual(os.path.basename(results[0]['output']), 'convert_bottom_to_top_a_run1.html')
+        self.assertEqual(load_html_from_file(results[0]['output']),
+                         convert_bottom_to_top(EXAMPLE_HTML, offset_x=2))
+
+    def test_process_pool_matches_sequential(self):
+        """The process pool mode produces the same files and report as the sequential mode."""
+        sequential = batch_convert_folder(self.input_folder, self.output_folder, apply_offset,
+                                          timestamp='seq', offset_x=3, offset_y=4)
+        parallel = batch_convert_folder(self.input_folder, self.output_folder, apply_offset,
+                                        workers=2, timestamp='par', offset_x=3, offset_y=4)
+
+        self.assertEqual([r['status'] for r in parallel], [r['status'] for r in sequential])
+        for sequential_result, parallel_result in zip(sequential, parallel):
+            if sequential_result['output']:
+                self.assertEqual(load_html_from_file(parallel_result['output']),
+                                 load_html_from_file(sequential_result['output']))
+
+    def test_errors_are_reported(self):
+        """Errors of the conversion function are reported instead of raised."""
+        def failing_conversion(html_string):
+            raise ValueError("broken")
+
+        results = batch_convert_folder(self.input_folder, self.output_folder, failing_conversion, timestamp='err')
+        self.assertEqual([r['status'] for r in results], ['error', 'error', 'error', 'skipped'])
+        self.assertEqual(results[0]['error'], 'ValueError: broken')
+
+        # Local functions cannot be sent to worker processes
+        results = batch_convert_folder(self.input_folder, self.output_folder, failing_conversion,
+                                       workers=2, timestamp='err')
+        self.assertTrue(all(r['status'] == 'error' for r in results))
+
+    def test_incremental_skips_unchanged_inputs(self):
+        """Unchanged inputs are skipped, changed inputs are reconverted and stale outputs removed."""
+        first = batch_convert_folder(self.input_folder, self.output_folder, convert_bottom_to_top,
+                                     timestamp='run1', incremental=True, offset_x=2)
+        self.assertEqual([r['status'] for r in first], ['converted', 'converted', 'converted', 'skipped'])
+        manifest = load_batch_manifest(self.output_folder)
+        self.assertEqual(manifest['convert_bottom_to_top']['a.html']['parameters'], {'offset_x': 2})
+
+        # Change one input and delete another
+        with open(os.path.join(self.input_folder, 'a.html'), 'a', encoding='utf-8') as file:
+            file.write('<!-- changed -->')
+        os.remove(os.path.join(self.input_folder, 'c.html'))
+
+        second = batch_convert_folder(self.input_folder, self.output_folder, convert_bottom_to_top,
+                                      timestamp='run2', incremental=True, offset_x=2)
+        self.assertEqual([(os.path.basename(r['input']), r['status']) for r in second],
+                         [('a.html', 'converted'), ('b.html', 'unchanged'), ('empty.html', 'skipped'),
+                          ('c.html', 'removed')])
+        self.assertEqual(second[1]['output'], first[1]['output'])
+        self.assertFalse(os.path.exists(first[0]['output']))
+        self.assertFalse(os.path.exists(first[2]['output']))
+
+        # Other arguments convert everything again
+        third = batch_convert_folder(self.input_folder, self.output_folder, convert_bottom_to_top,
+                                     timestamp='run3', incremental=True, offset_x=5)
+        self.assertEqual([r['status'] for r in third], ['converted', 'converted', 'skipped'])
+        self.assertEqual(sorted(f for f in os.listdir(self.output_folder) if f.endswith('.html')),
+                         ['convert_bottom_to_top_a_run3.html', 'convert_bottom_to_top_b_run3.html'])
+
+
+if __name__ == '__main__':
+    unittest.main()
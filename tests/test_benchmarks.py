@@ -0,0 +1,54 @@
+"""
+Tests for the benchmark suite.
+
+This module contains tests for the synthetic document generator and the baseline comparison.
+"""
+
+import os
+import sys
+import unittest
+
+# Add parent directory to path to import shared modules and the benchmarks
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'benchmarks'))
+
+from bench_pipeline import compare_results
+from synthetic_documents import generate_document
+from shared.element_boxes import build_element_boxes
+from shared.html_utils import extract_positions
+from shared.pages import find_pages
+
+
+class TestBenchmarks(unittest.TestCase):
+    """Test cases for the benchmark suite."""
+
+    def test_generate_document(self):
+        """Generated documents are deterministic and have the requested pages, boxes and classes."""
+        document = generate_document(pages=3, boxes_per_page=20, style_classes=4, image_bytes=30, seed=5)
+        self.assertEqual(document, generate_document(pages=3, boxes_per_page=20, style_classes=4,
+                                                     image_bytes=30, seed=5))
+        self.assertNotEqual(document, generate_document(pages=3, boxes_per_page=20, style_classes=4, seed=6))
+        self.assertEqual(len(find_pages(document)), 3)
+        self.assertEqual(len(extract_positions(document)), 60)
+        self.assertEqual(document.count('src="data:image/jpeg;base64,'), 3)
+
+        boxes = build_element_boxes(document, include_images=False)
+        self.assertEqual(len(boxes), 60)
+        self.assertEqual({box.page.number for box in boxes}, {1, 2, 3})
+        self.assertLessEqual({box.style_class for box in boxes}, {'s0', 's1', 's2', 's3'})
+
+    def test_compare_results(self):
+        """Only cases slower than tolerance and minimum difference are regressions."""
+        baseline = [{'case': 'a', 'size': 'small', 'seconds': 0.1},
+                    {'case': 'b', 'size': 'small', 'seconds': 0.001}]
+        results = [{'case': 'a', 'size': 'small', 'seconds': 0.2},
+                   {'case': 'b', 'size': 'small', 'seconds': 0.0015},
+                   {'case': 'c', 'size': 'small', 'seconds': 1.0}]
+        comparisons = compare_results(results, baseline, tolerance=0.25)
+        self.assertEqual([(c['case'], c['regression']) for c in comparisons], [('a', True), ('b', False)])
+        self.assertAlmostEqual(comparisons[0]['ratio'], 2.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+"""
+Tests for the command-line interface.
+
+This module runs the CLI commands on temporary files and checks their outputs and JSON summaries.
+"""
+
+import io
+import json
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import warnings
+from contextlib import redirect_stdout
+
+# Add parent directory to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.cli import expand_inputs, main
+from shared.html_utils import apply_offset, convert_bottom_to_top, load_html_from_file
+
+try:
+    import bs4
+except ImportError:
+    bs4 = None
+
+
+EXAMPLE_HTML = """<html><head><style type="text/css">
+#t1_1{left:18px;bottom:804px;}
+#t2_1{left:128px;top:21px;}
+</style></head><body><div id="t1_1" class="t">A</div><div id="t2_1" class="t">B</div></body></html>"""
+
+
+class TestCli(unittest.TestCase):
+    """Test cases for the command-line interface."""
+
+    def setUp(self):
+        """Create an input folder with a few HTML files."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.input_folder = os.path.join(self.temp_dir, 'original')
+        self.output_dir = os.path.join(self.temp_dir, 'output')
+        os.makedirs(self.input_folder)
+        for name in ['b.html', 'a.html']:
+            with open(os.path.join(self.input_folder, name), 'w', encoding='utf-8') as file:
+                file.write(EXAMPLE_HTML)
+
+    def tearDown(self):
+        """Remove the temporary folders."""
+        shutil.rmtree(self.temp_dir)
+
+    def run_cli(self, *argv):
+        """Run the CLI and return its exit code and the parsed JSON summary."""
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            exit_code = main(list(argv))
+        return exit_code, json.loads(stdout.getvalue())
+
+    def test_convert_glob(self):
+        """Glob patterns are expanded and every file is reported with its timing."""
+        exit_code, summary = self.run_cli('convert', os.path.join(self.input_folder, '*.html'),
+                                          '--output-dir', self.output_dir, '--offset-x', '3')
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(summary['counts'], {'converted': 2})
+        self.assertEqual([os.path.basename(f['input']) for f in summary['files']], ['a.html', 'b.html'])
+        self.assertIsInstance(summary['files'][0]['seconds'], float)
+        self.assertEqual(load_html_from_file(summary['files'][0]['output']), convert_bottom_to_top(EXAMPLE_HTML, 3))
+
+    def test_convert_mmap(self):
+        """Memory-mapped input files are converted like streamed ones."""
+        exit_code, summary = self.run_cli('convert', os.path.join(self.input_folder, 'a.html'), '--mmap',
+                                          '--output-dir', self.output_dir, '--offset-y', '2')
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(load_html_from_file(summary['files'][0]['output']), convert_bottom_to_top(EXAMPLE_HTML, 0, 2))
+
+    def test_offset_from_stdin_with_jobs(self):
+        """Paths are read from stdin, processed in a pool and missing files are reported."""
+        missing_path = os.path.join(self.input_folder, 'missing.html')
+        stdin = io.StringIO(f"{os.path.join(self.input_folder, 'a.html')}\n\n{missing_path}\n")
+        self.assertEqual(expand_inputs(['-'], stdin), sorted([os.path.join(self.input_folder, 'a.html'),
+                                                              missing_path]))
+
+        summary_path = os.path.join(self.temp_dir, 'summary.json')
+        exit_code = main(['offset', os.path.join(self.input_folder, 'a.html'), missing_path, '--jobs', '2',
+                          '--offset-y', '-5', '--output-dir', self.output_dir, '--summary', summary_path])
+        with open(summary_path, encoding='utf-8') as file:
+            summary = json.load(file)
+        self.assertEqual(exit_code, 1)
+        self.assertEqual([f['status'] for f in summary['files']], ['converted', 'error'])
+        self.assertEqual(load_html_from_file(summary['files'][0]['output']), apply_offset(EXAMPLE_HTML, 0, -5))
+
+    def test_extract_positions(self):
+        """Positions are written as JSON files."""
+        exit_code, summary = self.run_cli('extract-positions', os.path.join(self.input_folder, 'a.html'),
+                                          '--output-dir', self.output_dir)
+        self.assertEqual(summary['files'][0]['positions'], 2)
+        with open(summary['files'][0]['output'], encoding='utf-8') as file:
+            self.assertEqual(json.load(file)[1], {'id': 't2_1', 'left': 128.0, 'top': 21.0})
+
+    @unittest.skipIf(bs4 is None, "BeautifulSoup is not installed")
+    def test_to_jrxml(self):
+        """HTML files are converted to JRXML reports."""
+        exit_code, summary = self.run_cli('to-jrxml', os.path.join(self.input_folder, 'a.html'),
+                                          '--output-dir', self.output_dir, '--scale-factor-x', '1')
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(summary['files'][0]['elements'], 2)
+        self.assertTrue(summary['files'][0]['output'].endswith('a.jrxml'))
+
+    def test_unreadable_input_is_an_error(self):
+        """Files that are no valid UTF-8 are reported as errors without output besides the summary."""
+        invalid_path = os.path.join(self.input_folder, 'invalid.html')
+        with open(invalid_path, 'wb') as file:
+            file.write(b'<html>\xff\xfe</html>')
+        commands = ['extract-positions'] + (['to-jrxml'] if bs4 is not None else [])
+        for command in commands:
+            with self.subTest(command=command):
+                exit_code, summary = self.run_cli(command, invalid_path, '--output-dir', self.output_dir)
+                self.assertEqual(exit_code, 1)
+                self.assertEqual(summary['files'][0]['status'], 'error')
+                self.assertIn('UnicodeDecodeError', summary['files'][0]['error'])
+
+    def test_batch(self):
+        """The batch command converts a folder incrementally."""
+        argv = ['batch', self.input_folder, '--output-dir', self.output_dir, '--function', 'offset',
+                '--incremental', '--timestamp', 'run1']
+        self.assertEqual(self.run_cli(*argv)[1]['counts'], {'converted': 2})
+        self.assertEqual(self.run_cli(*argv)[1]['counts'], {'unchanged': 2})
+
+    def test_batch_invalid_manifest(self):
+        """An unusable manifest is reported as a warning, keeps stdout JSON and converts all files."""
+        argv = ['batch', self.input_folder, '--output-dir', self.output_dir, '--function', 'offset',
+                '--incremental', '--timestamp', 'run1']
+        os.makedirs(self.output_dir)
+        for content in ['garbage{', '[]', '{"functions": []}']:
+            with self.subTest(manifest=content):
+                with open(os.path.join(self.output_dir, 'batch_manifest.json'), 'w', encoding='utf-8') as file:
+                    file.write(content)
+                with warnings.catch_warnings(record=True) as caught:
+                    warnings.simplefilter('always')
+                    exit_code, summary = self.run_cli(*argv)
+                self.assertEqual((exit_code, summary['counts']), (0, {'converted': 2}))
+                self.assertIn('converting all files', str(caught[0].message))
+
+
+if __name__ == '__main__':
+    unittest.main()
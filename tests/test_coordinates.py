@@ -0,0 +1,66 @@
+"""
+Tests for the coordinate transforms.
+
+This module checks the batched flip, offset and scale of element boxes against the scalar math.
+"""
+
+import math
+import os
+import sys
+import unittest
+
+# Add parent directory to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.constants import HTML_HEIGHT, SCALE_FACTOR_X, SCALE_FACTOR_Y
+from shared.coordinates import (
+    boxes_from_styles, boxes_to_positions, html_to_jasper_boxes, np, transform_positions
+)
+from shared.html_utils import extract_css_styles_from_html
+
+
+EXAMPLE_HTML = """<style>
+#t1_1{left:18px;bottom:804px;width:100px;height:-2px;}
+#t2_1{left:128.5px;top:21px;}
+#t3_1{top:5px;bottom:7px;}
+#t4_1{letter-spacing:0.14px;}
+</style>"""
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestCoordinates(unittest.TestCase):
+    """Test cases for the coordinate transforms."""
+
+    def test_styles_to_boxes(self):
+        """Styles are collected into arrays with NaN for missing values."""
+        boxes = boxes_from_styles(extract_css_styles_from_html(EXAMPLE_HTML))
+        self.assertEqual(boxes.ids, ['t1_1', 't2_1', 't3_1', 't4_1'])
+        self.assertEqual(boxes.left[:2].tolist(), [18.0, 128.5])
+        self.assertEqual(boxes.height[0], -2.0)
+        self.assertTrue(math.isnan(boxes.left[2]))
+        self.assertEqual(boxes_to_positions(boxes)[3], {'id': 't4_1'})
+
+    def test_flip_offset_and_scale(self):
+        """Flip, offsets and scaling match the scalar formulas."""
+        boxes = boxes_from_styles(extract_css_styles_from_html(EXAMPLE_HTML))
+        positions = boxes_to_positions(html_to_jasper_boxes(boxes, offset_x=3, offset_y=-5))
+        self.assertEqual(positions[0], {
+            'id': 't1_1',
+            'left': (18 + 3) * SCALE_FACTOR_X,
+            'top': (HTML_HEIGHT - 804 - 5) * SCALE_FACTOR_Y,
+            'width': 100 * SCALE_FACTOR_X,
+            'height': -2 * SCALE_FACTOR_Y,
+        })
+        # A top value takes precedence over the bottom value
+        self.assertEqual(positions[2], {'id': 't3_1', 'top': 0.0, 'bottom': 7 * SCALE_FACTOR_Y})
+
+    def test_transform_positions_without_flip(self):
+        """Without flip only offsets are applied and bottom values are kept."""
+        positions = [{'id': 'a', 'left': 1.0, 'bottom': 2.0}, {'id': 'b', 'top': 3.0}]
+        self.assertEqual(transform_positions(positions, offset_x=2, offset_y=1),
+                         [{'id': 'a', 'left': 3.0, 'bottom': 2.0}, {'id': 'b', 'top': 4.0}])
+        self.assertEqual(transform_positions([]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+Tests for the CSS position rewrite engine.
+
+This module checks that convert_bottom_to_top and apply_offset keep the exact output of the
+previous per-property regex implementation, including its edge cases.
+"""
+
+import io
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+# Add parent directory to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.css_rewrite import (
+    iter_css_rules, iter_style_blocks, rewrite_style_positions, stream_rewrite_style_positions
+)
+from shared.html_utils import (
+    apply_offset, apply_offset_file, convert_bottom_to_top, convert_bottom_to_top_file, load_html_from_file
+)
+
+
+class TestCssRewrite(unittest.TestCase):
+    """Test cases for the CSS position rewrite engine."""
+
+    def test_first_occurrence_determines_rule_value(self):
+        """All occurrences of a property in a rule get the value of the first occurrence."""
+        html = '<style>#a{left:10px;bottom:800px;padding-bottom:4px;bottom:3px}</style>'
+        self.assertEqual(convert_bottom_to_top(html, 3, -5),
+                         '<style>#a{left:13px;top:20px;padding-top:20px;top:20px}</style>')
+        self.assertEqual(apply_offset(html, 3, -5),
+                         '<style>#a{left:13px;bottom:800px;padding-bottom:4px;bottom:3px}</style>')
+
+    def test_nested_and_empty_rules(self):
+        """Nested @supports blocks and empty rules are tokenized like the original regex."""
+        html = '<style>@supports (x) { .a { bottom:12.5px } } #b{}#c{bottom:0.5px}</style>'
+        self.assertEqual(convert_bottom_to_top(html, 3, -5),
+                         '<style>@supports (x) { .a { top:808px } } #b{}#c{top:820px}</style>')
+
+    def test_values_outside_rules_are_untouched(self):
+        """Values in selectors, inline styles and unterminated style blocks are not rewritten."""
+        html = '<style>{{top:1px{bottom:2px;top:5px}</style><p style="bottom:3px"><style>#y{left:2.5px}'
+        self.assertEqual(convert_bottom_to_top(html, 3),
+                         '<style>{{top:1px{top:823px;top:5px}</style><p style="bottom:3px"><style>#y{left:2.5px}')
+        self.assertEqual(apply_offset(html, 0, -5),
+                         '<style>{{top:1px{bottom:2px;top:0px}</style><p style="bottom:3px"><style>#y{left:2.5px}')
+
+    def test_no_transform_returns_input(self):
+        """Without a transform the input string is returned unchanged."""
+        html = '<style>#a{left:10px;top:5px}</style>'
+        self.assertIs(apply_offset(html), html)
+        self.assertIs(rewrite_style_positions(html), html)
+
+    def test_custom_html_height(self):
+        """Bottom values are flipped against the given page height."""
+        html = '<style>#a{left:10px;bottom:1208px}</style>'
+        self.assertEqual(rewrite_style_positions(html, bottom_to_top=True, html_height=1286),
+                         '<style>#a{left:10px;top:78px}</style>')
+
+    def test_tokenizers(self):
+        """Style blocks and rules are located by index."""
+        html = '<style a="b">#a{left:1px}#b{}#c{top:2px}</style>'
+        blocks = list(iter_style_blocks(html))
+        self.assertEqual([html[start:end] for start, end in blocks], ['#a{left:1px}#b{}#c{top:2px}'])
+        rules = list(iter_css_rules(html, *blocks[0]))
+        self.assertEqual([html[start:end] for start, end in rules], ['left:1px', 'top:2px'])
+
+    def test_streaming_matches_string_rewrite(self):
+        """The streaming rewrite gives the same result for every chunk size."""
+        html = ('<html><head><style type="text/css">#a{left:10px;bottom:800px}\n#b{bottom:12px}</style>'
+                '</head><body><img id="pdf1" src="data:image/png;base64,' + 'QUJD' * 100 + '">'
+                '<style>#c{top:3px;left:4px}</style><style>#d{bottom:1px}')
+        for kwargs in [{'bottom_to_top': True, 'offset_x': 3}, {'offset_x': 3, 'offset_y': -5}]:
+            expected = rewrite_style_positions(html, **kwargs)
+            for chunk_size in [1, 5, 7, 64, 4096]:
+                output = io.StringIO()
+                characters_read = stream_rewrite_style_positions(io.StringIO(html), output,
+                                                                 chunk_size=chunk_size, **kwargs)
+                self.assertEqual(output.getvalue(), expected)
+                self.assertEqual(characters_read, len(html))
+
+    def test_file_streaming(self):
+        """The file functions write the same HTML as the string functions."""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            test_file_path = os.path.join('data', 'original', 'original_2025-07-16_104156.html')
+            html_string = load_html_from_file(test_file_path)
+
+            output_path = convert_bottom_to_top_file(test_file_path, os.path.join(temp_dir, 'top.html'),
+                                                     offset_x=3, offset_y=-5, chunk_size=1000)
+            self.assertEqual(load_html_from_file(output_path), convert_bottom_to_top(html_string, 3, -5))
+
+            output_path = apply_offset_file(test_file_path, os.path.join(temp_dir, 'offset.html'),
+                                            offset_x=3, offset_y=-5, chunk_size=1000)
+            self.assertEqual(load_html_from_file(output_path), apply_offset(html_string, 3, -5))
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+Tests for the document cache.
+
+This module contains tests for the LRU cache of parsed documents and stylesheets.
+"""
+
+import os
+import sys
+import unittest
+
+# Add parent directory to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.html_utils import (
+    DOCUMENT_CACHE, DocumentCache, convert_bottom_to_top, extract_positions, get_stylesheet,
+    parse_html_cached
+)
+from shared.jasper_xml import convert_html_to_jasper_snippets
+
+
+EXAMPLE_HTML = """<html><head><style>
+#t1_1{left:18px;bottom:804px;}
+</style></head><body><div id="t1_1">Text</div></body></html>"""
+
+
+class TestDocumentCache(unittest.TestCase):
+    """Test cases for the DocumentCache class."""
+
+    def setUp(self):
+        """Start every test with an empty shared cache."""
+        DOCUMENT_CACHE.clear()
+
+    def test_hits_and_misses(self):
+        """Equal content is parsed once, no matter which string object it comes from."""
+        soup = parse_html_cached(EXAMPLE_HTML)
+        self.assertIs(parse_html_cached(''.join(list(EXAMPLE_HTML))), soup)
+        self.assertIsNot(parse_html_cached(EXAMPLE_HTML, True), soup)
+        self.assertIs(get_stylesheet(EXAMPLE_HTML), get_stylesheet(EXAMPLE_HTML))
+        self.assertEqual(DOCUMENT_CACHE.stats(),
+                         {'hits': 2, 'misses': 3, 'evictions': 0, 'entries': 3,
+                          'size': 4 * len(EXAMPLE_HTML) * 2 + len(EXAMPLE_HTML)})
+
+    def test_eviction(self):
+        """The least recently used entries are evicted by count and by size."""
+        cache = DocumentCache(max_entries=2, max_size=100)
+        calls = []
+
+        def factory(html_string):
+            calls.append(html_string)
+            return html_string.upper()
+
+        cache.get('stylesheet', 'a' * 10, factory)
+        cache.get('stylesheet', 'b' * 10, factory)
+        cache.get('stylesheet', 'a' * 10, factory)
+        cache.get('stylesheet', 'c' * 10, factory)
+        self.assertEqual(cache.get('stylesheet', 'a' * 10, factory), 'A' * 10)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+        # Entries larger than the cache are returned without being stored
+        cache.get('soup', 'd' * 30, factory)
+        self.assertEqual(cache.stats()['entries'], 2)
+        cache.get('stylesheet', 'e' * 95, factory)
+        self.assertEqual(cache.stats(), {'hits': 2, 'misses': 5, 'evictions': 3, 'entries': 1, 'size': 95})
+
+    def test_multi_step_conversion_parses_once(self):
+        """Positions and JRXML of one converted document share the parsed tree and stylesheet."""
+        converted = convert_bottom_to_top(EXAMPLE_HTML)
+        positions = extract_positions(converted, use_beautifulsoup=True)
+        extract_positions(converted, stylesheet=get_stylesheet(converted))
+        convert_html_to_jasper_snippets(converted, convert_bottom=False)
+        convert_html_to_jasper_snippets(converted, convert_bottom=False)
+
+        self.assertEqual(positions, [{'id': 't1_1', 'left': 18.0, 'top': 21.0}])
+        stats = DOCUMENT_CACHE.stats()
+        self.assertEqual((stats['misses'], stats['hits']), (2, 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+Tests for the compact element model.
+
+This module contains tests for ElementBox, build_element_boxes and the consumers of the boxes.
+"""
+
+import os
+import sys
+import unittest
+
+# Add parent directory to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.element_boxes import DEFAULT_PAGE, ElementBox, build_element_boxes, transform_element_boxes
+from shared.html_utils import extract_positions, get_stylesheet
+
+
+EXAMPLE_HTML = """<html><head><style>
+.s1{font-family:"ff1";font-size:12px;font-weight:bold;}
+#t1_1{left:18px;bottom:804px;width:40px;}
+#t1_2{left:20px;top:30px;}
+</style></head><body>
+<div id="p1" style="width: 1210px; height: 825px;"><div id="t1_1" class="t s1">A</div></div>
+<div id="p2" style="width: 909px; height: 1286px;">
+<div id="t1_2" class="s1">B</div>
+<span style="left:5px;bottom:1000px">C</span>
+<img src="page.png" width="909" height="1286">
+</div>
+<p>not positioned</p>
+</body></html>"""
+
+
+class TestElementBoxes(unittest.TestCase):
+    """Test cases for the element boxes."""
+
+    def setUp(self):
+        """Build the boxes of the example document."""
+        self.boxes = build_element_boxes(EXAMPLE_HTML)
+
+    def test_build(self):
+        """Boxes hold parsed values, text, font class, shared fonts and their page."""
+        self.assertFalse(hasattr(self.boxes[0], '__dict__'))
+        self.assertEqual([(box.kind, box.element_id, box.text, box.page.number) for box in self.boxes],
+                         [('text', 't1_1', 'A', 1), ('text', 't1_2', 'B', 2), ('text', None, 'C', 2),
+                          ('image', None, 'page.png', 2)])
+        self.assertEqual(self.boxes[0].position(), {'left': 18.0, 'bottom': 804.0, 'width': 40.0})
+        self.assertEqual((self.boxes[3].width, self.boxes[3].height), (909.0, 1286.0))
+        self.assertEqual(self.boxes[0].style_class, 's1')
+        self.assertIs(self.boxes[0].font, self.boxes[1].font)
+        self.assertEqual(self.boxes[0].font['font_name'], 'ff1')
+        self.assertIs(self.boxes[1].page, self.boxes[2].page)
+        self.assertEqual(build_element_boxes('<div style="left:1px;top:2px">x</div>')[0].page, DEFAULT_PAGE)
+
+    def test_extract_positions(self):
+        """extract_positions reads the boxes without parsing the document again."""
+        positions = extract_positions(EXAMPLE_HTML, element_boxes=self.boxes)
+        self.assertEqual(positions, extract_positions(EXAMPLE_HTML, stylesheet=get_stylesheet(EXAMPLE_HTML)))
+
+    def test_transform_per_page(self):
+        """Bottom values are flipped against the height of the page of every box."""
+        transformed = transform_element_boxes(self.boxes, bottom_to_top=True, offset_x=2, scale_y=[1, 1, 0.5, 1])
+        self.assertEqual([(box.left, box.top) for box in transformed[:3]],
+                         [(20.0, 21.0), (22.0, 30.0), (7.0, 143.0)])
+        self.assertIsNone(transformed[0].bottom)
+        self.assertEqual(transformed[1], ElementBox('text', 't1_2', 22.0, 30.0, None, None, None, 'B', 's1',
+                                                    self.boxes[1].font, self.boxes[1].page))
+        # The original boxes are unchanged
+        self.assertEqual(self.boxes[0].bottom, 804.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+"""
+Tests for element extraction.
+
+This module contains tests for extract_elements and collect_elements.
+"""
+
+import os
+import sys
+import unittest
+
+# Add parent directory to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.html_utils import (
+    ELEMENT_TAGS, LXML_AVAILABLE, collect_elements, extract_elements, load_html_from_file, parse_html
+)
+from shared.stylesheet import Stylesheet
+
+try:
+    import bs4
+except ImportError:
+    bs4 = None
+
+
+EXAMPLE_HTML = """<html><head><style>
+.t { position: absolute; font-size: 10px; }
+#t1_1 { left: 18px; bottom: 804px; }
+</style></head><body>
+<div id="pg1"><span id="t1_1" class="t s1">A</span><p>B<span class="t" style="left: 2px">C</span></p></div>
+<style>.s1 { font-size: 12px; }</style>
+<table><tr><td><img src="a.png"></td></tr></table>
+</body></html>"""
+
+
+@unittest.skipIf(bs4 is None, "BeautifulSoup is not installed")
+class TestExtractElements(unittest.TestCase):
+    """Test cases for extract_elements and collect_elements."""
+
+    def test_matches_find_all(self):
+        """The single traversal finds the same elements in the same order as find_all."""
+        sample_path = os.path.join('data', 'original', 'original_2025-07-16_104156.html')
+        for html_string in [EXAMPLE_HTML, load_html_from_file(sample_path)]:
+            soup = parse_html(html_string)
+            elements = extract_elements(soup)
+            self.assertEqual(list(elements), list(ELEMENT_TAGS))
+            for tag in ELEMENT_TAGS:
+                self.assertEqual(elements[tag], soup.find_all(tag))
+
+    def test_elements_are_paired_with_styles(self):
+        """Collected elements carry their computed style, including style tags later in the body."""
+        elements = collect_elements(parse_html(EXAMPLE_HTML))
+        spans = elements['span']
+        self.assertEqual([span.element.get_text() for span in spans], ['A', 'C'])
+        self.assertEqual(spans[0].style, {'position': 'absolute', 'font-size': '12px',
+                                          'left': '18px', 'bottom': '804px'})
+        self.assertEqual(spans[1].style, {'position': 'absolute', 'font-size': '10px', 'left': '2px'})
+        self.assertEqual(elements['img'][0].style, {})
+
+        # A given stylesheet is used instead of the style tags
+        elements = collect_elements(parse_html(EXAMPLE_HTML), Stylesheet('.t{color:red}'), tags=('span',))
+        self.assertEqual(list(elements), ['span'])
+        self.assertEqual(elements['span'][0].style, {'color': 'red'})
+
+    @unittest.skipIf(not LXML_AVAILABLE, "lxml is not installed")
+    def test_lxml_parser(self):
+        """The lxml backend collects the same elements."""
+        html_parser_elements = extract_elements(parse_html(EXAMPLE_HTML))
+        lxml_elements = extract_elements(parse_html(EXAMPLE_HTML, use_lxml=True))
+        for tag in ELEMENT_TAGS:
+            self.assertEqual([str(e) for e in lxml_elements[tag]], [str(e) for e in html_parser_elements[tag]])
+
+
+if __name__ == '__main__':
+    unittest.main()
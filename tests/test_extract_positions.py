@@ -0,0 +1,56 @@
+"""
+Tests for position and style extraction.
+
+This module contains tests for extract_positions and the CSS style extraction functions.
+"""
+
+import os
+import sys
+import unittest
+
+# Add parent directory to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.html_utils import extract_css_styles_from_html, extract_positions, load_html_from_file
+
+try:
+    import bs4
+except ImportError:
+    bs4 = None
+
+
+EXAMPLE_HTML = """<html><head>
+<style class="shared-css" type="text/css">
+    .t { position: absolute; }
+</style>
+<STYLE type="text/css">
+    #t1_1{left:18px;bottom:804px;letter-spacing:0.14px;}
+    #t2_1{left:128.5px;top:21px;}
+    #t1_1{left:20px;bottom:800px;}
+</STYLE >
+<style/>#t3_1{left:1px;}</style>
+</head><body><div id="t1_1" class="t">A</div></body></html>"""
+
+
+class TestExtractPositions(unittest.TestCase):
+    """Test cases for extract_positions."""
+
+    def test_style_only_path(self):
+        """Positions are extracted from the style tags without parsing the document."""
+        self.assertEqual(extract_positions(EXAMPLE_HTML), [
+            {'id': 't1_1', 'left': 20.0, 'bottom': 800.0},
+            {'id': 't2_1', 'left': 128.5, 'top': 21.0},
+        ])
+        self.assertEqual(extract_css_styles_from_html(EXAMPLE_HTML)['t2_1'], {'left': '128.5px', 'top': '21px'})
+
+    @unittest.skipIf(bs4 is None, "BeautifulSoup is not installed")
+    def test_style_only_path_matches_beautifulsoup(self):
+        """The style-only path returns the same positions as the BeautifulSoup path."""
+        sample_path = os.path.join('data', 'original', 'original_2025-07-16_104156.html')
+        for html_string in [EXAMPLE_HTML, load_html_from_file(sample_path)]:
+            self.assertEqual(extract_positions(html_string),
+                             extract_positions(html_string, use_beautifulsoup=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+Tests for the fixture data generator.
+
+This module contains tests for the generated rows, the SQL and CSV output and the SQLite loader.
+"""
+
+import csv
+import io
+import itertools
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+# Add parent directory to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.fixtures import (
+    TABLE_COLUMNS, VALUE_COLUMN_COUNT, iter_fixture_batches, iter_fixture_rows, iter_sql_inserts,
+    load_sqlite_fixtures, sql_literal, write_csv_fixtures, write_sql_fixtures
+)
+
+
+def table_summary(connection):
+    """Return the row count and value sums of the fixture tables of a database."""
+    return (
+        connection.execute('SELECT COUNT(*), SUM(article_rows_data_values_sum), SUM(article_row_count) '
+                           'FROM Articles').fetchone(),
+        connection.execute('SELECT COUNT(*), SUM(row_data_values_sum), MAX(id) FROM ArticleDataRows').fetchone(),
+    )
+
+
+class TestFixtures(unittest.TestCase):
+    """Test cases for shared.fixtures."""
+
+    def test_rows(self):
+        """Rows fit the columns and the article sums match their data rows."""
+        rows = list(iter_fixture_rows(50, seed=3))
+        self.assertEqual(rows[0], ('Company', (1, 'CompanyName')))
+
+        articles = {}
+        sums = {}
+        counts = {}
+        for table, row in rows[1:]:
+            self.assertEqual(len(row), len(TABLE_COLUMNS[table]))
+            if table == 'ArticleDataRows':
+                data_count = row[5]
+                values = row[6:6 + VALUE_COLUMN_COUNT]
+                self.assertEqual(sum(int(value) for value in values[:data_count]), row[4])
+                self.assertTrue(all(value is None for value in values[data_count:]))
+                sums[row[1]] = sums.get(row[1], 0) + row[4]
+                counts[row[1]] = counts.get(row[1], 0) + 1
+            else:
+                # Every article comes before its data rows
+                self.assertNotIn(row[0], counts)
+                articles[row[0]] = (row[2], row[4])
+        for article_id, (values_sum, row_count) in articles.items():
+            self.assertEqual(values_sum, sums[article_id])
+            self.assertEqual(row_count, counts[article_id])
+
+    def test_deterministic(self):
+        """The same seed gives the same rows, another seed other rows."""
+        self.assertEqual(list(iter_fixture_rows(20, seed=1)), list(iter_fixture_rows(20, seed=1)))
+        self.assertNotEqual(list(iter_fixture_rows(20, seed=1)), list(iter_fixture_rows(20, seed=2)))
+
+    def test_batches(self):
+        """Batches are bounded and data rows follow the articles they refer to."""
+        articles_seen = set()
+        for table, batch in iter_fixture_batches(200, batch_size=16):
+            self.assertLessEqual(len(batch), 16)
+            if table == 'Articles':
+                articles_seen.update(row[0] for row in batch)
+            elif table == 'ArticleDataRows':
+                self.assertTrue(all(row[1] in articles_seen for row in batch))
+        with self.assertRaises(ValueError):
+            next(iter_fixture_batches(1, batch_size=0))
+
+    def test_lazy(self):
+        """Rows are generated on demand, so huge row counts start immediately."""
+        statements = list(itertools.islice(iter_sql_inserts(10 ** 9, batch_size=10, include_schema=False), 3))
+        self.assertEqual(len(statements), 3)
+
+    def test_sql_script(self):
+        """The SQL script creates and fills the tables like the SQLite loader."""
+        output = io.StringIO()
+        statement_count = write_sql_fixtures(output, 300, seed=5, batch_size=64)
+        self.assertEqual(statement_count, output.getvalue().count(';\n'))
+        connection = sqlite3.connect(':memory:')
+        connection.executescript(output.getvalue())
+
+        with tempfile.TemporaryDirectory() as folder:
+            database_path = os.path.join(folder, 'fixtures.sqlite')
+            counts = load_sqlite_fixtures(database_path, 300, seed=5, batch_size=64, transaction_rows=100)
+            loaded = sqlite3.connect(database_path)
+            try:
+                self.assertEqual(table_summary(loaded), table_summary(connection))
+                self.assertEqual(counts['ArticleDataRows'], table_summary(loaded)[1][0])
+                self.assertEqual(counts['Articles'], 300)
+                self.assertEqual(loaded.execute('SELECT COUNT(*) FROM Company').fetchone()[0], 1)
+            finally:
+                loaded.close()
+
+            # Loading again replaces the tables
+            self.assertEqual(load_sqlite_fixtures(database_path, 10)['Articles'], 10)
+
+    def test_csv(self):
+        """Every table is written to a CSV file with a header."""
+        with tempfile.TemporaryDirectory() as folder:
+            counts = write_csv_fixtures(folder, 40, seed=2, batch_size=7)
+            for table, columns in TABLE_COLUMNS.items():
+                with open(os.path.join(folder, f'{table}.csv'), encoding='utf-8', newline='') as file:
+                    rows = list(csv.reader(file))
+                self.assertEqual(rows[0], [column for column, _ in columns])
+                self.assertEqual(len(rows) - 1, counts[table])
+            self.assertEqual(counts['Articles'], 40)
+
+    def test_sql_literal(self):
+        """Values are formatted as SQL literals."""
+        self.assertEqual(sql_literal(None), 'NULL')
+        self.assertEqual(sql_literal("O'Neil"), "'O''Neil'")
+        self.assertEqual(sql_literal(36), '36')
+
+
+if __name__ == "__main__":
+    unittest.main()
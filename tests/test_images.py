@@ -0,0 +1,120 @@
+"""
+Tests for the image extraction.
+
+This module contains tests for ImageStore, stream_extract_images and the image references
+in the converted HTML and JRXML.
+"""
+
+import base64
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+# Add parent directory to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.html_utils import run_file_tasks
+from shared.images import ImageStore, extract_images, extract_images_file, stream_extract_images
+from shared.jasper_xml import convert_html_to_jasper
+
+
+PNG_DATA = b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 4
+PNG_BASE64 = base64.b64encode(PNG_DATA).decode('ascii')
+
+EXAMPLE_HTML = f"""<html><body>
+<img id="pdf1" style="left:0px;top:0px" width="10" height="10"
+     src="data:image/png;base64,{PNG_BASE64[:40]}
+{PNG_BASE64[40:]}">
+<img src='data:image/svg+xml,%3Csvg a=&quot;1&quot;%3E%3C/svg%3E' style="left:1px;top:1px">
+<img src="data:image/png;base64,{PNG_BASE64}" style="left:2px;top:2px">
+<img src="logo.png" style="left:3px;top:3px">
+<p>data: not an image, src=data:</p>
+</body></html>"""
+
+
+class TestImages(unittest.TestCase):
+    """Test cases for the image extraction."""
+
+    def setUp(self):
+        """Create a temporary folder for the images."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.image_dir = os.path.join(self.temp_dir.name, 'images')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_extract_images(self):
+        """Payloads are decoded into content-addressed files and identical images stored once."""
+        store = ImageStore(self.image_dir, 'images')
+        html_string = extract_images(EXAMPLE_HTML, store)
+
+        self.assertNotIn('base64', html_string)
+        self.assertIn('src="logo.png"', html_string)
+        self.assertIn('<p>data: not an image, src=data:</p>', html_string)
+        self.assertEqual(store.stats['images'], 3)
+        self.assertEqual((store.stats['written'], store.stats['duplicates']), (2, 1))
+
+        names = sorted(os.listdir(self.image_dir))
+        self.assertEqual(sorted(os.path.splitext(name)[1] for name in names), ['.png', '.svg'])
+        png_name = next(name for name in names if name.endswith('.png'))
+        with open(os.path.join(self.image_dir, png_name), 'rb') as file:
+            self.assertEqual(file.read(), PNG_DATA)
+        svg_name = next(name for name in names if name.endswith('.svg'))
+        with open(os.path.join(self.image_dir, svg_name), 'rb') as file:
+            self.assertEqual(file.read(), b'<svg a="1"></svg>')
+        self.assertEqual(html_string.count(f'src="images/{png_name}"'), 2)
+        self.assertIn(f"src='images/{svg_name}'", html_string)
+
+    @unittest.skipIf(os.name != 'posix', "File modes are POSIX only")
+    def test_file_mode(self):
+        """Stored images get the mode of newly created files under the current umask."""
+        umask = os.umask(0o027)
+        try:
+            reference = ImageStore(self.image_dir, '').add(PNG_DATA, 'image/png')
+        finally:
+            os.umask(umask)
+        mode = os.stat(os.path.join(self.image_dir, reference)).st_mode & 0o777
+        self.assertEqual(mode, 0o640)
+
+    def test_chunk_sizes(self):
+        """The output is the same for every chunk size."""
+        expected = extract_images(EXAMPLE_HTML, ImageStore(self.image_dir))
+        for chunk_size in (1, 3, 7, 64):
+            output = io.StringIO()
+            store = ImageStore(self.image_dir)
+            self.assertEqual(stream_extract_images(io.StringIO(EXAMPLE_HTML), output, store, chunk_size), 3)
+            self.assertEqual(output.getvalue(), expected)
+            self.assertEqual(store.stats['duplicates'], 3)
+
+    def test_invalid_payload(self):
+        """Unterminated data URIs raise a ValueError and leave no partial files."""
+        with self.assertRaises(ValueError):
+            extract_images('<img src="data:image/png;base64,AAAA', ImageStore(self.image_dir))
+        self.assertEqual(os.listdir(self.image_dir), [])
+
+    def test_batch_and_jrxml(self):
+        """Files of a batch share the image folder; JRXML image expressions reference the files."""
+        input_paths = []
+        for name in ('a.html', 'b.html'):
+            input_paths.append(os.path.join(self.temp_dir.name, name))
+            with open(input_paths[-1], 'w', encoding='utf-8') as file:
+                file.write(EXAMPLE_HTML)
+        output_dir = os.path.join(self.temp_dir.name, 'out')
+        tasks = [(path, os.path.join(output_dir, os.path.basename(path))) for path in input_paths]
+        results = run_file_tasks(tasks, extract_images_file, workers=2)
+        self.assertEqual([result['status'] for result in results], ['converted'] * 2)
+        self.assertEqual(sum(result['written'] for result in results), 2)
+        self.assertEqual(len(os.listdir(os.path.join(output_dir, 'images'))), 2)
+        with open(tasks[0][1], encoding='utf-8') as file:
+            self.assertIn('src="images/', file.read())
+
+        output = io.StringIO()
+        convert_html_to_jasper(EXAMPLE_HTML, output, image_dir=self.image_dir)
+        self.assertNotIn('base64', output.getvalue())
+        self.assertIn(self.image_dir.replace(os.sep, '/'), output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
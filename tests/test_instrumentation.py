@@ -0,0 +1,163 @@
+"""
+Tests for the instrumentation of the conversion functions.
+
+This module contains tests for record, the stages of the conversion functions and the
+per-file reports of the batch functions.
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import threading
+import tracemalloc
+import unittest
+
+# Add parent directory to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.html_utils import (
+    DOCUMENT_CACHE, batch_convert_folder, convert_bottom_to_top, convert_bottom_to_top_file, extract_positions,
+    run_file_tasks
+)
+from shared.instrumentation import current_recorder, measure, record, stage
+
+HTML = """<html><head></head><body>
+<div id="p1" style="width: 800px; height: 1000px;">
+<style>
+#t1_1{left:10px;bottom:100px;}
+#t2_1{left:20px;bottom:200px;}
+</style>
+<div id="t1_1" class="t">Artikel</div>
+<div id="t2_1" class="t">Menge</div>
+</div>
+</body></html>"""
+
+
+class TestInstrumentation(unittest.TestCase):
+    """Test cases for shared.instrumentation."""
+
+    def setUp(self):
+        DOCUMENT_CACHE.clear()
+
+    def test_nothing_recorded_by_default(self):
+        """Without a recording the functions run without a recorder."""
+        self.assertIsNone(current_recorder())
+        self.assertIn('top:900px', convert_bottom_to_top(HTML))
+
+    def test_stages(self):
+        """Every stage gets its calls, time, characters and elements."""
+        reports = []
+        with record(document='page.html', callback=reports.append) as recorder:
+            convert_bottom_to_top(HTML)
+            extract_positions(HTML, use_beautifulsoup=True)
+            self.assertIs(current_recorder(), recorder)
+        self.assertIsNone(current_recorder())
+
+        report = reports[0]
+        self.assertEqual(report['document'], 'page.html')
+        stages = report['stages']
+        self.assertEqual(stages['convert_bottom_to_top']['calls'], 1)
+        self.assertEqual(stages['convert_bottom_to_top']['characters'], len(HTML))
+        self.assertEqual(stages['extract_positions']['elements'], 2)
+        self.assertEqual(stages['extract_css_styles']['elements'], 2)
+        self.assertEqual(stages['parse_html']['characters'], len(HTML))
+        self.assertIn('rewrite_page_positions', stages)
+
+        # The self time excludes the nested stages
+        positions = stages['extract_positions']
+        self.assertLess(positions['self_seconds'], positions['seconds'])
+        self.assertGreaterEqual(report['seconds'], positions['seconds'])
+
+    def test_custom_stages(self):
+        """Decorated functions and measured blocks are recorded, also when they raise."""
+        @stage(name='double', elements=len)
+        def double(values):
+            return values * 2
+
+        with record() as recorder:
+            self.assertEqual(double([1]), [1, 1])
+            with self.assertRaises(ValueError):
+                with measure('failing', characters=5):
+                    raise ValueError("failed")
+        self.assertEqual(recorder.stages['double']['elements'], 2)
+        self.assertEqual(recorder.stages['failing']['characters'], 5)
+        self.assertEqual(recorder.stages['failing']['calls'], 1)
+
+    def test_profile_and_memory(self):
+        """A recording can capture a profile and the peak traced memory."""
+        with record(profile=True, trace_memory=True) as recorder:
+            convert_bottom_to_top(HTML)
+        report = recorder.report()
+        self.assertGreater(report['memory_peak_bytes'], 0)
+        self.assertTrue(any('convert_bottom_to_top' in function['function'] for function in report['profile']))
+
+    def test_profile_and_memory_in_threads(self):
+        """Recordings overlapping in two threads both get a profile and their own memory peak."""
+        both_recording = threading.Barrier(2)
+        first_done = threading.Event()
+        reports = {}
+
+        def convert(name):
+            with record(profile=True, trace_memory=True, callback=lambda report: reports.setdefault(name, report)):
+                convert_bottom_to_top(HTML)
+                both_recording.wait(10)
+                if name == 'second':
+                    # tracemalloc must still run after the first recording has stopped
+                    first_done.wait(10)
+                    data = bytearray(1000000)
+                    del data
+            if name == 'first':
+                first_done.set()
+
+        threads = [threading.Thread(target=convert, args=(name,)) for name in ('first', 'second')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for report in reports.values():
+            self.assertTrue(any('convert_bottom_to_top' in function['function'] for function in report['profile']))
+        self.assertGreater(reports['first']['memory_peak_bytes'], 0)
+        self.assertGreaterEqual(reports['second']['memory_peak_bytes'], 1000000)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_log(self):
+        """The report is logged with the structured record."""
+        with self.assertLogs('shared.instrumentation', level=logging.INFO) as logs:
+            with record(document='page.html', log=True):
+                convert_bottom_to_top(HTML)
+        self.assertEqual(logs.records[0].instrumentation['document'], 'page.html')
+        self.assertIn('"convert_bottom_to_top"', logs.output[0])
+
+    def test_batch_documents(self):
+        """Batch functions record every file, also in worker processes."""
+        with tempfile.TemporaryDirectory() as input_folder, tempfile.TemporaryDirectory() as output_folder:
+            for name in ('a.html', 'b.html'):
+                with open(os.path.join(input_folder, name), 'w', encoding='utf-8') as file:
+                    file.write(HTML)
+
+            for workers in (None, 2):
+                with record() as recorder:
+                    results = batch_convert_folder(input_folder, output_folder, workers=workers)
+                self.assertTrue(all('instrumentation' not in result for result in results))
+                report = recorder.report()
+                self.assertEqual([document['document'] for document in report['documents']],
+                                 [result['input'] for result in results])
+                self.assertEqual(report['stages']['convert_bottom_to_top']['calls'], 2)
+                self.assertEqual(report['stages']['read_file']['bytes'], 2 * len(HTML))
+                self.assertEqual(report['stages']['batch_convert_folder']['elements'], 2)
+
+            tasks = [(os.path.join(input_folder, 'a.html'), os.path.join(output_folder, 'a.html'))]
+            with record() as recorder:
+                run_file_tasks(tasks, convert_bottom_to_top_file, workers=2)
+            self.assertEqual(recorder.stages['convert_bottom_to_top_file']['bytes'], len(HTML))
+            self.assertIn('stream_rewrite_style_positions', recorder.documents[0]['stages'])
+
+        # Without a recording the results have no reports
+        with tempfile.TemporaryDirectory() as output_folder:
+            tasks = [(__file__, os.path.join(output_folder, 'out.py'))]
+            self.assertNotIn('instrumentation', run_file_tasks(tasks, convert_bottom_to_top_file)[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+"""
+Tests for the JasperReport XML generation.
+
+This module contains tests for JrxmlWriter and the HTML to JRXML conversion functions.
+"""
+
+import io
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import xml.etree.ElementTree as ET
+
+# Add parent directory to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.constants import HTML_HEIGHT, SCALE_FACTOR_X, SCALE_FACTOR_Y
+from shared.jasper_xml import (
+    JrxmlWriter, cdata, convert_html_file_to_jasper, convert_html_to_jasper, convert_html_to_jasper_snippets
+)
+from shared.html_utils import load_html_from_file
+
+try:
+    import bs4
+except ImportError:
+    bs4 = None
+
+
+NS = {'jr': 'http://jasperreports.sourceforge.net/jasperreports'}
+
+EXAMPLE_HTML = """<html><head><style>
+.t { position: absolute; }
+.s1 { font-family: 'Arial'; font-size: 14px; font-weight: bold; }
+#t1_1{left:18px;top:21px;}
+#t2_1{left:128px;bottom:804px;}
+</style></head><body>
+<div id="t1_1" class="t s1">Text 1 ]]> & more</div>
+<div id="t2_1" class="t">Text 2</div>
+<span class="t" style="left:100px;bottom:25px;width:50px">Inline</span>
+<span>Unpositioned</span>
+<img src="images/a.png" style="left:10px;top:20px" width="40" height="30px">
+</body></html>"""
+
+
+class TestJrxmlWriter(unittest.TestCase):
+    """Test cases for JrxmlWriter."""
+
+    def test_elements_are_written_to_the_stream(self):
+        """Each element is written when it is added and the result is valid XML."""
+        output = io.StringIO()
+        writer = JrxmlWriter(output)
+        writer.write_header(report_name='A "report"')
+        writer.write_static_text(1.9, 2, 3, 4, 'a ]]> b', {'font_name': 'Arial', 'font_size': 9.5},
+                                 element_uuid='u1')
+        size_after_text = len(output.getvalue())
+        writer.write_text_field(5, 6, 7, 8, '$F{name}', expression_class='java.lang.String')
+        self.assertGreater(len(output.getvalue()), size_after_text)
+        writer.write_image(0, 0, 10, 10, '"a.png"')
+        writer.write_footer()
+        self.assertEqual(writer.element_count, 3)
+
+        root = ET.fromstring(output.getvalue().encode('utf-8'))
+        self.assertEqual(root.get('name'), 'A "report"')
+        static_text = root.find('.//jr:staticText', NS)
+        self.assertEqual(static_text.find('jr:reportElement', NS).attrib,
+                         {'x': '1', 'y': '2', 'width': '3', 'height': '4', 'uuid': 'u1'})
+        self.assertEqual(static_text.find('jr:text', NS).text, 'a ]]> b')
+        self.assertEqual(static_text.find('.//jr:font', NS).get('size'), '9')
+        expression = root.find('.//jr:textFieldExpression', NS)
+        self.assertEqual((expression.text, expression.get('class')), ('$F{name}', 'java.lang.String'))
+        self.assertEqual(root.find('.//jr:imageExpression', NS).text, '"a.png"')
+
+    def test_cdata(self):
+        """CDATA end markers in the text are split."""
+        self.assertEqual(cdata('x]]>y'), '<![CDATA[x]]]]><![CDATA[>y]]>')
+
+
+@unittest.skipIf(bs4 is None, "BeautifulSoup is not installed")
+class TestHtmlToJasper(unittest.TestCase):
+    """Test cases for the HTML to JRXML conversion."""
+
+    def test_convert_html_to_jasper_snippets(self):
+        """Positioned text elements and images are converted with scaled positions and fonts."""
+        root = ET.fromstring(convert_html_to_jasper_snippets(EXAMPLE_HTML).encode('utf-8'))
+        texts = root.findall('.//jr:staticText', NS)
+        self.assertEqual([t.find('jr:text', NS).text for t in texts], ['Text 1 ]]> & more', 'Text 2', 'Inline'])
+
+        boxes = [t.find('jr:reportElement', NS).attrib for t in texts]
+        self.assertEqual((boxes[0]['x'], boxes[0]['y']), (str(int(18 * SCALE_FACTOR_X)), str(int(21 * SCALE_FACTOR_Y))))
+        self.assertEqual(boxes[1]['y'], str(int((HTML_HEIGHT - 804) * SCALE_FACTOR_Y)))
+        self.assertEqual((boxes[2]['width'], boxes[2]['height']), (str(int(50 * SCALE_FACTOR_X)), '20'))
+
+        # The font is a report style referenced by the element
+        self.assertIsNone(texts[0].find('.//jr:font', NS))
+        self.assertEqual(texts[0].find('jr:reportElement', NS).get('style'), 's1')
+        font = root.find("jr:style[@name='s1']", NS).attrib
+        self.assertEqual((font['fontName'], font['isBold']), ('Arial', 'true'))
+        self.assertEqual(font['fontSize'], str(int(14 * min(SCALE_FACTOR_X, SCALE_FACTOR_Y))))
+
+        image = root.find('.//jr:image', NS)
+        self.assertEqual(image.find('jr:reportElement', NS).get('width'), str(int(40 * SCALE_FACTOR_X)))
+        self.assertEqual(image.find('jr:imageExpression', NS).text, '"images/a.png"')
+
+    def test_shared_styles(self):
+        """Each distinct font is one style; without shared styles the fonts are written inline."""
+        html = ('<style>.s0{font-family:ff0;font-size:12px;}.s1{font-family:ff1;font-size:12px;}</style>'
+                + ''.join(f'<div class="t s{i % 2}" style="left:{i}px;top:{i}px">{i}</div>' for i in range(20))
+                + '<div style="left:1px;top:2px">no class</div>')
+        root = ET.fromstring(convert_html_to_jasper_snippets(html, scale_factor_x=1, scale_factor_y=1).encode('utf-8'))
+        styles = root.findall('jr:style', NS)
+        self.assertEqual([(style.get('name'), style.get('fontName')) for style in styles],
+                         [('s0', 'ff0'), ('s1', 'ff1'), ('font1', 'Arial')])
+        elements = root.findall('.//jr:reportElement', NS)
+        self.assertEqual([element.get('style') for element in elements[:3]], ['s0', 's1', 's0'])
+        self.assertEqual(elements[-1].get('style'), 'font1')
+        self.assertEqual(root.findall('.//jr:textElement', NS), [])
+
+        inline = ET.fromstring(convert_html_to_jasper_snippets(html, shared_styles=False).encode('utf-8'))
+        self.assertEqual(inline.findall('jr:style', NS), [])
+        self.assertEqual(len(inline.findall('.//jr:font', NS)), 21)
+
+    def test_snippets_without_header_and_footer(self):
+        """Without header and footer only the elements are returned."""
+        snippets = convert_html_to_jasper_snippets(EXAMPLE_HTML, include_header=False, include_footer=False)
+        self.assertTrue(snippets.startswith('            <staticText>'))
+        self.assertTrue(snippets.endswith('</image>\n'))
+
+    def test_convert_file(self):
+        """The sample export is written to a JRXML file."""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            sample_path = os.path.join('data', 'original', 'original_2025-07-16_104156.html')
+            output_path = os.path.join(temp_dir, 'out', 'report.jrxml')
+            element_count = convert_html_file_to_jasper(sample_path, output_path)
+            root = ET.parse(output_path).getroot()
+            self.assertEqual(element_count, 227)
+            self.assertEqual(len(root.findall('.//jr:staticText', NS)), 226)
+
+            output = io.StringIO()
+            self.assertEqual(convert_html_to_jasper(load_html_from_file(sample_path), output), element_count)
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
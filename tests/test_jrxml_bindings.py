@@ -0,0 +1,193 @@
+"""
+Tests for the rule-driven binding of report texts.
+
+This module contains tests for the binding rules, the rewritten elements and the inserted
+parameter and field declarations.
+"""
+
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+import xml.etree.ElementTree as ET
+
+# Add parent directory to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.html_utils import run_file_tasks
+from shared.jasper_xml import convert_html_to_jasper
+from shared.jrxml_bindings import (
+    BindingRule, bind_jrxml_file, compile_rules, declaration_name, parse_java_string_literal,
+    transform_jasper_report
+)
+
+NS = {'jr': 'http://jasperreports.sourceforge.net/jasperreports'}
+
+REPORT = """<?xml version="1.0" encoding="UTF-8"?>
+<jasperReport xmlns="http://jasperreports.sourceforge.net/jasperreports" name="r">
+    <style name="s0" fontName="Arial" fontSize="10" isBold="false" isItalic="false"/>
+    <parameter name="existing" class="java.lang.String"/>
+    <queryString>
+        <![CDATA[]]>
+    </queryString>
+    <background>
+        <band splitType="Stretch"/>
+    </background>
+    <detail>
+        <band height="800" splitType="Prevent">
+            <staticText>
+                <reportElement x="10" y="20" width="100" height="20" uuid="a" style="s0"/>
+                <text><![CDATA[Lieferschein 227107409]]></text>
+            </staticText>
+            <textField>
+                <reportElement x="600" y="20" width="100" height="20" uuid="b"/>
+                <textFieldExpression><![CDATA["4067264290086"]]></textFieldExpression>
+            </textField>
+            <textField>
+                <reportElement x="10" y="60" width="100" height="20" uuid="c"/>
+                <textFieldExpression><![CDATA["Seite: " + $V{PAGE_NUMBER}]]></textFieldExpression>
+            </textField>
+            <staticText>
+                <reportElement x="10" y="100" width="100" height="20" uuid="d"/>
+                <text><![CDATA[Menge]]></text>
+            </staticText>
+        </band>
+        <band height="800" splitType="Prevent">
+            <staticText>
+                <reportElement x="10" y="20" width="100" height="20" uuid="e" style="s0"/>
+                <text><![CDATA[Lieferschein 227107410]]></text>
+            </staticText>
+            <textField>
+                <reportElement x="600" y="20" width="100" height="20" uuid="f"/>
+                <textFieldExpression><![CDATA["existing \\"value\\""]]></textFieldExpression>
+            </textField>
+        </band>
+    </detail>
+</jasperReport>
+"""
+
+RULES = [
+    {'kind': 'static', 'pattern': '^Menge$'},
+    {'kind': 'parameter', 'name': r'delivery_note_\g<number>', 'pattern': r'^Lieferschein (?P<number>\d+)$',
+     'style': 's0', 'band': 1},
+    {'kind': 'field', 'name': 'ean', 'pattern': r'^\d{13}$', 'region': (500, 0, 300, 100)},
+    {'kind': 'parameter', 'name': 'existing', 'pattern': '^existing'},
+    {'kind': 'field', 'name': 'delivery_note', 'pattern': '^Lieferschein'},
+]
+
+
+def expressions(xml_content):
+    """Return the textField expressions of a report by element UUID."""
+    root = ET.fromstring(xml_content)
+    return {field.find('jr:reportElement', NS).get('uuid'): field.find('jr:textFieldExpression', NS).text
+            for field in root.iter('{%s}textField' % NS['jr'])}
+
+
+class TestJrxmlBindings(unittest.TestCase):
+    """Test cases for shared.jrxml_bindings."""
+
+    def test_rules_bind_elements(self):
+        """The first matching rule binds an element, computed expressions stay as they are."""
+        rules = RULES[1:] + RULES[:1]
+        result = transform_jasper_report(REPORT, rules)
+        fields = expressions(result)
+        self.assertEqual(fields['a'], '$P{delivery_note_227107409}')
+        self.assertEqual(fields['b'], '$F{ean}')
+        self.assertEqual(fields['c'], '"Seite: " + $V{PAGE_NUMBER}')
+        # The style matches, but the band does not
+        self.assertEqual(fields['e'], '$F{delivery_note}')
+        self.assertEqual(fields['f'], '$P{existing}')
+        # Menge is matched by no rule before the static rule
+        self.assertNotIn('d', fields)
+
+        root = ET.fromstring(result)
+        self.assertEqual(root.find('jr:staticText/jr:text', NS), None)
+        self.assertIn('Menge', result)
+
+    def test_declarations(self):
+        """Parameters and fields are declared once, in schema order, without redeclaring names."""
+        rules = RULES[1:]
+        root = ET.fromstring(transform_jasper_report(REPORT, rules))
+        children = [child.tag.split('}')[1] for child in root]
+        self.assertEqual(children, ['style', 'parameter', 'parameter', 'queryString', 'field', 'field',
+                                    'background', 'detail'])
+
+        parameters = root.findall('jr:parameter', NS)
+        self.assertEqual([parameter.get('name') for parameter in parameters],
+                         ['existing', 'delivery_note_227107409'])
+        self.assertEqual(parameters[1].find('jr:defaultValueExpression', NS).text, '"Lieferschein 227107409"')
+        fields = root.findall('jr:field', NS)
+        self.assertEqual([field.get('name') for field in fields], ['ean', 'delivery_note'])
+        self.assertEqual(fields[0].find('jr:fieldDescription', NS).text, '4067264290086')
+
+    def test_unmatched_report_unchanged(self):
+        """A report without matching elements is copied unchanged."""
+        self.assertEqual(transform_jasper_report(REPORT, [{'kind': 'field', 'name': 'x', 'pattern': 'nothing'}]),
+                         REPORT)
+
+    def test_conflicting_bindings(self):
+        """A name bound as parameter and as field is rejected."""
+        rules = [{'kind': 'parameter', 'name': 'text', 'pattern': '^Lieferschein'},
+                 {'kind': 'field', 'name': 'text'}]
+        with self.assertRaises(ValueError):
+            transform_jasper_report(REPORT, rules)
+
+    def test_rule_validation(self):
+        """Unknown kinds and rules without names are rejected."""
+        with self.assertRaises(ValueError):
+            compile_rules([{'kind': 'variable', 'name': 'x'}])
+        with self.assertRaises(ValueError):
+            compile_rules([BindingRule('field', None)])
+        with self.assertRaises(ValueError):
+            transform_jasper_report(REPORT, [{'kind': 'field', 'name': r'\g<missing>', 'pattern': 'Menge'}])
+
+    def test_helpers(self):
+        """Names become Java identifiers and string literals are decoded."""
+        self.assertEqual(declaration_name('Artikel-Nr. 1'), 'Artikel_Nr__1')
+        self.assertEqual(declaration_name('36'), '_36')
+        self.assertEqual(parse_java_string_literal('"a \\"b\\"\\n\\u00e4"'), 'a "b"\nä')
+        self.assertIsNone(parse_java_string_literal('"a" + "b"'))
+
+    def test_generated_report(self):
+        """The staticTexts of a converted HTML document can be bound by style class."""
+        html = """<html><head><style>.s1{font-family:Arial;font-size:12px;}</style></head><body>
+        <div id="p1" style="width: 800px; height: 1000px;">
+        <style>#t1{left:10px;bottom:900px;} #t2{left:10px;bottom:800px;}</style>
+        <div id="t1" class="t s1">Lieferschein</div>
+        <div id="t2" class="t">36</div>
+        </div></body></html>"""
+        output = io.StringIO()
+        convert_html_to_jasper(html, output)
+        result = transform_jasper_report(output.getvalue(), [{'kind': 'field', 'name': 'size', 'pattern': r'^\d+$'},
+                                                               {'kind': 'parameter', 'name': 'title', 'style': 's1'}])
+        root = ET.fromstring(result)
+        self.assertEqual(sorted(expressions(result).values()), ['$F{size}', '$P{title}'])
+        self.assertEqual(len(root.findall('jr:parameter', NS)), 1)
+        self.assertEqual(len(root.findall('jr:field', NS)), 1)
+
+    def test_bind_files(self):
+        """Files are bound with rules from a JSON file, also in a batch."""
+        with tempfile.TemporaryDirectory() as folder:
+            rules_path = os.path.join(folder, 'rules.json')
+            with open(rules_path, 'w', encoding='utf-8') as file:
+                json.dump(RULES, file)
+            tasks = []
+            for name in ('a', 'b'):
+                input_path = os.path.join(folder, f'{name}.jrxml')
+                with open(input_path, 'w', encoding='utf-8') as file:
+                    file.write(REPORT)
+                tasks.append((input_path, os.path.join(folder, 'out', f'{name}.jrxml')))
+
+            stats = bind_jrxml_file(tasks[0][0], tasks[0][1], rules_path, chunk_size=64)
+            self.assertEqual(stats, {'bound': 4, 'parameters': 1, 'fields': 2})
+            with open(tasks[0][1], encoding='utf-8') as file:
+                self.assertEqual(file.read(), transform_jasper_report(REPORT, RULES))
+
+            results = run_file_tasks(tasks, bind_jrxml_file, workers=2, rules=rules_path)
+            self.assertEqual([result['bound'] for result in results], [4, 4])
+
+
+if __name__ == "__main__":
+    unittest.main()
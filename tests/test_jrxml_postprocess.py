@@ -0,0 +1,125 @@
+"""
+Tests for the streaming JRXML post-processing.
+
+This module contains tests for shifting reportElement positions and sorting textFields.
+"""
+
+import io
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import xml.etree.ElementTree as ET
+
+# Add parent directory to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.jrxml_postprocess import (
+    adjust_jrxml_positions, iter_xml_tokens, process_jrxml_file, sort_jrxml_text_fields, stream_process_jrxml
+)
+
+
+NS = {'jr': 'http://jasperreports.sourceforge.net/jasperreports'}
+
+EXAMPLE_JRXML = """<?xml version="1.0" encoding="UTF-8"?>
+<!-- Created with <b> tags > in a comment -->
+<jasperReport xmlns="http://jasperreports.sourceforge.net/jasperreports" name="r">
+    <queryString>
+        <![CDATA[SELECT 1 WHERE a > b]]>
+    </queryString>
+    <title>
+        <band height="370" splitType="Stretch">
+            <textField>
+                <reportElement style="t s0" x="89" y="15" width="14"
+                               height="30" uuid="a"/>
+                <textFieldExpression><![CDATA["</textField> ]]]]><![CDATA[>"]]></textFieldExpression>
+            </textField>
+            <staticText>
+                <reportElement x="1" y="2" width="3" height="4"/>
+                <text><![CDATA[static]]></text>
+            </staticText>
+            <!-- first line -->
+            <textField>
+                <reportElement style="t s0" x="13" y="15" width="49" height="30" uuid="b"/>
+                <textFieldExpression><![CDATA["Seite: "]]></textFieldExpression>
+            </textField>
+            <textField>
+                <reportElement x="13" y="5" width="49" height="30" uuid="c"/>
+                <textFieldExpression><![CDATA["Top"]]></textFieldExpression>
+            </textField>
+        </band>
+    </title>
+    <summary>
+        <band height="20" splitType="Stretch"/>
+    </summary>
+</jasperReport>
+"""
+
+
+def text_field_uuids(xml_content):
+    """Return the UUIDs of all textFields in document order."""
+    root = ET.fromstring(xml_content.encode('utf-8'))
+    return [field.find('jr:reportElement', NS).get('uuid') for field in root.iter(f"{{{NS['jr']}}}textField")]
+
+
+class TestJrxmlPostprocess(unittest.TestCase):
+    """Test cases for the streaming JRXML post-processing."""
+
+    def test_tokens_join_to_input(self):
+        """The tokenizer gives complete tags and markup for every chunk size."""
+        for chunk_size in [1, 3, 8, 64]:
+            tokens = list(iter_xml_tokens(io.StringIO(EXAMPLE_JRXML), chunk_size))
+            self.assertEqual(''.join(tokens), EXAMPLE_JRXML)
+            self.assertIn('<!-- Created with <b> tags > in a comment -->', tokens)
+            self.assertIn('<![CDATA[SELECT 1 WHERE a > b]]>', tokens)
+        with self.assertRaises(ValueError):
+            list(iter_xml_tokens(io.StringIO('<a><b x="1"')))
+
+    def test_adjust_positions(self):
+        """Only the x and y attributes of reportElements are shifted."""
+        adjusted = adjust_jrxml_positions(EXAMPLE_JRXML, x_offset=-16, y_offset=5)
+        self.assertIn('x="73" y="20" width="14"', adjusted)
+        self.assertIn('x="-15" y="7" width="3"', adjusted)
+        self.assertIn('height="370"', adjusted)
+        self.assertEqual(adjusted.count('<![CDATA['), EXAMPLE_JRXML.count('<![CDATA['))
+        self.assertEqual(adjust_jrxml_positions(EXAMPLE_JRXML), EXAMPLE_JRXML)
+
+    def test_sort_text_fields(self):
+        """textFields are sorted by y and x at the end of their band, keeping CDATA and comments."""
+        sorted_jrxml = sort_jrxml_text_fields(EXAMPLE_JRXML)
+        self.assertEqual(text_field_uuids(sorted_jrxml), ['c', 'b', 'a'])
+        self.assertLess(sorted_jrxml.index('<staticText>'), sorted_jrxml.index('uuid="c"'))
+        self.assertLess(sorted_jrxml.index('<!-- first line -->'), sorted_jrxml.index('uuid="b"'))
+        self.assertIn('<![CDATA["</textField> ]]]]><![CDATA[>"]]>', sorted_jrxml)
+        self.assertEqual(sorted(sorted_jrxml.splitlines()), sorted(EXAMPLE_JRXML.splitlines()))
+
+    def test_spilled_runs_match_in_memory_sort(self):
+        """Sorting with runs in temporary files gives the same result as sorting in memory."""
+        fields = ''.join(f'<textField><reportElement x="{i % 7}" y="{i % 5}" uuid="{i}"/></textField>\n'
+                         for i in range(50))
+        jrxml = f'<jasperReport><title><band>\n{fields}</band></title></jasperReport>'
+        expected = sort_jrxml_text_fields(jrxml)
+        for chunk_size, max_buffered_fields in [(7, 4), (1000, 50), (3, 1)]:
+            output = io.StringIO()
+            sorted_count = stream_process_jrxml(io.StringIO(jrxml), output, chunk_size=chunk_size,
+                                                max_buffered_fields=max_buffered_fields)
+            self.assertEqual(output.getvalue(), expected)
+            self.assertEqual(sorted_count, 50)
+
+    def test_process_file(self):
+        """The file function shifts and sorts in one pass."""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            input_path = os.path.join(temp_dir, 'report.jrxml')
+            with open(input_path, 'w', encoding='utf-8') as file:
+                file.write(EXAMPLE_JRXML)
+            output_path = process_jrxml_file(input_path, os.path.join(temp_dir, 'out', 'report.jrxml'), 3, -5)
+            with open(output_path, encoding='utf-8') as file:
+                self.assertEqual(file.read(), sort_jrxml_text_fields(adjust_jrxml_positions(EXAMPLE_JRXML, 3, -5)))
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+Tests for the memory-mapped HTML access.
+
+This module contains tests for the byte scanners, MappedHTML and the mapped file functions,
+whose output must equal that of the string and streaming conversions.
+"""
+
+import base64
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+# Add parent directory to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.css_rewrite import iter_style_blocks, rewrite_page_positions
+from shared.html_utils import apply_offset_file, convert_bottom_to_top_file
+from shared.mapped_html import (
+    MappedHTML, apply_offset_mapped_file, convert_bottom_to_top_mapped_file, iter_pages_bytes,
+    iter_style_blocks_bytes, iter_text_nodes, write_rewritten_positions
+)
+from shared.pages import find_pages
+
+IMAGE = base64.b64encode(bytes(range(256)) * 40).decode('ascii')
+
+HTML = f"""<html><head><style>.x{{bottom:5px;}}</style><script>var a = "<b>kein Text</b>";</script></head>
+<body>
+<div id="p1" style="width: 800px; height: 1000px;"><img src="data:image/png;base64,{IMAGE}" alt="a > b">
+<style>#t1{{left:10px;bottom:100px;}} #t2{{top:3px}}</style>
+<div id="t1">Größe</div><div id="t2">Menge</div></div>
+<div class="page" style="width: 600px; height: 700px;"><style>#t3{{bottom:50px;left:1px}}</style>
+<div id="t3"> 36 </div></div>
+</body></html>"""
+
+REWRITES = [
+    {'bottom_to_top': True},
+    {'bottom_to_top': True, 'offset_x': 3, 'offset_y': -2},
+    {'offset_x': 4},
+    {'offset_y': 5},
+    {},
+]
+
+
+class TestMappedHTML(unittest.TestCase):
+    """Test cases for shared.mapped_html."""
+
+    def setUp(self):
+        """Write the example document to a temporary folder."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.input_path = os.path.join(self.temp_dir.name, 'page.html')
+        with open(self.input_path, 'w', encoding='utf-8', newline='') as file:
+            file.write(HTML)
+
+    def tearDown(self):
+        """Remove the temporary folder."""
+        self.temp_dir.cleanup()
+
+    def test_scanners_match_string_versions(self):
+        """Style blocks and pages are found at the byte offsets of the string results."""
+        data = HTML.encode('utf-8')
+        self.assertEqual([data[start:end].decode('utf-8') for start, end in iter_style_blocks_bytes(data)],
+                         [HTML[start:end] for start, end in iter_style_blocks(HTML)])
+        pages = list(iter_pages_bytes(data))
+        self.assertEqual([page[:4] for page in pages], [page[:4] for page in find_pages(HTML)])
+        self.assertTrue(all(data.startswith(b'<div', page.start) for page in pages))
+
+    def test_text_nodes(self):
+        """Text nodes are decoded, tags, scripts and style blocks are skipped."""
+        with MappedHTML(self.input_path) as document:
+            nodes = list(document.iter_text_nodes())
+            self.assertEqual([text for _, _, text in nodes], ['Größe', 'Menge', ' 36 '])
+            start, end, text = nodes[0]
+            self.assertEqual(document.decode(start, end), text)
+        self.assertEqual(list(iter_text_nodes(b'<p>a</p>b')), [(3, 4, 'a'), (8, 9, 'b')])
+
+    def test_document(self):
+        """The stylesheet and pages are read from the map, which is released on exit."""
+        with MappedHTML(self.input_path) as document:
+            self.assertEqual(len(document), len(HTML.encode('utf-8')))
+            self.assertEqual(document.stylesheet().id_style('t3'), {'bottom': '50px', 'left': '1px'})
+            self.assertEqual([page.height for page in document.pages()], [1000, 700])
+        self.assertEqual(len(document), 0)
+
+        empty_path = os.path.join(self.temp_dir.name, 'empty.html')
+        open(empty_path, 'w').close()
+        with MappedHTML(empty_path) as document:
+            self.assertEqual((document.style_contents(), document.pages()), ([], []))
+
+    def test_rewrite_matches_page_rewrite(self):
+        """Every rewrite gives the output of rewrite_page_positions."""
+        with MappedHTML(self.input_path) as document:
+            for kwargs in REWRITES:
+                with self.subTest(**kwargs):
+                    output = io.BytesIO()
+                    write_rewritten_positions(document.data, output, **kwargs)
+                    self.assertEqual(output.getvalue().decode('utf-8'), rewrite_page_positions(HTML, **kwargs))
+
+    def test_files_match_streaming(self):
+        """The mapped file functions write the same bytes as the streaming ones."""
+        for mapped_function, stream_function in ((convert_bottom_to_top_mapped_file, convert_bottom_to_top_file),
+                                                 (apply_offset_mapped_file, apply_offset_file)):
+            mapped_path = os.path.join(self.temp_dir.name, 'mapped', 'page.html')
+            stream_path = os.path.join(self.temp_dir.name, 'stream', 'page.html')
+            self.assertEqual(mapped_function(self.input_path, mapped_path, offset_x=2, offset_y=1), mapped_path)
+            stream_function(self.input_path, stream_path, offset_x=2, offset_y=1)
+            with open(mapped_path, 'rb') as mapped_file, open(stream_path, 'rb') as stream_file:
+                self.assertEqual(mapped_file.read(), stream_file.read())
+
+    def test_output_is_input(self):
+        """Writing to the mapped input file, also through a link, is rejected before it is truncated."""
+        link_path = os.path.join(self.temp_dir.name, 'link.html')
+        os.link(self.input_path, link_path)
+        for output_path in (self.input_path, link_path):
+            with self.assertRaises(ValueError):
+                convert_bottom_to_top_mapped_file(self.input_path, output_path)
+        with open(self.input_path, encoding='utf-8', newline='') as file:
+            self.assertEqual(file.read(), HTML)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+"""
+Tests for the page profiles.
+
+This module contains tests for the predefined profiles, the detection from page containers
+and the selection of profiles in the conversions.
+"""
+
+import io
+import os
+import sys
+import unittest
+import xml.etree.ElementTree as ET
+
+# Add parent directory to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.constants import HTML_HEIGHT, SCALE_FACTOR_X, SCALE_FACTOR_Y
+from shared.html_utils import convert_bottom_to_top
+from shared.page_profiles import (
+    DEFAULT_PAGE_PROFILE, PAGE_PROFILES, create_page_profile, detect_page_profile, get_page_profile,
+    register_page_profile, resolve_page_profile
+)
+
+try:
+    import bs4
+except ImportError:
+    bs4 = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+NS = {'jr': 'http://jasperreports.sourceforge.net/jasperreports'}
+
+
+def page_html(width, height):
+    """Return a one-page document with a page container of the given size."""
+    return f"""<html><head><style>.x{{bottom:10px;}}</style></head><body>
+<div id="p1" style="width: {width}px; height: {height}px;">
+<style>#t1{{left:100px;bottom:100px;}}</style>
+<div id="t1" class="t">Artikel</div>
+</div></body></html>"""
+
+
+class TestPageProfiles(unittest.TestCase):
+    """Test cases for shared.page_profiles."""
+
+    def test_default_profile(self):
+        """The default profile has the values and scale factors of the constants."""
+        self.assertIs(get_page_profile(), DEFAULT_PAGE_PROFILE)
+        self.assertEqual((DEFAULT_PAGE_PROFILE.scale_x, DEFAULT_PAGE_PROFILE.scale_y), (SCALE_FACTOR_X, SCALE_FACTOR_Y))
+        self.assertEqual(DEFAULT_PAGE_PROFILE.html_height, HTML_HEIGHT)
+
+    def test_predefined_profiles(self):
+        """Paper profiles exist in both orientations with precomputed band and scale."""
+        letter = get_page_profile('letter-landscape')
+        self.assertEqual((letter.page_width, letter.page_height), (792, 612))
+        self.assertEqual((letter.band_width, letter.band_height), (752, 572))
+        self.assertAlmostEqual(letter.scale_x, letter.band_width / letter.html_width)
+        self.assertIn('a4', PAGE_PROFILES)
+        with self.assertRaises(ValueError):
+            get_page_profile('tabloid')
+        with self.assertRaises(ValueError):
+            create_page_profile('empty', 100, 100, 40, 40)
+
+    def test_detection(self):
+        """Page containers are matched by orientation and aspect ratio, once per size."""
+        a4 = detect_page_profile(909, 1286)
+        self.assertEqual((a4.name, a4.html_width, a4.html_height), ('a4', 909, 1286))
+        self.assertAlmostEqual(a4.scale_y, a4.band_height / 1286)
+        self.assertEqual(detect_page_profile(1210, 825).name, 'a4-landscape')
+        self.assertEqual(detect_page_profile(800, 1000).name, 'letter')
+        self.assertEqual(detect_page_profile(1000, 800).name, 'letter-landscape')
+        self.assertEqual(detect_page_profile(500, 500).name, 'default')
+        self.assertIs(detect_page_profile(909, 1286), a4)
+
+        self.assertEqual(resolve_page_profile('auto', page_html(800, 1000)).name, 'letter')
+        self.assertIs(resolve_page_profile('auto', '<p>no pages</p>'), DEFAULT_PAGE_PROFILE)
+
+    def test_register(self):
+        """Registered profiles can be selected and are detected."""
+        profile = create_page_profile('card', 300, 150, 240, 120, 0, 0, 0, 0)
+        try:
+            register_page_profile(profile)
+            self.assertIs(get_page_profile('card'), profile)
+            self.assertIs(detect_page_profile(300, 150), profile)
+        finally:
+            del PAGE_PROFILES['card']
+            detect_page_profile.cache_clear()
+
+    def test_convert_bottom_to_top(self):
+        """Content outside of page containers is flipped against the profile height."""
+        html = page_html(816, 1056)
+        self.assertIn('.x{top:%dpx;}' % (HTML_HEIGHT - 10), convert_bottom_to_top(html))
+        self.assertIn('.x{top:1046px;}', convert_bottom_to_top(html, page_profile='auto'))
+        self.assertIn('.x{top:806px;}', convert_bottom_to_top(html, page_profile='letter-landscape'))
+        # The page container keeps its own height
+        self.assertIn('#t1{left:100px;top:956px;}', convert_bottom_to_top(html, page_profile='a5'))
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_jasper_boxes(self):
+        """The scale factors of a profile replace the default ones."""
+        from shared.coordinates import boxes_from_positions, html_to_jasper_boxes
+        boxes = boxes_from_positions([{'id': 'a', 'left': 100.0, 'bottom': 16.0}])
+        profile = get_page_profile('letter')
+        result = html_to_jasper_boxes(boxes, page_profile='letter')
+        self.assertAlmostEqual(result.left[0], 100 * profile.scale_x)
+        self.assertAlmostEqual(result.top[0], (profile.html_height - 16) * profile.scale_y)
+
+    @unittest.skipIf(bs4 is None, "BeautifulSoup is not installed")
+    def test_jrxml_per_document(self):
+        """With "auto" every document gets the report page of its own format."""
+        from shared.jasper_xml import convert_html_to_jasper
+        sizes = {}
+        for width, height in ((909, 1286), (1056, 816), (1210, 825)):
+            output = io.StringIO()
+            convert_html_to_jasper(page_html(width, height), output, page_profile='auto')
+            root = ET.fromstring(output.getvalue())
+            element = root.find('.//jr:staticText/jr:reportElement', NS)
+            sizes[width] = (root.get('pageWidth'), root.get('pageHeight'), element.get('x'))
+        self.assertEqual(sizes[909], ('595', '842', str(int(100 * 555 / 909))))
+        self.assertEqual(sizes[1056], ('792', '612', str(int(100 * 752 / 1056))))
+        self.assertEqual(sizes[1210][:2], ('842', '595'))
+
+        output = io.StringIO()
+        convert_html_to_jasper(page_html(909, 1286), output)
+        self.assertEqual(ET.fromstring(output.getvalue()).get('pageWidth'), '595')
+
+
+if __name__ == "__main__":
+    unittest.main()
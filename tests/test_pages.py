@@ -0,0 +1,90 @@
+"""
+Tests for multi-page documents.
+
+This module contains tests for the page container detection and the per-page coordinate
+frames of the bottom to top conversion and the JRXML generation.
+"""
+
+import io
+import os
+import re
+import sys
+import unittest
+
+# Add parent directory to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.constants import HTML_HEIGHT
+from shared.css_rewrite import rewrite_page_positions, stream_rewrite_style_positions
+from shared.html_utils import convert_bottom_to_top, load_html_from_file
+from shared.jasper_xml import convert_html_to_jasper_snippets
+from shared.pages import find_pages, iter_page_segments, page_size
+
+
+MULTI_PAGE_HTML = """<html><head>
+<style>#t0_1{left:5px;bottom:800px;}</style>
+</head><body>
+<div id="p1" style="overflow: hidden; position: relative; width: 1210px; height: 825px;">
+<style>#t1_1{left:18px;bottom:804px;}</style>
+<div id="t1_1" class="t">Page one</div>
+</div>
+<div id='p2' style='width: 909px; height: 1286px'>
+<div id="pg2" style="-webkit-user-select: none;"></div>
+<style>#t1_2{left:20px;bottom:1200px;}</style>
+<div id="t1_2" class="t">Page two</div>
+</div>
+<div class="page x" style="width:600px;height:400px;"><span style="left:10px;bottom:300px;">Page three</span></div>
+</body></html>"""
+
+
+class TestPages(unittest.TestCase):
+    """Test cases for multi-page documents."""
+
+    def test_find_pages(self):
+        """Page containers are found by id or class with their own size."""
+        pages = find_pages(MULTI_PAGE_HTML)
+        self.assertEqual([(page.number, page.element_id, page.width, page.height) for page in pages],
+                         [(1, 'p1', 1210.0, 825.0), (2, 'p2', 909.0, 1286.0), (3, None, 600.0, 400.0)])
+        self.assertEqual([segment[3] for segment in iter_page_segments(MULTI_PAGE_HTML)],
+                         [HTML_HEIGHT, 825.0, 1286.0, 400.0])
+        self.assertIsNone(page_size('pg1', '', '-webkit-user-select: none;'))
+        self.assertIsNone(page_size('t1_1', 't', 'width: 10px; height: 10px'))
+
+    def test_bottom_to_top_per_page(self):
+        """Every style block is flipped against the height of its own page."""
+        converted = convert_bottom_to_top(MULTI_PAGE_HTML)
+        self.assertIn('#t0_1{left:5px;top:25px;}', converted)
+        self.assertIn('#t1_1{left:18px;top:21px;}', converted)
+        self.assertIn('#t1_2{left:20px;top:86px;}', converted)
+
+        # Parallel and streaming conversions give the same result
+        self.assertEqual(rewrite_page_positions(MULTI_PAGE_HTML, bottom_to_top=True, workers=2), converted)
+        for chunk_size in (7, 64, 1024):
+            output = io.StringIO()
+            stream_rewrite_style_positions(io.StringIO(MULTI_PAGE_HTML), output, bottom_to_top=True,
+                                           chunk_size=chunk_size)
+            self.assertEqual(output.getvalue(), converted)
+
+    def test_single_page_documents_are_unchanged(self):
+        """Documents with one page of the default height convert as before."""
+        html_string = MULTI_PAGE_HTML.split('<div id=\'p2\'')[0]
+        self.assertEqual(convert_bottom_to_top(html_string),
+                         html_string.replace('bottom:800px', 'top:25px').replace('bottom:804px', 'top:21px'))
+
+    def test_jrxml_pages(self):
+        """Multi-page documents get one detail band per page, each page scaled to fit."""
+        jrxml = convert_html_to_jasper_snippets(MULTI_PAGE_HTML)
+        self.assertIn('<detail>', jrxml)
+        self.assertEqual(jrxml.count('<band height="802"'), 3)
+        self.assertEqual(re.findall(r'<reportElement x="(\d+)" y="(\d+)"', jrxml),
+                         [('8', '20'), ('12', '53'), ('9', '200')])
+
+        # The sample page of 909x1286 pixels fits the page without negative positions
+        sample_path = os.path.join('data', 'original', 'original_2025-07-16_104156.html')
+        jrxml = convert_html_to_jasper_snippets(load_html_from_file(sample_path))
+        self.assertIn('<title>', jrxml)
+        self.assertTrue(all(0 <= int(y) <= 802 for y in re.findall(r' y="(-?\d+)"', jrxml)))
+
+
+if __name__ == '__main__':
+    unittest.main()
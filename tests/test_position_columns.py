@@ -0,0 +1,103 @@
+"""
+Tests for the columnar position export.
+
+This module contains tests for extract_position_columns and the CSV and Parquet datasets
+written by export_folder_positions.
+"""
+
+import csv
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+# Add parent directory to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.html_utils import extract_positions, get_stylesheet
+from shared.position_columns import (
+    POSITION_COLUMNS, export_folder_positions, extract_position_columns, pa, write_position_columns_csv
+)
+
+
+EXAMPLE_HTML = """<html><head><style>
+.s1{font-family:ff1;font-size:12px;}
+#t1_1{left:18px;bottom:804px;width:40px;}
+#t1_2{left:20px;top:30px;}
+</style></head><body>
+<div id="p1" style="width: 1210px; height: 825px;"><div id="t1_1" class="t s1">A</div></div>
+<div id="p2" style="width: 909px; height: 1286px;"><div class='t' id='t1_2'>B</div></div>
+</body></html>"""
+
+
+class TestPositionColumns(unittest.TestCase):
+    """Test cases for the columnar position export."""
+
+    def test_extract_position_columns(self):
+        """The columns hold the rows of extract_positions with box, font class and page."""
+        columns = extract_position_columns(EXAMPLE_HTML, source='example.html')
+        self.assertEqual(columns.id.tolist(), [position['id'] for position in
+                                               extract_positions(EXAMPLE_HTML, stylesheet=get_stylesheet(EXAMPLE_HTML))])
+        self.assertEqual(columns.left.tolist(), [18.0, 20.0])
+        np.testing.assert_array_equal(columns.bottom, [804.0, np.nan])
+        np.testing.assert_array_equal(columns.width, [40.0, np.nan])
+        self.assertEqual(columns.font_class.tolist(), ['s1', ''])
+        self.assertEqual(columns.page.tolist(), [1, 2])
+        self.assertEqual(columns.source.tolist(), ['example.html'] * 2)
+
+        output = io.StringIO(newline='')
+        write_position_columns_csv(columns, output)
+        self.assertEqual(output.getvalue().splitlines()[1], 'example.html,t1_1,18.0,,804.0,40.0,,s1,1')
+
+    def test_other_id_attributes(self):
+        """Font class and page come from the id attribute, not from attributes ending in id."""
+        html = EXAMPLE_HTML.replace('<div id="t1_1" class="t s1">',
+                                    '<div data-id="t1_2" title="a>b" id="t1_1" class="t s1">')
+        columns = extract_position_columns(html)
+        self.assertEqual(columns.font_class.tolist(), ['s1', ''])
+        self.assertEqual(columns.page.tolist(), [1, 2])
+
+    def test_export_folder_csv(self):
+        """All files of a folder are written to one CSV dataset, which can be appended to."""
+        with tempfile.TemporaryDirectory() as folder:
+            for name in ('a.html', 'b.html'):
+                with open(os.path.join(folder, name), 'w', encoding='utf-8') as file:
+                    file.write(EXAMPLE_HTML)
+            dataset_path = os.path.join(folder, 'out', 'positions.csv')
+
+            results = export_folder_positions(folder, dataset_path, batch_size=1)
+            self.assertEqual([(result['status'], result['rows']) for result in results],
+                             [('converted', 2), ('converted', 2)])
+            export_folder_positions(folder, dataset_path, file_pattern='a.html', append=True, workers=2)
+
+            with open(dataset_path, encoding='utf-8', newline='') as file:
+                rows = list(csv.reader(file))
+            self.assertEqual(rows[0], list(POSITION_COLUMNS))
+            self.assertEqual([row[0] for row in rows[1:]], ['a.html'] * 2 + ['b.html'] * 2 + ['a.html'] * 2)
+
+            with self.assertRaises(ValueError):
+                export_folder_positions(folder, os.path.join(folder, 'positions.json'))
+
+    @unittest.skipIf(pa is None, "pyarrow is not installed")
+    def test_export_folder_parquet(self):
+        """Parquet datasets get one row group per batch with NaN values as nulls."""
+        import pyarrow.parquet as pq
+        with tempfile.TemporaryDirectory() as folder:
+            for name in ('a.html', 'b.html', 'c.html'):
+                with open(os.path.join(folder, name), 'w', encoding='utf-8') as file:
+                    file.write(EXAMPLE_HTML)
+            dataset_path = os.path.join(folder, 'positions.parquet')
+            export_folder_positions(folder, dataset_path, batch_size=2)
+
+            parquet_file = pq.ParquetFile(dataset_path)
+            self.assertEqual(parquet_file.metadata.num_row_groups, 2)
+            table = parquet_file.read()
+            self.assertEqual(table.num_rows, 6)
+            self.assertEqual(table.column('bottom').to_pylist()[:2], [804.0, None])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+Tests for the spatial index.
+
+This module contains tests for SpatialIndex, merge_line_fragments and detect_table_regions.
+"""
+
+import io
+import os
+import random
+import sys
+import unittest
+
+# Add parent directory to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.element_boxes import build_element_boxes
+from shared.jasper_xml import convert_html_to_jasper
+from shared.spatial_index import SpatialIndex, detect_table_regions, merge_line_fragments
+
+
+LINE_HTML = """<html><head><style>
+.s1{font-family:ff1;font-size:10px;}
+.s2{font-family:ff2;font-size:10px;}
+</style></head><body>
+<div id="p1" style="width: 200px; height: 100px;">
+<span class="s1" style="left:10px;bottom:80px;width:20px;height:10px">Hel</span>
+<span class="s1" style="left:30px;bottom:80px;width:10px;height:10px">lo</span>
+<span class="s1" style="left:44px;bottom:81px;width:30px;height:10px">World</span>
+<span class="s2" style="left:75px;bottom:80px;width:20px;height:10px">Bold</span>
+<span class="s1" style="left:10px;bottom:60px;width:20px;height:10px">Next</span>
+</div>
+</body></html>"""
+
+
+def table_html(rows):
+    """Build a page with a heading line and a table of three columns."""
+    spans = ['<span style="left:10px;top:5px;width:100px;height:10px">Heading</span>']
+    for row in range(rows):
+        top = 30 + row * 14
+        for column, left in enumerate((10, 60, 120)):
+            spans.append(f'<span style="left:{left + row % 2}px;top:{top}px;width:30px;height:10px">'
+                         f'{row}/{column}</span>')
+    return f'<div class="page" style="width: 300px; height: 400px;">{"".join(spans)}</div>'
+
+
+class TestSpatialIndex(unittest.TestCase):
+    """Test cases for the spatial index."""
+
+    def setUp(self):
+        """Build an index over random rectangles on two pages."""
+        generator = random.Random(7)
+        self.rects = []
+        for _ in range(300):
+            left, top = generator.uniform(0, 500), generator.uniform(0, 500)
+            self.rects.append((left, top, left + generator.uniform(1, 40), top + generator.uniform(1, 15)))
+        self.pages = [index % 2 for index in range(len(self.rects))]
+        self.index = SpatialIndex(self.rects, self.pages)
+
+    def test_queries_match_brute_force(self):
+        """Range, overlap and nearest queries return the same results as comparing all rectangles."""
+        query = (100, 100, 180, 150)
+        expected = [i for i, (left, top, right, bottom) in enumerate(self.rects)
+                    if self.pages[i] == 1 and left <= query[2] and query[0] <= right
+                    and top <= query[3] and query[1] <= bottom]
+        self.assertEqual(self.index.query_range(query, page=1), expected)
+
+        def overlapping(i, j):
+            a, b = self.rects[i], self.rects[j]
+            return self.pages[i] == self.pages[j] and min(a[2], b[2]) > max(a[0], b[0]) \
+                and min(a[3], b[3]) > max(a[1], b[1])
+
+        pairs = [(i, j) for i in range(len(self.rects)) for j in range(i + 1, len(self.rects)) if overlapping(i, j)]
+        self.assertEqual(self.index.overlapping_pairs(), pairs)
+        self.assertEqual(self.index.overlaps(5), sorted({j for pair in pairs if 5 in pair for j in pair} - {5}))
+
+        nearest = self.index.nearest(250, 250, count=5)
+        distances = sorted(
+            (max(left - 250, 0, 250 - right) ** 2 + max(top - 250, 0, 250 - bottom) ** 2) ** 0.5
+            for left, top, right, bottom in self.rects)
+        self.assertEqual([round(distance, 9) for distance, _ in nearest], [round(d, 9) for d in distances[:5]])
+        self.assertEqual(len(self.index.nearest(-1000, -1000, count=400, page=0)), 150)
+        self.assertEqual(SpatialIndex([]).nearest(0, 0), [])
+
+    def test_merge_line_fragments(self):
+        """Adjacent fragments of the same font and line are merged, with spaces for wide gaps."""
+        merged = merge_line_fragments(build_element_boxes(LINE_HTML))
+        self.assertEqual([(box.text, box.left, box.top, box.width) for box in merged],
+                         [('Hello World', 10.0, 19.0, 64.0), ('Bold', 75.0, 20.0, 20.0),
+                          ('Next', 10.0, 40.0, 20.0)])
+        self.assertIsNone(merged[0].bottom)
+
+        not_merged = merge_line_fragments(build_element_boxes(LINE_HTML), max_gap=1)
+        self.assertEqual([box.text for box in not_merged], ['World', 'Hello', 'Bold', 'Next'])
+
+        output = io.StringIO()
+        self.assertEqual(convert_html_to_jasper(LINE_HTML, output, merge_lines=True), 3)
+        self.assertIn('<![CDATA[Hello World]]>', output.getvalue())
+
+    def test_detect_table_regions(self):
+        """Lines with aligned columns form a table region; the heading line does not."""
+        boxes = merge_line_fragments(build_element_boxes(table_html(4)))
+        regions = detect_table_regions(boxes)
+        self.assertEqual(len(regions), 1)
+        region = regions[0]
+        self.assertEqual((region.page, region.left, region.top, region.right, region.bottom),
+                         (1, 10.0, 30.0, 151.0, 82.0))
+        self.assertEqual(region.columns, [10.0, 60.0, 120.0])
+        self.assertEqual([[boxes[i].text for i in row] for row in region.rows][1], ['1/0', '1/1', '1/2'])
+
+        self.assertEqual(detect_table_regions(merge_line_fragments(build_element_boxes(table_html(2)))), [])
+        self.assertEqual(detect_table_regions(boxes, tolerance=0.5), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+"""
+Tests for the CSS stylesheet model.
+
+This module contains tests for the Stylesheet class and its id, class and property indexes.
+"""
+
+import os
+import sys
+import unittest
+
+# Add parent directory to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.html_utils import extract_positions, load_html_from_file
+from shared.stylesheet import Stylesheet, parse_declarations
+
+
+EXAMPLE_HTML = """<html><head>
+<style type="text/css">
+/* fonts */
+@font-face { font-family: ff1; src: url('data:font/woff;base64,AAA;BBB') format('woff'); }
+.t { position: absolute; font-size: 10px; }
+.s1 { font-family: "ff1", serif; font-size: 12px; font-weight: bold; }
+.s2, .s3 { font-style: italic; color: #ff0000; }
+@supports (-webkit-text-stroke: 1px black) { .s1 { font-size: 99px; } }
+</style>
+<STYLE>
+#t1_1{left:18px;bottom:804px;width:-2.5px;}
+#t2_1{left:128.5px;top:21px;}
+#t1_1{left:20px;}
+</STYLE>
+</head><body><div id="t1_1" class="t s1">A</div></body></html>"""
+
+
+class TestStylesheet(unittest.TestCase):
+    """Test cases for the Stylesheet class."""
+
+    def setUp(self):
+        """Parse the example stylesheet."""
+        self.stylesheet = Stylesheet.from_html(EXAMPLE_HTML)
+
+    def test_indexes(self):
+        """Rules are indexed by id, class and property; conditional rules only by property."""
+        self.assertEqual(self.stylesheet.id_style('t1_1'),
+                         {'left': '20px', 'bottom': '804px', 'width': '-2.5px'})
+        self.assertEqual(list(self.stylesheet.id_styles), ['t1_1', 't2_1'])
+        self.assertEqual(self.stylesheet.class_style('s3'), {'font-style': 'italic', 'color': '#ff0000'})
+        self.assertEqual(self.stylesheet.class_style('s1')['font-size'], '12px')
+
+        font_size_rules = self.stylesheet.rules_for_property('font-size')
+        self.assertEqual([rule.selector for rule in font_size_rules], ['.t', '.s1', '.s1'])
+        self.assertEqual(font_size_rules[2].conditions, ('@supports (-webkit-text-stroke: 1px black)',))
+
+    def test_font_faces_keep_data_urls(self):
+        """Semicolons inside url() do not end a declaration."""
+        self.assertEqual(len(self.stylesheet.font_faces), 1)
+        self.assertEqual(self.stylesheet.font_faces[0]['src'],
+                         "url('data:font/woff;base64,AAA;BBB') format('woff')")
+        self.assertEqual(parse_declarations('a: "x;y"; B : 1px'), {'a': '"x;y"', 'b': '1px'})
+
+    def test_computed_style(self):
+        """Class rules apply in source order, then id rules, then the style attribute."""
+        self.assertEqual(self.stylesheet.font('t1_1', 's1 t'), {
+            'font_name': 'ff1', 'font_size': 12.0, 'is_bold': True, 'is_italic': False, 'color': None,
+        })
+        self.assertEqual(self.stylesheet.position('t1_1', ['t'], inline_style='top: 5px'),
+                         {'left': 20.0, 'top': 5.0, 'bottom': 804.0, 'width': -2.5})
+        self.assertEqual(self.stylesheet.position('t1_1', ['t']),
+                         {'left': 20.0, 'bottom': 804.0, 'width': -2.5})
+
+    def test_computed_style_is_a_copy(self):
+        """Changing a computed style does not change the cached style of later lookups."""
+        style = self.stylesheet.computed_style('t1_1', ['t'])
+        style['left'] = '999px'
+        self.assertEqual(self.stylesheet.computed_style('t1_1', ['t'])['left'], '20px')
+        self.assertIsNot(self.stylesheet.computed_style('t1_1', ['t']), self.stylesheet.computed_style('t1_1', ['t']))
+
+    def test_extract_positions_from_stylesheet(self):
+        """extract_positions gives the same positions from a parsed stylesheet."""
+        sample_path = os.path.join('data', 'original', 'original_2025-07-16_104156.html')
+        html_string = load_html_from_file(sample_path)
+        self.assertEqual(extract_positions(html_string, stylesheet=Stylesheet.from_html(html_string)),
+                         extract_positions(html_string))
+
+        # Repeated id rules are merged instead of replaced
+        self.assertEqual(extract_positions(EXAMPLE_HTML, stylesheet=self.stylesheet)[0],
+                         {'id': 't1_1', 'left': 20.0, 'bottom': 804.0})
+        self.assertEqual(extract_positions(EXAMPLE_HTML)[0], {'id': 't1_1', 'left': 20.0})
+
+
+if __name__ == '__main__':
+    unittest.main()